@@ -1,8 +1,10 @@
 from flask import Flask
-from .extensions import db, jwt, CORS
+from .extensions import db, jwt, response_cache, password_hasher, user_resolver, instrumentation, rate_limiter, job_runner, replica_router, shard_router, goal_dictionaries, CORS
 from .routes.auth_routes import auth_bp
 from .routes.main_routes import main_bp
 from .routes.goal_routes import goal_bp
+from .routes.job_routes import job_bp
+from . import tasks  # noqa: F401 (registers the background tasks)
 import os
 
 def create_app(config_name=None):
@@ -23,13 +25,23 @@ def create_app(config_name=None):
         app.config.from_object(DevelopmentConfig)
 
     # Initialize extensions
+    instrumentation.init_app(app)  # first, so its request hooks time everything else
+    rate_limiter.init_app(app)  # next, so rejected requests cost nothing more
+    replica_router.init_app(app)  # before db, which creates the replica and shard bind engines
+    shard_router.init_app(app)
     db.init_app(app)
+    goal_dictionaries.init_app(app)
     jwt.init_app(app)
+    user_resolver.init_app(app, jwt)
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    job_runner.init_app(app)
     CORS(app)
 
     # Register blueprints
     app.register_blueprint(main_bp)  # Register main routes without prefix
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(goal_bp, url_prefix="/api")  # Goals API routes
+    app.register_blueprint(job_bp, url_prefix="/api")  # Background job status
 
     return app
@@ -0,0 +1,148 @@
+# app/analytics.py
+"""
+Goals created and completed per week or month, optionally broken down by
+category, goal_type or priority.
+
+Counts come from one round trip, GROUP BY queries over ``created_at`` and
+``completion_date`` joined with UNION ALL. Past periods are closed: their
+counts only change when a goal's history is rewritten (deleted, un-completed,
+re-categorized), so they are cached per user in the response cache backend,
+and writes like those call ``invalidate`` to move the user to a new epoch. A
+dashboard load then queries only the open period and whatever closed periods
+are not cached yet.
+"""
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from . import archive
+from .extensions import db, response_cache
+from .models import Goal
+
+BUCKETS = ('week', 'month')
+GROUP_BY = {'category': Goal.category, 'goal_type': Goal.goal_type, 'priority': Goal.priority}
+MAX_PERIODS = 104
+# Goal fields whose change can move counts between closed periods or groups
+HISTORY_FIELDS = frozenset(('is_completed', 'category', 'goal_type', 'priority'))
+# Closed periods stay cached until invalidated; the expiry only clears entries of old epochs
+CLOSED_PERIOD_TTL = 30 * 24 * 3600
+
+
+class bucket_start(FunctionElement):
+    """First day of the week (Monday) or month containing a date/datetime expression"""
+    type = db.Date()
+    inherit_cache = True
+    # The unit changes the SQL, so it has to be part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [('unit', InternalTraversal.dp_string)]
+
+    def __init__(self, unit, expression):
+        self.unit = unit
+        super().__init__(expression)
+
+
+@compiles(bucket_start)
+def _bucket_start(element, compiler, **kw):
+    expression = compiler.process(list(element.clauses)[0], **kw)
+    return f"CAST(date_trunc('{element.unit}', {expression}) AS DATE)"
+
+
+@compiles(bucket_start, 'sqlite')
+def _bucket_start_sqlite(element, compiler, **kw):
+    expression = compiler.process(list(element.clauses)[0], **kw)
+    if element.unit == 'week':
+        return f"date({expression}, 'weekday 0', '-6 days')"
+    return f"date({expression}, 'start of month')"
+
+
+def period_starts(unit, today, count):
+    """Start days of the last ``count`` periods, oldest first; the last one is still open"""
+    if unit == 'week':
+        current = today - timedelta(days=today.weekday())
+        return [current - timedelta(weeks=n) for n in reversed(range(count))]
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def _epoch_key(user_id):
+    return f'goals:analytics-epoch:{user_id}'
+
+
+def _backend():
+    if response_cache.backend is None or not current_app.config['GOAL_CACHE_ENABLED']:
+        return None
+    return response_cache.backend
+
+
+def invalidate(user_id):
+    """Drop a user's cached closed periods; call after a write that changes past counts commits"""
+    backend = _backend()
+    if backend is not None:
+        backend.incr(_epoch_key(user_id))
+
+
+def counts_query(user_id, unit, group_column, since):
+    """``(kind, period, group_key, goals)`` rows for periods starting on or after ``since``.
+
+    Each key appears up to twice, once for the goals table and once for the archive.
+    """
+    selects = []
+    for kind, column, condition in (
+        ('created', Goal.created_at, Goal.created_at >= since),
+        ('completed', Goal.completion_date, db.and_(Goal.is_completed.is_(True), Goal.completion_date >= since)),
+    ):
+        group_key = group_column if group_column is not None else db.null()
+        keys = [db.literal(kind).label('kind'), bucket_start(unit, column).label('period'), group_key.label('group_key')]
+        select = db.select(*keys, db.func.count(Goal.id).label('goals')) \
+            .where(Goal.user_id == user_id, condition).group_by(*keys[1:])
+        # Archived goals still count for the periods they were created and completed in
+        selects += [select, archive.archived(select)]
+    # All aggregates in one round trip
+    return db.union_all(*selects)
+
+
+def _counts(user_id, unit, group_column, since):
+    """``{period_start: {'created': ..., 'completed': ...}}`` for periods starting on or after ``since``"""
+    counts = {}
+    for kind, period, group_key, goals in db.session.execute(counts_query(user_id, unit, group_column, since)):
+        entry = counts.setdefault(period, {'created': {}, 'completed': {}})
+        entry[kind][group_key] = entry[kind].get(group_key, 0) + goals
+    return counts
+
+
+def goal_analytics(user_id, unit, group_by=None, periods=12, today=None):
+    """Created/completed counts for the last ``periods`` periods, oldest first"""
+    today = today or datetime.utcnow().date()
+    starts = period_starts(unit, today, periods)
+    open_start = starts[-1]
+    group_column = GROUP_BY[group_by] if group_by else None
+
+    backend = _backend()
+    cached = {}
+    if backend is not None:
+        epoch = backend.get_counter(_epoch_key(user_id))
+        key_prefix = f'goals:analytics:{user_id}:{epoch}:{unit}:{group_by or "-"}:'
+        for start in starts[:-1]:
+            value = backend.get(key_prefix + start.isoformat())
+            if value is not None:
+                cached[start] = value
+
+    missing = [start for start in starts[:-1] if start not in cached]
+    computed = _counts(user_id, unit, group_column, missing[0] if missing else open_start)
+    empty = {'created': {}, 'completed': {}}
+    if backend is not None:
+        for start in missing:
+            backend.set(key_prefix + start.isoformat(), computed.get(start, empty), ttl=CLOSED_PERIOD_TTL)
+
+    series = []
+    for start in starts:
+        counts = cached.get(start) or computed.get(start, empty)
+        entry = {'period_start': start, 'closed': start != open_start}
+        for kind in ('created', 'completed'):
+            entry[kind] = dict(counts[kind]) if group_column is not None else counts[kind].get(None, 0)
+        series.append(entry)
+    return series
@@ -0,0 +1,124 @@
+# app/archive.py
+"""
+Hot/cold storage of completed goals.
+
+Goals completed more than ``ARCHIVE_AFTER_DAYS`` days ago are moved from
+``goals`` to ``goals_archive`` by the daily ``archive_goals`` job, at most
+``ARCHIVE_BATCH_SIZE`` goals per transaction (one ``DELETE ... RETURNING`` and
+one multi-row INSERT). The hot table, its indexes and every default list read
+then only cover goals somebody still works on.
+
+Reads include the archive only when they may need it:
+- the list endpoint with ``is_completed=true`` or ``include_archived=true``
+  reads ``goals UNION ALL goals_archive`` (``with_archive``)
+- a single-goal read that misses the hot table looks in the archive
+- the changes feed, statistics and analytics always count both tables, so an
+  archived goal is neither new, deleted nor missing for them
+A write to an archived goal moves it back to the hot table first (``restore``).
+
+Archiving is not a change: ids, versions and ``updated_at`` are kept and no
+tombstone is written.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.sql.util import ClauseAdapter
+from .extensions import db, response_cache, shard_router
+from .models import Goal, GoalArchive
+
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_BATCH_SIZE = 500
+
+# Columns moved between the two tables, in table order (rows are keyed by column name)
+GOAL_COLUMNS = tuple(column.name for column in Goal.__table__.columns)
+
+
+def archive_after_days():
+    return current_app.config.get('ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+
+
+def includes_archive(args):
+    """Whether a list read with these query args covers archived goals too"""
+    return (args.get('include_archived', 'false').lower() == 'true'
+            or (args.get('is_completed') or '').lower() == 'true')
+
+
+def archived(statement):
+    """The same statement on ``goals_archive`` instead of ``goals``"""
+    return ClauseAdapter(GoalArchive.__table__, adapt_on_names=True).traverse(statement)
+
+
+def with_archive(statement):
+    """``statement`` over ``goals UNION ALL goals_archive``.
+
+    Returns ``(union, adapt)``: the union as a subquery with the statement's
+    columns, and a function turning a ``goals`` expression (a sort key, the id)
+    into the same expression on the union's columns.
+    """
+    union = db.union_all(statement, archived(statement)).subquery('all_goals')
+    adapter = ClauseAdapter(union, adapt_on_names=True)
+    return union, lambda expression: adapter.traverse(expression.expression)
+
+
+def archive_batch(cutoff, batch_size, after_id=0, skip_users=()):
+    """Move the next ``batch_size`` goals (by id, after ``after_id``) completed before ``cutoff`` to the archive.
+
+    Runs in the caller's transaction. Returns ``(ids of the moved goals, ids of their users)``.
+    """
+    candidates = db.select(Goal.id).where(
+        Goal.id > after_id, Goal.is_completed.is_(True), Goal.completion_date < cutoff
+    ).order_by(Goal.id).limit(batch_size)
+    if skip_users:
+        candidates = candidates.where(Goal.user_id.not_in(skip_users))
+    # Conditions are repeated so a goal un-completed meanwhile stays where it is
+    rows = db.session.execute(
+        db.delete(Goal)
+        .where(Goal.id.in_(candidates.scalar_subquery()), Goal.is_completed.is_(True), Goal.completion_date < cutoff)
+        .returning(*(Goal.__table__.c[name] for name in GOAL_COLUMNS)),
+        execution_options={'synchronize_session': False}
+    ).mappings().all()
+    if rows:
+        now = datetime.utcnow()
+        db.session.execute(GoalArchive.__table__.insert(), [dict(row, archived_at=now) for row in rows])
+    return [row['id'] for row in rows], {row['user_id'] for row in rows}
+
+
+def archive_completed(today=None):
+    """Archive every goal completed more than ``ARCHIVE_AFTER_DAYS`` ago, on every shard.
+
+    Walks each goals table once in id order and commits after every batch.
+    Returns the number of goals moved; ``ARCHIVE_AFTER_DAYS = 0`` turns archiving off.
+    """
+    days = archive_after_days()
+    if not days:
+        return 0
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=days)
+    batch_size = current_app.config.get('ARCHIVE_BATCH_SIZE', ARCHIVE_BATCH_SIZE)
+    moved = 0
+    for _ in shard_router.each_shard():
+        after_id = 0
+        while True:
+            # Rows of a user being moved to another shard must stay put until the move ends
+            goal_ids, user_ids = archive_batch(cutoff, batch_size, after_id, skip_users=shard_router.moving_users())
+            db.session.commit()
+            if not goal_ids:
+                break
+            for user_id in user_ids:
+                response_cache.bump(user_id)
+            moved += len(goal_ids)
+            after_id = max(goal_ids)
+    return moved
+
+
+def restore_statement(user_id, goal_ids):
+    """``DELETE ... RETURNING`` taking a user's goals out of the archive"""
+    return db.delete(GoalArchive).where(GoalArchive.user_id == user_id, GoalArchive.id.in_(goal_ids)) \
+        .returning(*(GoalArchive.__table__.c[name] for name in GOAL_COLUMNS))
+
+
+def restore(user_id, goal_ids):
+    """Move archived goals back to the hot table in the caller's transaction; returns how many were archived"""
+    rows = db.session.execute(restore_statement(user_id, goal_ids),
+                              execution_options={'synchronize_session': False}).mappings().all()
+    if rows:
+        db.session.execute(Goal.__table__.insert(), [dict(row) for row in rows])
+    return len(rows)
@@ -0,0 +1,623 @@
+# app/asgi.py
+"""
+Async serving mode: the auth and core goal endpoints on Starlette with
+SQLAlchemy's async engine (asyncpg for Postgres, aiosqlite for SQLite).
+
+In the Flask app every in-flight request holds a worker thread for as long as
+its queries run, so a worker serves at most GUNICORN_THREADS requests at once.
+Here a request waiting on the database is a suspended coroutine. One worker
+process keeps hundreds of client connections open, and only the pool bounds
+how many queries run at once.
+
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py asgi:app
+
+These endpoints keep the Flask app's URLs, tokens, error responses and JSON
+shapes: ``/``, ``/health``, ``/auth/register``, ``/auth/login``,
+``/auth/profile``, ``POST /api/add/goal``, ``GET /api/goals`` and
+``GET|PUT|DELETE /api/goal/<id>``. Every other path (search, export, import,
+batch, analytics, metrics, jobs, ...) falls through to the Flask app, mounted
+behind the native routes, which runs it on the thread pool with its own
+limits and caching. GET responses of the native routes are not cached. Routes
+are named after the Flask endpoints, so ``RATE_LIMITS`` applies to both apps
+alike.
+
+A Flask app is still created alongside. It supplies the configuration, token
+decoding, password hashing, the user and response caches and the background
+job runner, so both modes share one set of settings. The goal type and
+category dictionaries are loaded whole at startup and reloaded on the thread
+pool, so reading goals never queries them from the event loop.
+Needs the packages in requirements-async.txt.
+"""
+import asyncio
+import functools
+import logging
+import math
+import re
+from datetime import datetime
+from flask_jwt_extended import create_access_token, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException, NoAuthorizationError, InvalidHeaderError, WrongTokenError
+from jwt.exceptions import PyJWTError
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response
+from starlette.routing import Match, Mount, Route
+from werkzeug.http import parse_etags
+from . import analytics, archive, create_app
+from .current_user import CurrentUser
+from .extensions import db, goal_dictionaries, password_hasher, rate_limiter, response_cache, shard_router, user_resolver
+from .hashing import HashingBusy
+from .ratelimit import RateLimited, Overloaded, client_ip
+from .models import Goal, GoalStats, GoalTombstone, User, UserShard
+from .pagination import encode_cursor, decode_cursor, keyset_query
+from .routes.goal_routes import (SORT_KEYS, parse_new_goal, parse_goal_changes, dates_in_order, goal_filters,
+                                 cursor_key_type, _sort_value, goal_etag, if_match_versions, goal_write_conditions,
+                                 goal_update_statements, goal_delete_statement, current_goal_query, rejected_write)
+from .serializers import parse_fields, goal_columns, rows_to_dicts, dumps
+from .serving import async_engine_options
+
+logger = logging.getLogger(__name__)
+
+# Async driver for each backend of the configured (sync) database URL
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(url):
+    """The configured database URL with its backend's async driver"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status_code=status, media_type='application/json')
+
+
+def flask_error_response(flask_app, error):
+    """Render an exception with the Flask app's error handlers, so JWT and busy errors look the same"""
+    with flask_app.test_request_context():
+        response = flask_app.make_response(flask_app.handle_user_exception(error))
+    return Response(response.get_data(), status_code=response.status_code, headers=dict(response.headers))
+
+
+def in_app_context(flask_app, func, *args):
+    with flask_app.app_context():
+        return func(*args)
+
+
+async def in_thread(flask_app, func, *args):
+    """Run blocking Flask-side work (password hashing, shared cache writes) on the thread pool"""
+    return await run_in_threadpool(in_app_context, flask_app, func, *args)
+
+
+async def load_dictionaries(flask_app):
+    """Cache the whole goal dictionaries, on the thread pool (an entry still missing is looked up on use)"""
+    try:
+        await in_thread(flask_app, goal_dictionaries.load)
+    except SQLAlchemyError as e:
+        logger.warning("Loading the goal dictionaries failed: %s", e)
+
+
+async def reload_dictionaries(flask_app):
+    """Pick up entries other processes added, every ``DICTIONARY_REFRESH_INTERVAL`` seconds"""
+    while True:
+        await asyncio.sleep(flask_app.config['DICTIONARY_REFRESH_INTERVAL'])
+        await load_dictionaries(flask_app)
+
+
+async def read_json(request):
+    """Request body as JSON, or None if it is missing or malformed"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# Authentication
+
+def decode_access_token(flask_app, header):
+    """Claims of the access token in an Authorization header, checked like ``@jwt_required()``"""
+    config = flask_app.config
+    header_name, header_type = config['JWT_HEADER_NAME'], config['JWT_HEADER_TYPE']
+    header = header.strip().strip(',')
+    if not header:
+        raise NoAuthorizationError(f"Missing {header_name} Header")
+    values = [value for value in re.split(r',\s*', header) if value.split()[:1] == [header_type]]
+    if len(values) != 1:
+        raise NoAuthorizationError(f"Missing '{header_type}' type in '{header_name}' header. "
+                                   f"Expected '{header_name}: {header_type} <JWT>'")
+    parts = values[0].split()
+    if len(parts) != 2:
+        raise InvalidHeaderError(f"Bad {header_name} header. Expected '{header_name}: {header_type} <JWT>'")
+    claims = in_app_context(flask_app, decode_token, parts[1])
+    if claims.get('type') != 'access':
+        raise WrongTokenError("Only non-refresh tokens are allowed")
+    return claims
+
+
+async def load_user(request, claims):
+    """Projection of the token's user, from the shared user cache or with one narrow query"""
+    config = request.app.state.flask_app.config
+    try:
+        user_id = int(claims[config['JWT_IDENTITY_CLAIM']])
+    except (KeyError, ValueError, TypeError):
+        return None
+    rate_limiter.check('user', user_id, request.state.endpoint)
+    user = user_resolver.cached(user_id)
+    if user is None:
+        async with request.app.state.sessions() as session:
+            row = (await session.execute(
+                db.select(User.id, User.username, User.email).where(User.id == user_id)
+            )).first()
+        if row is None:
+            return None
+        user = CurrentUser(*row)
+        user_resolver.remember(user, config['USER_CACHE_TTL'])
+    return user
+
+
+def jwt_required(handler):
+    """Async counterpart of ``@jwt_required()``; the user is available as ``request.state.user``"""
+    @functools.wraps(handler)
+    async def wrapper(request):
+        flask_app = request.app.state.flask_app
+        try:
+            claims = decode_access_token(flask_app, request.headers.get(flask_app.config['JWT_HEADER_NAME'], ''))
+        except (JWTExtendedException, PyJWTError) as e:
+            return flask_error_response(flask_app, e)
+        try:
+            user = await load_user(request, claims)
+        except RateLimited as e:
+            return flask_error_response(flask_app, e)
+        if user is None:
+            return json_response({"error": "User not found"}, 404)
+        request.state.user = user
+        return await handler(request)
+    return wrapper
+
+
+# Goal statistics (async versions of the GoalStats session helpers)
+
+async def goal_statistics(session, user_id):
+    """Statistics block of the goals list, rebuilding the summary row when stale"""
+    today = datetime.utcnow().date()
+    stats = await session.get(GoalStats, user_id)
+    if stats is None or stats.overdue_as_of != today:
+        values = GoalStats.counters((await session.execute(GoalStats.compute_query(user_id, today))).one(), today)
+        if stats is None:
+            stats = GoalStats(user_id=user_id, **values)
+            session.add(stats)
+        else:
+            for key, value in values.items():
+                setattr(stats, key, value)
+        try:
+            await session.commit()
+        except IntegrityError:
+            # A concurrent request created the row first; use theirs
+            await session.rollback()
+            stats = await session.get(GoalStats, user_id)
+    return stats.to_dict()
+
+
+async def record_change(session, user_id, before=None, after=None):
+    """Keep a user's summary row in step with a single goal create, update or delete"""
+    statement = GoalStats.change_statement(user_id, before, after)
+    if statement is not None:
+        await session.execute(statement, execution_options={'synchronize_session': False})
+
+
+async def restore(session, user_id, goal_ids):
+    """Async ``archive.restore``: move archived goals back to the hot table; returns how many"""
+    rows = (await session.execute(archive.restore_statement(user_id, goal_ids),
+                                  execution_options={'synchronize_session': False})).mappings().all()
+    if rows:
+        await session.execute(Goal.__table__.insert(), [dict(row) for row in rows])
+    return len(rows)
+
+
+async def paginated_rows(session, args, query, sort_field, sort_key, sort_order, page, per_page, id_column=Goal.id):
+    """Async ``paginated_rows`` of the goal routes: one page in cursor or offset mode"""
+    descending = sort_order == 'desc'
+    count = db.select(db.func.count()).select_from(query.order_by(None).subquery())
+
+    # Cursor mode: keyset pagination, no COUNT unless explicitly requested
+    cursor = args.get('cursor')
+    if cursor is not None or args.get('pagination') == 'cursor':
+        after = decode_cursor(cursor, sort_field, sort_order, cursor_key_type(sort_field, sort_key)) if cursor else None
+        if per_page < 1:
+            raise ValueError("per_page must be at least 1")
+        include_total = args.get('include_total', 'false').lower() == 'true'
+        total_items = await session.scalar(count) if include_total else None
+
+        rows = (await session.execute(
+            keyset_query(query, sort_key, id_column, descending, after).limit(per_page + 1)
+        )).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = None
+        if has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_field, sort_order, _sort_value(last, sort_field), last.id)
+
+        pagination = {"per_page": per_page, "next_cursor": next_cursor, "has_next": has_next}
+        if include_total:
+            pagination["total_items"] = total_items
+        return rows, pagination
+
+    # Offset mode, with Flask-SQLAlchemy's paginate(error_out=False) rules
+    offset_page = max(page, 1)
+    page_size = per_page if per_page >= 1 else 20
+    total_items = await session.scalar(count)
+    rows = (await session.execute(
+        keyset_query(query, sort_key, id_column, descending).limit(page_size).offset((offset_page - 1) * page_size)
+    )).all()
+    total_pages = math.ceil(total_items / page_size) if total_items else 0
+    return rows, {
+        "current_page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "total_items": total_items,
+        "has_next": offset_page < total_pages,
+        "has_prev": offset_page > 1
+    }
+
+
+# Main
+
+async def home(request):
+    return json_response({"message": "Backend is running ✅"})
+
+
+async def health(request):
+    return json_response({"status": "ok"})
+
+
+# Auth
+
+async def register(request):
+    flask_app = request.app.state.flask_app
+    data = await read_json(request)
+    if not data:
+        return json_response({"error": "No JSON data provided"}, 400)
+    email = data.get("email")
+
+    async with request.app.state.sessions() as session:
+        if (await session.execute(db.select(UserShard.user_id).where(UserShard.email == email))).first():
+            return json_response({"error": "Email already exists"}, 400)
+        try:
+            password_hash = await in_thread(flask_app, password_hasher.hash, data.get("password"))
+        except HashingBusy as e:
+            return flask_error_response(flask_app, e)
+        # As ShardRouter.add_user, on the only shard: the directory entry claims the email and the id
+        entry = UserShard(email=email, shard=0, moving=False)
+        session.add(entry)
+        try:
+            await session.commit()
+        except IntegrityError:
+            return json_response({"error": "Email already exists"}, 400)
+        try:
+            session.add(User(id=entry.user_id, username=data.get("username"), email=email,
+                             password_hash=password_hash))
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            await session.execute(db.delete(UserShard).where(UserShard.user_id == entry.user_id))
+            await session.commit()
+            raise
+
+    return json_response({"message": "User registered successfully"}, 201)
+
+
+async def login(request):
+    flask_app = request.app.state.flask_app
+    data = await read_json(request)
+    if not data:
+        return json_response({"error": "No JSON data provided"}, 400)
+    password = data.get("password")
+
+    async with request.app.state.sessions() as session:
+        user = (await session.execute(db.select(User).where(User.email == data.get("email")))).scalar_one_or_none()
+        try:
+            if not user or not await in_thread(flask_app, password_hasher.verify, user.password_hash, password):
+                return json_response({"error": "Invalid credentials"}, 401)
+
+            # Transparently move the stored hash to the current hash parameters
+            if in_app_context(flask_app, password_hasher.needs_rehash, user.password_hash):
+                user.password_hash = await in_thread(flask_app, password_hasher.hash, password)
+                await session.commit()
+        except HashingBusy as e:
+            return flask_error_response(flask_app, e)
+
+        token = in_app_context(flask_app, create_access_token, str(user.id))
+    return json_response({"access_token": token})
+
+
+@jwt_required
+async def profile(request):
+    user = request.state.user
+    return json_response({"id": user.id, "username": user.username, "email": user.email})
+
+
+# Goals
+
+async def _after_write(request, user_id, rewrites_history=False):
+    """Invalidate the user's cached responses (and analytics) once a write has committed"""
+    flask_app = request.app.state.flask_app
+    await in_thread(flask_app, response_cache.bump, user_id)
+    if rewrites_history:
+        await in_thread(flask_app, analytics.invalidate, user_id)
+
+
+@jwt_required
+async def add_goal(request):
+    try:
+        user_id = request.state.user.id
+
+        data = await read_json(request)
+        if not data:
+            return json_response({"error": "No JSON data provided"}, 400)
+
+        values, error = parse_new_goal(data)
+        if error:
+            return json_response({"error": error}, 400)
+        await in_thread(request.app.state.flask_app, goal_dictionaries.register, [values])
+
+        # Save the goal and keep the per-user counters in the same transaction
+        async with request.app.state.sessions() as session:
+            new_goal = Goal(user_id=user_id, **values)
+            session.add(new_goal)
+            await record_change(session, user_id, after=(False, new_goal.end_date))
+            await session.commit()
+        await _after_write(request, user_id)
+
+        return json_response({
+            "message": "Goal created successfully",
+            "goal": new_goal.to_dict()
+        }, 201)
+
+    except Exception as e:
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+@jwt_required
+async def get_all_goals(request):
+    try:
+        user_id = request.state.user.id
+        args = request.query_params
+
+        page = int(args.get('page', 1))
+        per_page = int(args.get('per_page', 10))
+        sort_by = args.get('sort_by', 'created_at')
+        sort_order = args.get('sort_order', 'desc')
+
+        try:
+            fields = parse_fields(args.get('fields'))
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        sort_field = sort_by if sort_by in SORT_KEYS else 'created_at'
+        sort_key = SORT_KEYS[sort_field]
+        await in_thread(request.app.state.flask_app, goal_dictionaries.resolve, args)
+        query = db.select(*goal_columns(fields, extra=('id', sort_field))).where(
+            Goal.user_id == user_id, *goal_filters(args)
+        )
+        id_column = Goal.id
+        if archive.includes_archive(args):
+            all_goals, adapt = archive.with_archive(query)
+            query, sort_key, id_column = db.select(*all_goals.c), adapt(sort_key), adapt(Goal.id)
+
+        async with request.app.state.sessions() as session:
+            try:
+                goals, pagination = await paginated_rows(session, args, query, sort_field, sort_key, sort_order,
+                                                         page, per_page, id_column)
+            except ValueError as e:
+                return json_response({"error": str(e)}, 400)
+            statistics = await goal_statistics(session, user_id)
+
+        return json_response({
+            "goals": rows_to_dicts(goals, fields),
+            "pagination": pagination,
+            "statistics": statistics,
+            "filters_applied": {
+                "goal_type": args.get('goal_type'),
+                "priority": args.get('priority'),
+                "category": args.get('category'),
+                "is_completed": args.get('is_completed'),
+                "sort_by": sort_by,
+                "sort_order": sort_order
+            }
+        })
+
+    except Exception as e:
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+@jwt_required
+async def get_goal(request):
+    try:
+        user_id = request.state.user.id
+        goal_id = request.path_params['goal_id']
+
+        try:
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        query = db.select(*goal_columns(fields), Goal.version).where(Goal.id == goal_id, Goal.user_id == user_id)
+        async with request.app.state.sessions() as session:
+            row = (await session.execute(query)).first()
+            if not row:
+                row = (await session.execute(archive.archived(query))).first()
+        if not row:
+            return json_response({"error": "Goal not found"}, 404)
+
+        response = json_response({"goal": rows_to_dicts([row], fields)[0]})
+        response.headers['ETag'] = f'"{goal_etag(row[-1])}"'
+        return response
+
+    except Exception as e:
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+@jwt_required
+async def update_goal(request):
+    try:
+        user_id = request.state.user.id
+        goal_id = request.path_params['goal_id']
+
+        data = await read_json(request)
+        if data is None:
+            return json_response({"error": "No JSON data provided"}, 400)
+        changes, error = parse_goal_changes(data)
+        if error:
+            return json_response({"error": error}, 400)
+        if not dates_in_order(changes.get('start_date'), changes.get('end_date')):
+            return json_response({"error": "End date must be on or after start date"}, 400)
+        await in_thread(request.app.state.flask_app, goal_dictionaries.register, [changes])
+
+        versions = if_match_versions(parse_etags(request.headers.get('if-match')))
+        conditions = goal_write_conditions(goal_id, user_id, versions, changes)
+        async with request.app.state.sessions() as session:
+            before_query, statement = goal_update_statements(conditions, changes, request.app.state.engine.dialect.name)
+
+            async def write():
+                before = (await session.execute(before_query)).first() if before_query is not None else None
+                if before_query is not None and before is None:
+                    return None, None
+                return (await session.execute(statement, execution_options={'synchronize_session': False})).first(), before
+
+            row, before = await write()
+            if row is None and await restore(session, user_id, [goal_id]):
+                row, before = await write()
+            if row is None:
+                await session.rollback()
+                current = (await session.execute(current_goal_query(goal_id, user_id))).first()
+                error, status = rejected_write(current, versions, changes)
+                return json_response({"error": error}, status)
+            goal, before = row[0], tuple(row[1:]) or before
+
+            if before is not None:
+                await record_change(session, user_id, before=tuple(before), after=(goal.is_completed, goal.end_date))
+            await session.commit()
+        await _after_write(request, user_id, rewrites_history=bool(analytics.HISTORY_FIELDS.intersection(changes)))
+
+        response = json_response({
+            "message": "Goal updated successfully",
+            "goal": goal.to_dict()
+        })
+        response.headers['ETag'] = f'"{goal_etag(goal.version)}"'
+        return response
+
+    except Exception as e:
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+@jwt_required
+async def delete_goal(request):
+    try:
+        user_id = request.state.user.id
+        goal_id = request.path_params['goal_id']
+
+        versions = if_match_versions(parse_etags(request.headers.get('if-match')))
+        statement = goal_delete_statement(goal_write_conditions(goal_id, user_id, versions))
+        async with request.app.state.sessions() as session:
+            row = (await session.execute(statement, execution_options={'synchronize_session': False})).first()
+            if row is None and await restore(session, user_id, [goal_id]):
+                row = (await session.execute(statement, execution_options={'synchronize_session': False})).first()
+            if row is None:
+                await session.rollback()
+                error, status = rejected_write((await session.execute(current_goal_query(goal_id, user_id))).first(),
+                                               versions)
+                return json_response({"error": error}, status)
+
+            await record_change(session, user_id, before=tuple(row))
+            await session.execute(db.insert(GoalTombstone), GoalTombstone.rows(user_id, [goal_id]))
+            await session.commit()
+        await _after_write(request, user_id, rewrites_history=True)
+
+        return json_response({"message": "Goal deleted successfully"})
+
+    except Exception as e:
+        return json_response({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+routes = [
+    Route("/", home, name="main_bp.home"),
+    Route("/health", health, name="main_bp.health"),
+    Route("/auth/register", register, methods=["POST"], name="auth_bp.register"),
+    Route("/auth/login", login, methods=["POST"], name="auth_bp.login"),
+    Route("/auth/profile", profile, methods=["GET"], name="auth_bp.profile"),
+    Route("/api/add/goal", add_goal, methods=["POST"], name="goals.add_goal"),
+    Route("/api/goals", get_all_goals, methods=["GET"], name="goals.get_all_goals"),
+    Route("/api/goal/{goal_id:int}", get_goal, methods=["GET"], name="goals.get_goal"),
+    Route("/api/goal/{goal_id:int}", update_goal, methods=["PUT"], name="goals.update_goal"),
+    Route("/api/goal/{goal_id:int}", delete_goal, methods=["DELETE"], name="goals.delete_goal"),
+]
+
+
+class RateLimitMiddleware:
+    """IP limits and in-flight admission, as the Flask app's ``before_request`` does them.
+
+    Stores the matched route's name as ``request.state.endpoint`` for the user
+    limits checked in ``load_user``.
+    """
+
+    def __init__(self, app, flask_app):
+        self.app = app
+        self.flask_app = flask_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        endpoint = next((route.name for route in routes if route.matches(scope)[0] == Match.FULL), None)
+        if endpoint is None:
+            # Served by the mounted Flask app, whose before_request applies the same limits
+            return await self.app(scope, receive, send)
+        scope.setdefault('state', {})['endpoint'] = endpoint
+        headers = dict(scope['headers'])
+        forwarded_for = headers.get(b'x-forwarded-for', b'').decode('latin-1')
+        try:
+            rate_limiter.check('ip', client_ip(scope['client'][0] if scope.get('client') else None,
+                                               forwarded_for, rate_limiter.proxy_hops), endpoint)
+            admitted = rate_limiter.admit(endpoint)
+        except (RateLimited, Overloaded) as e:
+            return await flask_error_response(self.flask_app, e)(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if admitted:
+                rate_limiter.release()
+
+
+def create_async_app(config_name=None):
+    """ASGI app serving the core endpoints with an async database engine"""
+    flask_app = create_app(config_name)
+    if shard_router.sharded:
+        raise RuntimeError("The async app serves a single database; serve run:app when shards are configured")
+    database_url = flask_app.config['SQLALCHEMY_DATABASE_URI']
+    engine = create_async_engine(async_database_url(database_url), **async_engine_options(database_url))
+
+    async def startup():
+        await load_dictionaries(flask_app)
+        app.state.reloader = asyncio.create_task(reload_dictionaries(flask_app))
+
+    async def shutdown():
+        app.state.reloader.cancel()
+        await engine.dispose()
+
+    app = Starlette(
+        # Endpoints without a native version fall through to the Flask app
+        routes=[*routes, Mount('/', app=WSGIMiddleware(flask_app))],
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+                    Middleware(RateLimitMiddleware, flask_app=flask_app)],
+        on_startup=[startup],
+        on_shutdown=[shutdown]
+    )
+    app.state.flask_app = flask_app
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    return app
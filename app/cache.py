@@ -0,0 +1,179 @@
+# app/cache.py
+"""
+Per-user versioned response cache for goal reads.
+
+Cached responses are keyed on (user id, user version, path, normalized query
+args). Every goal write bumps the user's version after it commits, which makes
+all of that user's cached responses unreachable at once - nothing has to be
+deleted. Responses carry a strong ETag, so a client polling with If-None-Match
+gets a 304 without the view (or the database) being touched.
+
+Backends:
+- ``LRUBackend``: bounded in-process LRU. Versions live in the worker process,
+  so it is only accepted when ``SERVING_WORKERS`` is 1: with more workers, a
+  write bumps one process's version and the others keep serving stale pages.
+- ``SharedBackend``: wraps any client with redis-py's ``get``/``set``/``incr``
+  so all workers share entries and versions.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response
+from flask_jwt_extended import current_user
+
+
+class LRUBackend:
+    """Bounded in-process LRU store; version counters are kept outside the LRU so they are never evicted"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class SharedBackend:
+    """Store shared by all workers, on top of a redis-py compatible client"""
+
+    def __init__(self, client, prefix='sssb:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix='sssb:'):
+        import redis  # optional dependency, only needed for the shared backend
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    """Flask extension caching GET responses of JWT-protected views per user"""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GOAL_CACHE_ENABLED', True)
+        app.config.setdefault('GOAL_CACHE_BACKEND', 'lru')  # lru, redis, or a backend instance
+        app.config.setdefault('GOAL_CACHE_MAX_ENTRIES', 4096)
+        app.config.setdefault('GOAL_CACHE_TTL', 300)
+        app.config.setdefault('GOAL_CACHE_REDIS_URL', None)
+        app.config.setdefault('SERVING_WORKERS', 1)
+
+        backend = app.config['GOAL_CACHE_BACKEND']
+        if backend == 'lru' and app.config['GOAL_CACHE_ENABLED'] and app.config['SERVING_WORKERS'] > 1:
+            raise ValueError(f"GOAL_CACHE_BACKEND=lru is per process but {app.config['SERVING_WORKERS']} workers "
+                             "serve the app; use GOAL_CACHE_BACKEND=redis or GOAL_CACHE_ENABLED=false")
+        if backend == 'lru':
+            backend = LRUBackend(app.config['GOAL_CACHE_MAX_ENTRIES'])
+        elif backend == 'redis':
+            backend = SharedBackend.from_url(app.config['GOAL_CACHE_REDIS_URL'])
+        self.backend = backend
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def _version_key(user_id):
+        return f'goals:version:{user_id}'
+
+    def version(self, user_id):
+        return self.backend.get_counter(self._version_key(user_id))
+
+    def bump(self, user_id):
+        """Invalidate every cached response of a user; call after the write has committed"""
+        if self.backend is not None and current_app.config['GOAL_CACHE_ENABLED']:
+            self.backend.incr(self._version_key(user_id))
+
+    def _entry_key(self, user_id):
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        # The day is part of the key because overdue counters and flags change at midnight
+        today = time.strftime('%Y-%m-%d', time.gmtime())
+        return f'goals:response:{user_id}:{self.version(user_id)}:{today}:{request.path}?{args}'
+
+    def cached(self, view):
+        """Decorator for JWT-protected GET views (apply below ``@jwt_required()``)"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.backend is None or not current_app.config['GOAL_CACHE_ENABLED']:
+                return view(*args, **kwargs)
+
+            key = self._entry_key(current_user.id)
+            entry = self.backend.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                # Views may tag the response themselves (e.g. with a row version)
+                etag = response.get_etag()[0] or hashlib.sha256(body).hexdigest()[:32]
+                entry = (etag, body, response.mimetype)
+                self.backend.set(key, entry, ttl=current_app.config['GOAL_CACHE_TTL'])
+
+            etag, body, mimetype = entry
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(body, status=200, mimetype=mimetype)
+            response.set_etag(etag)
+            # Clients may keep the response but must revalidate it; it is per user
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Authorization')
+            return response
+        return wrapper
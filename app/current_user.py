@@ -0,0 +1,99 @@
+# app/current_user.py
+"""
+Authenticated-user resolution for JWT-protected routes.
+
+Registers Flask-JWT-Extended's user lookup hooks so every protected route gets
+``flask_jwt_extended.current_user`` - a small ``CurrentUser(id, username, email)``
+projection - without parsing the identity itself. Projections are kept in a
+TTL + LRU cache, so most authenticated requests never touch the users table.
+ORM updates and deletes of a user evict it after commit; other processes see
+the change within ``USER_CACHE_TTL`` seconds. Per-user rate limits are checked
+here too, before the lookup (see ``app/ratelimit.py``).
+"""
+from collections import namedtuple
+from flask import current_app, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .cache import LRUBackend
+
+CurrentUser = namedtuple('CurrentUser', ['id', 'username', 'email'])
+
+
+class UserResolver:
+    """Flask extension wiring the JWT user lookup to a cached user projection"""
+
+    def __init__(self, app=None, jwt=None):
+        self.cache = None
+        if app is not None:
+            self.init_app(app, jwt)
+
+    def init_app(self, app, jwt):
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 10000)
+        self.cache = LRUBackend(app.config['USER_CACHE_MAX_ENTRIES'])
+        app.extensions['user_resolver'] = self
+
+        jwt.user_lookup_loader(self._lookup)
+        jwt.user_lookup_error_loader(self._lookup_error)
+
+        from .models import User
+        for target, name, listener in ((User, 'after_update', self._mark_changed),
+                                       (User, 'after_delete', self._mark_changed),
+                                       (Session, 'after_commit', self._evict_changed)):
+            if not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+
+    @staticmethod
+    def _key(user_id):
+        return f'user:{user_id}'
+
+    def cached(self, user_id):
+        """Cached projection of a user, or None"""
+        return self.cache.get(self._key(user_id))
+
+    def remember(self, user, ttl):
+        self.cache.set(self._key(user.id), user, ttl=ttl)
+
+    def load(self, user_id):
+        """Projection of a user by id, from the cache or with one narrow query"""
+        user = self.cached(user_id)
+        if user is None:
+            from .extensions import db
+            from .models import User
+            row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+            if row is None:
+                return None
+            user = CurrentUser(*row)
+            self.remember(user, current_app.config['USER_CACHE_TTL'])
+        return user
+
+    def invalidate(self, user_id):
+        if self.cache is not None:
+            self.cache.delete(self._key(user_id))
+
+    def _lookup(self, jwt_header, jwt_data):
+        try:
+            user_id = int(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+        except (KeyError, ValueError, TypeError):
+            return None
+        from .extensions import rate_limiter, shard_router
+        # Before the user is loaded, so a throttled client costs no query
+        rate_limiter.check('user', user_id, request.endpoint)
+        # Later queries of this request go to the user's shard
+        if not shard_router.select_user(user_id):
+            return None
+        return self.load(user_id)
+
+    @staticmethod
+    def _lookup_error(jwt_header, jwt_data):
+        return jsonify({"error": "User not found"}), 404
+
+    def _mark_changed(self, mapper, connection, target):
+        # Evict now and again once the transaction commits, so a concurrent
+        # request can't re-cache the old row in between
+        self.invalidate(target.id)
+        Session.object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+    def _evict_changed(self, session):
+        for user_id in session.info.pop('changed_user_ids', ()):
+            self.invalidate(user_id)
@@ -0,0 +1,205 @@
+# app/dictionaries.py
+"""
+Compact storage of goal priorities, types and categories.
+
+``goals`` (and ``goals_archive``) store small integers instead of repeating the
+strings on every row:
+- ``priority_rank``: 1 (low), 2 (medium) or 3 (high), so ordering by it is the
+  priority order and a ``(user_id, priority_rank, id)`` index serves the sort
+- ``goal_type_id`` / ``category_id``: ids into the lookup tables ``goal_types``
+  and ``goal_categories``
+
+The column types translate in both directions, so models, queries and JSON keep
+using the names: ``Goal.category == 'fitness'`` binds the id and a loaded goal's
+``category`` is ``'fitness'``.
+
+The lookup tables are global and live on the primary database (like
+``user_shards``), so an id means the same on every shard and moving a user
+copies it unchanged. Entries are never renamed or removed, so each process
+caches them without expiry; a name or id it has not seen yet costs one lookup
+on the primary. A name that is not registered is remembered as missing for
+``DICTIONARY_MISS_TTL`` seconds, so filtering by it does not query every time.
+
+The async app must not query from its event loop: it loads both tables whole
+when it starts and again every ``DICTIONARY_REFRESH_INTERVAL`` seconds, and
+looks up filter names (``resolve``) and registers names on its thread pool.
+
+A name has to be registered before a goal is written with it: write paths call
+``goal_dictionaries.register(values)`` before their first write. Missing names
+are added in a short transaction of their own on the primary (an entry left
+unused by a failed write is harmless). Filters check ``id_for`` first, since a
+name nobody registered matches no goal.
+"""
+import threading
+import time
+import sqlalchemy as sa
+from flask import has_app_context
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.types import TypeDecorator
+
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITY_RANKS.items()}
+
+# Missing names remembered per dictionary; beyond this the list starts over
+MAX_MISSING = 1024
+
+# INSERT ... ON CONFLICT DO NOTHING of each supported backend
+_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+class PriorityRank(TypeDecorator):
+    """A priority name stored as its rank (1 low, 2 medium, 3 high)"""
+    impl = sa.SmallInteger
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return str
+
+    def process_bind_param(self, value, dialect):
+        # Ranks pass through (pagination cursors carry them)
+        if value is None or isinstance(value, int):
+            return value
+        return PRIORITY_RANKS[value]
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else PRIORITY_NAMES[value]
+
+
+class DictionaryName(TypeDecorator):
+    """A name stored as its id in a ``Dictionary``'s lookup table"""
+    impl = sa.Integer
+    cache_ok = True
+
+    def __init__(self, dictionary):
+        super().__init__()
+        self.dictionary = dictionary
+
+    @property
+    def python_type(self):
+        return str
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        entry_id = self.dictionary.id_for(value)
+        if entry_id is None:
+            raise LookupError(f"{value!r} is not registered in {self.dictionary.table.name}")
+        return entry_id
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.dictionary.name_for(value)
+
+
+class Dictionary:
+    """One ``(id, name)`` lookup table on the primary, cached in both directions"""
+
+    def __init__(self, table_name):
+        self.table = sa.table(table_name, sa.column('id', sa.Integer), sa.column('name', sa.String))
+        self.app = None
+        self.miss_ttl = 5
+        self._ids = {}
+        self._names = {}
+        self._missing = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._ids, self._names, self._missing = {}, {}, {}
+
+    def _engine(self):
+        from .extensions import db
+        if has_app_context():
+            return db.engine
+        # Async request handlers run without an app context
+        with self.app.app_context():
+            return db.engine
+
+    def _remember(self, rows):
+        with self._lock:
+            for entry_id, name in rows:
+                self._ids[name] = entry_id
+                self._names[entry_id] = name
+                self._missing.pop(name, None)
+
+    def _load(self, condition):
+        with self._engine().connect() as conn:
+            rows = conn.execute(sa.select(self.table.c.id, self.table.c.name).where(condition)).all()
+        self._remember(rows)
+        return rows
+
+    def load(self):
+        """Cache every entry of the table"""
+        self._load(sa.true())
+
+    def id_for(self, name):
+        """Id of ``name``, or None if it is not registered (rechecked after ``miss_ttl`` seconds)"""
+        entry_id = self._ids.get(name)
+        if entry_id is not None or self._missing.get(name, 0) > time.monotonic():
+            return entry_id
+        if self._load(self.table.c.name == name):
+            return self._ids[name]
+        with self._lock:
+            if len(self._missing) >= MAX_MISSING:
+                self._missing.clear()
+            self._missing[name] = time.monotonic() + self.miss_ttl
+        return None
+
+    def name_for(self, entry_id):
+        name = self._names.get(entry_id)
+        if name is None:
+            if not self._load(self.table.c.id == entry_id):
+                raise LookupError(f"No entry {entry_id} in {self.table.name}")
+            name = self._names[entry_id]
+        return name
+
+    def register(self, names):
+        """Add the names missing from the lookup table (committed right away)"""
+        missing = sorted({name for name in names if name not in self._ids})
+        if not missing:
+            return
+        with self._engine().begin() as conn:
+            insert = _INSERTS[conn.dialect.name](self.table)
+            conn.execute(insert.on_conflict_do_nothing(index_elements=['name']), [{'name': name} for name in missing])
+            rows = conn.execute(
+                sa.select(self.table.c.id, self.table.c.name).where(self.table.c.name.in_(missing))
+            ).all()
+        self._remember(rows)
+
+
+class GoalDictionaries:
+    """Flask extension holding the ``goal_type`` and ``category`` dictionaries"""
+
+    def __init__(self, app=None):
+        self.goal_type = Dictionary('goal_types')
+        self.category = Dictionary('goal_categories')
+        self.fields = {'goal_type': self.goal_type, 'category': self.category}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DICTIONARY_MISS_TTL', 5)  # seconds a name is known to be missing
+        app.config.setdefault('DICTIONARY_REFRESH_INTERVAL', 30)  # async app: seconds between reloads
+        app.extensions['goal_dictionaries'] = self
+        for dictionary in self.fields.values():
+            # Ids belong to one database; a new app may use another one
+            dictionary.clear()
+            dictionary.app = app
+            dictionary.miss_ttl = app.config['DICTIONARY_MISS_TTL']
+
+    def load(self):
+        """Cache every entry of both dictionaries"""
+        for dictionary in self.fields.values():
+            dictionary.load()
+
+    def resolve(self, args):
+        """Look up the goal type and category filter names of request args, so ``goal_filters`` hits the cache"""
+        for field, dictionary in self.fields.items():
+            if args.get(field):
+                dictionary.id_for(args[field])
+
+    def register(self, rows):
+        """Register the goal types and categories of goal values or changes (dicts) before they are written"""
+        rows = list(rows)
+        for field, dictionary in self.fields.items():
+            dictionary.register({row[field] for row in rows if isinstance(row.get(field), str)})
@@ -1,7 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from .cache import ResponseCache
+from .hashing import PasswordHasher
+from .current_user import UserResolver
+from .dictionaries import GoalDictionaries
+from .instrumentation import Instrumentation
+from .jobs import JobRunner
+from .ratelimit import RateLimiter
+from .replicas import ReplicaRouter, RoutingSession
+from .sharding import ShardRouter
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+user_resolver = UserResolver()
+instrumentation = Instrumentation()
+rate_limiter = RateLimiter()
+job_runner = JobRunner()
+replica_router = ReplicaRouter()
+shard_router = ShardRouter()
+goal_dictionaries = GoalDictionaries()
 # CORS is a function, no need to instantiate
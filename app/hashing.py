@@ -0,0 +1,129 @@
+# app/hashing.py
+"""
+Password hashing on a bounded worker pool.
+
+Hashing a password costs hundreds of milliseconds of CPU by design. Instead of
+running it on the request thread, ``PasswordHasher`` sends it to a small
+process pool, so a burst of logins can use at most ``PASSWORD_HASH_WORKERS``
+cores per web worker and cheap requests keep flowing. At most
+``PASSWORD_HASH_MAX_PENDING`` hashes may be queued or running; beyond that a
+request waits ``PASSWORD_HASH_QUEUE_TIMEOUT`` seconds for a slot and then fails
+fast with 503 + Retry-After instead of piling up. If a pool process dies (OOM
+kill, crash), the broken pool is replaced and the hash is retried once.
+
+``PASSWORD_HASH_METHOD`` / ``PASSWORD_HASH_SALT_LENGTH`` are Werkzeug's
+``generate_password_hash`` parameters. Hashes made with other parameters keep
+working and are upgraded on the next successful login (see ``needs_rehash``).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+# Pool children are started by a clean server process, not forked from a
+# (multi-threaded) web worker whose locks another thread may be holding
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Werkzeug's defaults for parameters left out of a method string
+_DEFAULT_PARAMS = {'pbkdf2': ['sha256', '600000'], 'scrypt': ['32768', '8', '1']}
+
+
+def canonical_method(method):
+    """Method string with all parameters spelled out, as Werkzeug writes it into hashes"""
+    name, *params = method.split(':')
+    defaults = _DEFAULT_PARAMS.get(name, [])
+    return ':'.join([name] + params + defaults[len(params):])
+
+
+class HashingBusy(Exception):
+    """All hashing slots are taken; the request should be retried later"""
+
+
+class PasswordHasher:
+    """Flask extension running Werkzeug password hashing on a process pool"""
+
+    def __init__(self, app=None):
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        app.config.setdefault('PASSWORD_HASH_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 2 * app.config['PASSWORD_HASH_WORKERS'])
+        app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 0.1)
+        app.config.setdefault('PASSWORD_HASH_INLINE', False)  # hash on the request thread (no pool)
+
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+        app.extensions['password_hasher'] = self
+        app.register_error_handler(HashingBusy, self._busy_response)
+
+    @staticmethod
+    def _busy_response(error):
+        return jsonify({"error": "Server is busy, please retry"}), 503, {'Retry-After': '1'}
+
+    def _executor(self):
+        # Pools don't survive fork; gunicorn workers each build their own after forking
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=current_app.config['PASSWORD_HASH_WORKERS'],
+                                                 mp_context=multiprocessing.get_context(POOL_START_METHOD))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _discard(self, pool):
+        """Drop a broken pool (a child died) so the next call starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        config = current_app.config
+        if config['PASSWORD_HASH_INLINE']:
+            return func(*args)
+        if not self._slots.acquire(timeout=config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+            raise HashingBusy()
+        try:
+            for attempt in range(2):
+                pool = self._executor()
+                try:
+                    return pool.submit(func, *args).result()
+                except BrokenProcessPool:
+                    self._discard(pool)
+                    if attempt:
+                        raise
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        config = current_app.config
+        return self._run(generate_password_hash, password,
+                         config['PASSWORD_HASH_METHOD'], config['PASSWORD_HASH_SALT_LENGTH'])
+
+    def verify(self, pw_hash, password):
+        return self._run(check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """Whether a stored hash was made with other parameters than the configured ones"""
+        try:
+            method, salt, _ = pw_hash.split('$', 2)
+        except ValueError:
+            return True
+        config = current_app.config
+        return (method != canonical_method(config['PASSWORD_HASH_METHOD'])
+                or len(salt) != config['PASSWORD_HASH_SALT_LENGTH'])
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,174 @@
+# app/importer.py
+"""
+Streaming bulk import of goals from CSV or NDJSON uploads.
+
+The upload is parsed record by record straight from the request stream. Valid
+goals are buffered into chunks of ``IMPORT_CHUNK_SIZE`` rows, and each chunk
+is written in one statement and committed with its statistics delta:
+- Postgres: ``COPY goals FROM STDIN`` on the user's shard, with ids from one
+  block reserved per chunk (COPY skips the ``id_blocks`` column default)
+- other databases: a multi-row ``INSERT``
+
+Invalid records are reported by line number and skipped; they never abort the
+rest of the file. A dry run validates everything and writes nothing.
+"""
+import csv
+import io
+import json
+import time
+from datetime import date, datetime
+from .dictionaries import DictionaryName, PriorityRank
+from .extensions import db, goal_dictionaries, shard_router
+from .models import Goal, GoalStats
+
+IMPORT_CHUNK_SIZE = 1000
+# Per-row errors listed in the response; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+COPY_FIELDS = ('id', 'goal_title', 'description', 'goal_type', 'priority', 'category', 'start_date', 'end_date',
+               'user_id', 'created_at', 'updated_at', 'is_completed', 'completion_date')
+
+
+class UploadError(ValueError):
+    """The upload cannot be read any further (bad encoding or CSV structure)"""
+
+
+def _text(stream):
+    # utf-8-sig drops the byte order mark spreadsheet programs put in front of CSV files
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def read_csv(stream):
+    """``(line, record, error)`` for each data row of a CSV upload with a header line"""
+    reader = csv.DictReader(_text(stream))
+    try:
+        for record in reader:
+            yield reader.line_num, record, None
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise UploadError(f"Could not read CSV at line {reader.line_num + 1}: {e}")
+
+
+def read_ndjson(stream):
+    """``(line, record, error)`` for each non-blank line of an NDJSON upload"""
+    line_number = 0
+    try:
+        for line_number, line in enumerate(_text(stream), 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError:
+                yield line_number, None, "Invalid JSON"
+    except UnicodeDecodeError as e:
+        raise UploadError(f"Could not read NDJSON at line {line_number + 1}: {e}")
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def copy_goals(rows):
+    """Write goal rows with ``COPY ... FROM STDIN`` on the session's connection (Postgres)"""
+    # The user's shard, as the ORM would route an INSERT into goals
+    connection = db.session.connection(bind_arguments={'mapper': Goal.__mapper__})
+    ids = shard_router.allocate_many(connection, 'goals', len(rows))
+    rows = [dict(row, id=goal_id) for row, goal_id in zip(rows, ids)]
+    columns = [Goal.__mapper__.columns[field] for field in COPY_FIELDS]
+    # COPY bypasses the column types: priorities, goal types and categories are encoded here
+    encoders = {field: column.type for field, column in zip(COPY_FIELDS, columns)
+                if isinstance(column.type, (PriorityRank, DictionaryName))}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows([
+        _copy_value(encoders[field].process_bind_param(row[field], connection.dialect) if field in encoders else row[field])
+        for field in COPY_FIELDS
+    ] for row in rows)
+    buffer.seek(0)
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY goals ({', '.join(column.name for column in columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+
+
+def insert_goals(rows):
+    """Write a chunk of goal rows in one statement"""
+    if db.session.get_bind(mapper=Goal.__mapper__).dialect.name == 'postgresql':
+        copy_goals(rows)
+    else:
+        db.session.execute(db.insert(Goal), rows)
+
+
+class GoalImport:
+    """One import run for a user; ``summary`` and ``errors`` fill in as records are processed"""
+
+    def __init__(self, user_id, validate, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        self.user_id = user_id
+        self.validate = validate
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.summary = {'rows': 0, 'valid': 0, 'imported': 0, 'failed': 0}
+        self.errors = []
+        self.elapsed = 0.0
+        self._as_of = None
+
+    def _fail(self, line, error):
+        self.summary['failed'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def _flush(self, rows):
+        if not rows or self.dry_run:
+            return
+        goal_dictionaries.register(rows)
+        insert_goals(rows)
+        # New goals are pending, so only the total and the overdue counter move
+        overdue = sum(GoalStats.delta(self._as_of, None, (False, row['end_date']))[2] for row in rows)
+        GoalStats.apply_delta(self.user_id, total=len(rows), overdue=overdue)
+        db.session.commit()
+        self.summary['imported'] += len(rows)
+
+    def run(self, records):
+        """Validate and write ``(line, record, error)`` triples; returns ``self``"""
+        started = time.perf_counter()
+        stats = db.session.get(GoalStats, self.user_id)
+        self._as_of = stats.overdue_as_of if stats else None
+
+        chunk = []
+        try:
+            for line, record, error in records:
+                self.summary['rows'] += 1
+                values = None
+                if error is None:
+                    if isinstance(record, dict):
+                        values, error = self.validate(record)
+                    else:
+                        error = "Goal must be an object"
+                if error:
+                    self._fail(line, error)
+                    continue
+
+                self.summary['valid'] += 1
+                now = datetime.utcnow()
+                chunk.append(dict(values, user_id=self.user_id, created_at=now, updated_at=now,
+                                  is_completed=False, completion_date=None))
+                if len(chunk) >= self.chunk_size:
+                    self._flush(chunk)
+                    chunk = []
+            self._flush(chunk)
+        finally:
+            self.elapsed = time.perf_counter() - started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.summary['rows'] / self.elapsed, 1) if self.elapsed else None
@@ -0,0 +1,260 @@
+# app/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+Every request's latency goes into a per-endpoint histogram (two clock reads and
+a dict update). A sample of requests, ``INSTRUMENTATION_SAMPLE_RATE``, is
+traced in detail:
+- SQL statement count and database time, from SQLAlchemy cursor events
+- JSON serialization time (``serializers.dumps`` and ``jsonify``)
+- a ``Server-Timing`` header (``app``, ``db``, ``serialize``), readable in
+  browser dev tools and by benchmarks
+- a warning log with each statement's SQL and duration when the request took
+  longer than ``SLOW_REQUEST_MS``
+
+Unsampled requests skip all of this; the cursor event hooks return at once.
+
+``/metrics`` renders everything in the Prometheus text format. Metrics are kept
+per process, so with several gunicorn workers each scrape sees one worker.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, Prometheus' defaults plus a finer low end for fast endpoints
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Statements kept per traced request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+
+_trace = ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Timings collected for one sampled request"""
+
+    __slots__ = ('statements', 'sql_count', 'sql_time', 'serialize_time', 'keep_sql')
+
+    def __init__(self, keep_sql):
+        self.statements = []
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.keep_sql = keep_sql
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _trace.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _trace.get()
+    if trace is None:
+        return
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    trace.sql_count += 1
+    trace.sql_time += elapsed
+    if trace.keep_sql and len(trace.statements) < MAX_LOGGED_STATEMENTS:
+        trace.statements.append((elapsed, statement))
+
+
+@contextmanager
+def serialization_timer():
+    """Count the time spent in the block as the current request's serialization time"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.serialize_time += time.perf_counter() - started
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, counting ``jsonify`` encoding as serialization time"""
+
+    def dumps(self, obj, **kwargs):
+        with serialization_timer():
+            return super().dumps(obj, **kwargs)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def samples(self):
+        """``(le, cumulative count)`` pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield _format_number(bound), total
+        yield '+Inf', self.count
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Instrumentation:
+    """Flask extension recording request, SQL and serialization timings"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._latency = {}
+        self._db_time = {}
+        self._serialize_time = {}
+        self._statements = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('INSTRUMENTATION_SAMPLE_RATE', 1.0)  # 0 turns detailed tracing off
+        app.config.setdefault('SERVER_TIMING_HEADER', True)
+        app.config.setdefault('SLOW_REQUEST_MS', 500)  # 0 disables the slow-request log
+        app.extensions['instrumentation'] = self
+
+        if type(app.json) is DefaultJSONProvider:
+            app.json = TimedJSONProvider(app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._clear)
+
+        for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                               ('after_cursor_execute', _after_cursor_execute)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+    def _start(self):
+        request.environ['sssb.started'] = time.perf_counter()
+        config = current_app.config
+        rate = config['INSTRUMENTATION_SAMPLE_RATE']
+        if rate > 0 and (rate >= 1 or random.random() < rate):
+            request.environ['sssb.trace'] = _trace.set(RequestTrace(keep_sql=config['SLOW_REQUEST_MS'] > 0))
+
+    def _finish(self, response):
+        started = request.environ.get('sssb.started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        trace = _trace.get()
+        config = current_app.config
+
+        if config['METRICS_ENABLED']:
+            self._record(endpoint, request.method, response.status_code, elapsed, trace)
+
+        if trace is not None:
+            if config['SERVER_TIMING_HEADER']:
+                response.headers['Server-Timing'] = (
+                    f'app;dur={elapsed * 1000:.2f}, '
+                    f'db;dur={trace.sql_time * 1000:.2f};desc="{trace.sql_count} queries", '
+                    f'serialize;dur={trace.serialize_time * 1000:.2f}'
+                )
+            threshold = config['SLOW_REQUEST_MS']
+            if threshold and elapsed * 1000 >= threshold:
+                self._log_slow(endpoint, elapsed, trace)
+        return response
+
+    @staticmethod
+    def _clear(exc=None):
+        token = request.environ.pop('sssb.trace', None)
+        if token is not None:
+            _trace.reset(token)
+
+    @staticmethod
+    def _log_slow(endpoint, elapsed, trace):
+        lines = [f"Slow request: {request.method} {request.path} ({endpoint}) took {elapsed * 1000:.1f}ms, "
+                 f"{trace.sql_count} queries in {trace.sql_time * 1000:.1f}ms, "
+                 f"serialization {trace.serialize_time * 1000:.1f}ms"]
+        for duration, statement in trace.statements:
+            lines.append(f"  {duration * 1000:8.2f}ms  {' '.join(statement.split())}")
+        if trace.sql_count > len(trace.statements):
+            lines.append(f"  ... {trace.sql_count - len(trace.statements)} more statements")
+        logger.warning('\n'.join(lines))
+
+    def _record(self, endpoint, method, status, elapsed, trace):
+        key = (endpoint, method)
+        with self._lock:
+            count_key = (endpoint, method, status)
+            self._requests[count_key] = self._requests.get(count_key, 0) + 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+            self._latency[key].observe(elapsed)
+            if trace is not None:
+                if key not in self._db_time:
+                    self._db_time[key] = Histogram(LATENCY_BUCKETS)
+                    self._serialize_time[key] = Histogram(LATENCY_BUCKETS)
+                    self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._db_time[key].observe(trace.sql_time)
+                self._serialize_time[key].observe(trace.serialize_time)
+                self._statements[key].observe(trace.sql_count)
+
+    def reset(self):
+        with self._lock:
+            for store in (self._requests, self._latency, self._db_time, self._serialize_time, self._statements):
+                store.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        out = []
+        with self._lock:
+            out.append('# HELP sssb_http_requests_total Requests handled, by endpoint, method and status.')
+            out.append('# TYPE sssb_http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                out.append(f'sssb_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            for name, help_text, store in (
+                ('sssb_http_request_duration_seconds', 'Request latency, all requests.', self._latency),
+                ('sssb_db_duration_seconds', 'Time spent in SQL per request, sampled requests.', self._db_time),
+                ('sssb_serialization_duration_seconds', 'JSON encoding time per request, sampled requests.', self._serialize_time),
+                ('sssb_db_statements_per_request', 'SQL statements per request, sampled requests.', self._statements),
+            ):
+                out.append(f'# HELP {name} {help_text}')
+                out.append(f'# TYPE {name} histogram')
+                for (endpoint, method), histogram in sorted(store.items()):
+                    for le, count in histogram.samples():
+                        out.append(f'{name}_bucket{_labels(endpoint=endpoint, method=method, le=le)} {count}')
+                    labels = _labels(endpoint=endpoint, method=method)
+                    out.append(f'{name}_sum{labels} {_format_number(histogram.sum)}')
+                    out.append(f'{name}_count{labels} {histogram.count}')
+        return '\n'.join(out) + '\n'
@@ -0,0 +1,281 @@
+# app/jobs.py
+"""
+In-process background jobs, backed by the ``jobs`` table.
+
+No broker is needed. Each web worker process runs a ``JobRunner``: a
+dispatcher thread polls the table for due jobs and hands them to a small thread
+pool. A job is claimed with a conditional UPDATE (queued -> running), so
+several workers or processes can share one table and no job runs twice at once.
+
+    @job_runner.task('rebuild_stats', max_attempts=3)
+    def rebuild_stats(user_id):
+        ...
+
+    job = job_runner.enqueue('rebuild_stats', {'user_id': 1}, user_id=1)
+    db.session.commit()  # the job becomes visible with the transaction
+
+Tasks run inside an app context with their payload as keyword arguments, and
+return a JSON-serializable result. A task that raises is retried with
+exponential backoff until ``max_attempts`` is reached. A job still running
+after ``JOBS_LEASE_TIMEOUT`` seconds is assumed lost with its worker and is
+re-queued, so tasks should be idempotent and finish well within the lease.
+Periodic tasks are enqueued once per period across all workers.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownTask(LookupError):
+    """No task is registered under the job's name"""
+
+
+class JobRunner:
+    """Flask extension running queued jobs on a per-process thread pool"""
+
+    def __init__(self, app=None):
+        self.tasks = {}
+        self.periodic_tasks = {}
+        self.app = None
+        self._pid = None
+        self._executor = None
+        self._dispatcher = None
+        self._running = set()
+        self._periods = {}
+        self._reaped_at = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_ENABLED', True)  # run jobs in this process
+        app.config.setdefault('JOBS_WORKERS', 2)
+        app.config.setdefault('JOBS_POLL_INTERVAL', 1.0)
+        app.config.setdefault('JOBS_RETRY_BACKOFF', 2.0)  # seconds before the first retry, doubled after each
+        app.config.setdefault('JOBS_RETRY_BACKOFF_MAX', 300.0)
+        app.config.setdefault('JOBS_LEASE_TIMEOUT', 600)
+        app.config.setdefault('JOBS_RETENTION_DAYS', 7)  # finished jobs are purged after this
+        self.app = app
+        app.extensions['job_runner'] = self
+
+        if not event.contains(Session, 'after_commit', self._after_commit):
+            event.listen(Session, 'after_commit', self._after_commit)
+        # gunicorn may fork after create_app; make sure the serving process has its own threads
+        app.before_request(self.start)
+        self.start()
+
+    # Registration
+
+    def task(self, name, max_attempts=3):
+        """Decorator registering a function as the task ``name``"""
+        def register(func):
+            self.tasks[name] = (func, max_attempts)
+            return func
+        return register
+
+    def periodic(self, name, every):
+        """Enqueue the task ``name`` (without payload) once every ``every`` seconds"""
+        self.periodic_tasks[name] = every
+
+    # Enqueueing
+
+    def enqueue(self, name, payload=None, user_id=None, delay=0, max_attempts=None, dedupe_key=None):
+        """Add a job to the current session; it is picked up once the session commits"""
+        from .extensions import db
+        from .models import Job
+
+        if name not in self.tasks:
+            raise UnknownTask(name)
+        job = Job(
+            name=name,
+            payload=payload or {},
+            status='queued',
+            attempts=0,
+            max_attempts=max_attempts or self.tasks[name][1],
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+            user_id=user_id,
+            dedupe_key=dedupe_key,
+            created_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.flush()
+        db.session.info['jobs_enqueued'] = True
+        return job
+
+    def _after_commit(self, session):
+        if session.info.pop('jobs_enqueued', False):
+            self._wake.set()
+
+    # Runner
+
+    @property
+    def worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def start(self):
+        """Start the dispatcher and pool in this process (no-op if already running here)"""
+        if not self.app.config['JOBS_ENABLED'] or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = set()
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.app.config['JOBS_WORKERS'],
+                                                thread_name_prefix='job-worker')
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='job-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            self._dispatcher.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._pid = None
+
+    def _dispatch_loop(self):
+        config = self.app.config
+        last_error = None
+        while not self._stop.is_set():
+            self._wake.wait(config['JOBS_POLL_INTERVAL'])
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self.app.app_context():
+                    self.enqueue_periodic()
+                    # Leases are long, so checking for lost jobs now and then is enough
+                    if time.monotonic() - self._reaped_at > config['JOBS_LEASE_TIMEOUT'] / 10:
+                        self.requeue_expired()
+                        self._reaped_at = time.monotonic()
+                    for job_id in self.claim(config['JOBS_WORKERS'] - len(self._running)):
+                        self._running.add(job_id)
+                        self._executor.submit(self._execute, job_id)
+                last_error = None
+            except SQLAlchemyError as e:
+                # e.g. the jobs table does not exist until the migrations have run
+                if str(e) != last_error:
+                    logger.warning("Job dispatcher could not poll the jobs table: %s", e)
+                last_error = str(e)
+
+    def claim(self, limit):
+        """Mark up to ``limit`` due jobs as running by this worker; returns their ids"""
+        from .extensions import db
+        from .models import Job
+
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        candidates = db.session.scalars(
+            db.select(Job.id).where(Job.status == 'queued', Job.run_at <= now).order_by(Job.run_at).limit(limit)
+        ).all()
+        claimed = []
+        for job_id in candidates:
+            result = db.session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', attempts=Job.attempts + 1, locked_at=now, locked_by=self.worker_id),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+
+    def requeue_expired(self):
+        """Put jobs back in the queue that have been running longer than the lease (their worker died)"""
+        from .extensions import db
+        from .models import Job
+
+        expired = datetime.utcnow() - timedelta(seconds=self.app.config['JOBS_LEASE_TIMEOUT'])
+        db.session.execute(
+            db.update(Job)
+            .where(Job.status == 'running', Job.locked_at < expired)
+            .values(status='queued', locked_at=None, locked_by=None, last_error='Worker lease expired'),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+    def enqueue_periodic(self):
+        """Enqueue each periodic task for the current period, unless another worker already has"""
+        from .extensions import db
+
+        now = time.time()
+        for name, every in self.periodic_tasks.items():
+            period = int(now // every)
+            if self._periods.get(name) == period:
+                continue
+            try:
+                self.enqueue(name, dedupe_key=f'{name}:{period}')
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            self._periods[name] = period
+
+    def _backoff(self, attempts):
+        config = self.app.config
+        delay = min(config['JOBS_RETRY_BACKOFF_MAX'], config['JOBS_RETRY_BACKOFF'] * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _execute(self, job_id):
+        from .extensions import db
+        from .models import Job
+
+        try:
+            with self.app.app_context():
+                job = db.session.get(Job, job_id)
+                if job is None:
+                    return
+                try:
+                    func, _ = self.tasks.get(job.name) or (None, None)
+                    if func is None:
+                        raise UnknownTask(job.name)
+                    result = func(**job.payload)
+                except Exception as e:
+                    db.session.rollback()
+                    job = db.session.get(Job, job_id)
+                    job.last_error = f'{type(e).__name__}: {e}'
+                    job.locked_at = job.locked_by = None
+                    if job.attempts < job.max_attempts and not isinstance(e, UnknownTask):
+                        job.status = 'queued'
+                        job.run_at = datetime.utcnow() + timedelta(seconds=self._backoff(job.attempts))
+                    else:
+                        job.status = 'failed'
+                        job.finished_at = datetime.utcnow()
+                        logger.exception("Job %s (%s) failed after %s attempts", job.id, job.name, job.attempts)
+                else:
+                    job.status = 'succeeded'
+                    job.result = result
+                    job.locked_at = job.locked_by = None
+                    job.finished_at = datetime.utcnow()
+                db.session.commit()
+        except Exception:
+            logger.exception("Could not record the outcome of job %s", job_id)
+        finally:
+            self._running.discard(job_id)
+            # A slot is free again
+            self._wake.set()
+
+    def run_pending(self):
+        """Claim and run due jobs on the calling thread until none are left (scripts and tests)"""
+        with self.app.app_context():
+            while True:
+                claimed = self.claim(1)
+                if not claimed:
+                    return
+                self._execute(claimed[0])
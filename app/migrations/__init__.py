@@ -0,0 +1,131 @@
+# app/migrations/__init__.py
+"""
+Versioned schema migrations.
+
+Each module in ``app/migrations/versions`` is one migration. Its file name starts
+with a zero-padded version number and it defines ``description`` and
+``upgrade(conn)``. Applied versions are recorded in the ``schema_migrations``
+table, so ``upgrade()`` only runs what a database is missing and is safe to call
+on every start-up.
+
+Migrations describe the schema as it was at that version (they never import the
+models), so replaying them on an empty database always gives the same result.
+
+With shards, every database is upgraded on its own, the primary first. A
+migration that also has to write the global tables on the primary gets a
+connection to it from ``primary_connection``.
+"""
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateColumn
+
+# Arbitrary key for the Postgres advisory lock that serializes concurrent upgrades
+_LOCK_KEY = 72_016_001
+
+_metadata = sa.MetaData()
+schema_migrations = sa.Table(
+    'schema_migrations', _metadata,
+    sa.Column('version', sa.String(32), primary_key=True),
+    sa.Column('description', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False)
+)
+
+
+def available_migrations():
+    """All migration modules, ordered by version"""
+    from . import versions
+
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        version = info.name.split('_', 1)[0]
+        if version.isdigit():
+            module = importlib.import_module(f'{versions.__name__}.{info.name}')
+            migrations.append((version, module))
+    return sorted(migrations, key=lambda item: item[0])
+
+
+def applied_versions(conn):
+    """Versions already recorded in ``schema_migrations``"""
+    schema_migrations.create(conn, checkfirst=True)
+    return {row.version for row in conn.execute(sa.select(schema_migrations.c.version))}
+
+
+def upgrade(engine, target=None, primary=None):
+    """Apply every pending migration (up to ``target``) in one transaction.
+
+    ``primary`` is the primary database's engine when ``engine`` is another shard.
+    Returns the list of versions that were applied.
+    """
+    applied = []
+    with engine.begin() as conn:
+        conn.info['migrations_primary'] = primary if primary is not None and primary is not engine else None
+        if conn.dialect.name == 'postgresql':
+            # Several gunicorn workers may start at once; let one of them migrate
+            conn.execute(sa.text('SELECT pg_advisory_xact_lock(:key)'), {'key': _LOCK_KEY})
+
+        done = applied_versions(conn)
+        for version, module in available_migrations():
+            if target is not None and version > target:
+                break
+            if version in done:
+                continue
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                description=module.description,
+                applied_at=datetime.utcnow()
+            ))
+            applied.append(version)
+        # info outlives the connection checkout
+        conn.info.pop('migrations_primary')
+    return applied
+
+
+def pending(engine):
+    """Versions that ``upgrade()`` would apply"""
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+        conn.commit()
+    return [version for version, _ in available_migrations() if version not in done]
+
+
+# Helpers for migration modules
+
+def reflect(conn, table_name):
+    """Current definition of a table, as seen by the database"""
+    return sa.Table(table_name, sa.MetaData(), autoload_with=conn)
+
+
+def has_column(conn, table_name, column_name):
+    return column_name in {column['name'] for column in sa.inspect(conn).get_columns(table_name)}
+
+
+def add_column(conn, table_name, column):
+    """``ALTER TABLE ... ADD COLUMN`` for a detached ``sa.Column``, skipped if it already exists"""
+    if has_column(conn, table_name, column.name):
+        return
+    sa.Table(table_name, sa.MetaData(), column)
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(sa.text(f'ALTER TABLE {table_name} ADD COLUMN {ddl}'))
+
+
+@contextmanager
+def primary_connection(conn):
+    """Connection to the primary database: ``conn`` itself, or a transaction of its own
+    committed when the block ends while a shard is being upgraded"""
+    primary = conn.info.get('migrations_primary')
+    if primary is None:
+        yield conn
+        return
+    with primary.begin() as primary_conn:
+        yield primary_conn
+
+
+def create_index(conn, table, name, *columns, **kwargs):
+    """Create an index on a reflected table unless it already exists"""
+    index = sa.Index(name, *(table.c[column] for column in columns), **kwargs)
+    index.create(conn, checkfirst=True)
+    return index
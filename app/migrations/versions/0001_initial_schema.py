@@ -0,0 +1,41 @@
+"""Initial schema: users, goals and goal_stats"""
+import sqlalchemy as sa
+
+description = "Initial schema: users, goals and goal_stats"
+
+
+def upgrade(conn):
+    metadata = sa.MetaData()
+    sa.Table(
+        'users', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('username', sa.String(80), nullable=False),
+        sa.Column('email', sa.String(120), unique=True, nullable=False),
+        sa.Column('password_hash', sa.String(255), nullable=False)
+    )
+    sa.Table(
+        'goals', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('goal_title', sa.String(200), nullable=False),
+        sa.Column('description', sa.Text, nullable=True),
+        sa.Column('goal_type', sa.String(50), nullable=False),
+        sa.Column('priority', sa.String(20), nullable=False),
+        sa.Column('category', sa.String(50), nullable=False),
+        sa.Column('start_date', sa.Date, nullable=False),
+        sa.Column('end_date', sa.Date, nullable=False),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('is_completed', sa.Boolean),
+        sa.Column('completion_date', sa.Date, nullable=True)
+    )
+    sa.Table(
+        'goal_stats', metadata,
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_goals', sa.Integer, nullable=False),
+        sa.Column('completed_goals', sa.Integer, nullable=False),
+        sa.Column('overdue_goals', sa.Integer, nullable=False),
+        sa.Column('overdue_as_of', sa.Date, nullable=True)
+    )
+    # Databases created earlier by db.create_all() already have these tables
+    metadata.create_all(conn, checkfirst=True)
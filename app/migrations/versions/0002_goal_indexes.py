@@ -0,0 +1,17 @@
+"""Composite sort indexes and the pending-deadline partial index on goals"""
+import sqlalchemy as sa
+from .. import reflect, create_index
+
+description = "Goal list indexes: (user_id, sort column, id), filters and pending end_date"
+
+
+def upgrade(conn):
+    goals = reflect(conn, 'goals')
+    create_index(conn, goals, 'ix_goals_user_created_at', 'user_id', 'created_at', 'id')
+    create_index(conn, goals, 'ix_goals_user_start_date', 'user_id', 'start_date', 'id')
+    create_index(conn, goals, 'ix_goals_user_end_date', 'user_id', 'end_date', 'id')
+    create_index(conn, goals, 'ix_goals_user_goal_type', 'user_id', 'goal_type')
+    create_index(conn, goals, 'ix_goals_user_category', 'user_id', 'category')
+    create_index(conn, goals, 'ix_goals_user_pending_end_date', 'user_id', 'end_date',
+                 postgresql_where=sa.text('NOT is_completed'),
+                 sqlite_where=sa.text('is_completed = 0'))
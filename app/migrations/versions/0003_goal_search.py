@@ -0,0 +1,53 @@
+"""Full-text search index over goal titles and descriptions"""
+import sqlalchemy as sa
+
+description = "Goal full-text search: tsvector column + GIN index (Postgres), FTS5 table (SQLite)"
+
+# Title matches rank above description matches
+POSTGRES = [
+    """
+    ALTER TABLE goals ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(goal_title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_goals_search_vector ON goals USING GIN (search_vector)",
+]
+
+# External-content FTS5 table: the index only, kept in step with goals by triggers
+SQLITE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS goals_fts USING fts5(
+        goal_title, description, content='goals', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_insert AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_fts (rowid, goal_title, description) VALUES (new.id, new.goal_title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_delete AFTER DELETE ON goals BEGIN
+        INSERT INTO goals_fts (goals_fts, rowid, goal_title, description)
+        VALUES ('delete', old.id, old.goal_title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS goals_fts_update AFTER UPDATE OF goal_title, description ON goals BEGIN
+        INSERT INTO goals_fts (goals_fts, rowid, goal_title, description)
+        VALUES ('delete', old.id, old.goal_title, old.description);
+        INSERT INTO goals_fts (rowid, goal_title, description) VALUES (new.id, new.goal_title, new.description);
+    END
+    """,
+    # Index the goals that already exist
+    "INSERT INTO goals_fts (goals_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade(conn):
+    statements = {'postgresql': POSTGRES, 'sqlite': SQLITE}.get(conn.dialect.name)
+    if statements is None:
+        raise RuntimeError(f"Full-text search is not supported on {conn.dialect.name}")
+    for statement in statements:
+        conn.execute(sa.text(statement))
@@ -0,0 +1,30 @@
+"""Background job table"""
+import sqlalchemy as sa
+
+description = "Background jobs table"
+
+
+def upgrade(conn):
+    metadata = sa.MetaData()
+    sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+    sa.Table(
+        'jobs', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('payload', sa.JSON, nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False),
+        sa.Column('max_attempts', sa.Integer, nullable=False),
+        sa.Column('run_at', sa.DateTime, nullable=False),
+        sa.Column('locked_at', sa.DateTime, nullable=True),
+        sa.Column('locked_by', sa.String(64), nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('result', sa.JSON, nullable=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=True),
+        sa.Column('dedupe_key', sa.String(150), unique=True, nullable=True),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+        sa.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        sa.Index('ix_jobs_user_created_at', 'user_id', 'created_at'),
+    )
+    metadata.tables['jobs'].create(conn, checkfirst=True)
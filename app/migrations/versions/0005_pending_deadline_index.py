@@ -0,0 +1,17 @@
+"""Add id to the pending-deadline partial index"""
+import sqlalchemy as sa
+from .. import reflect, create_index
+
+description = "Pending-deadline index on (user_id, end_date, id) for keyset-paged due lists"
+
+
+def upgrade(conn):
+    # The (end_date, id) order of the due list then comes straight from the index
+    goals = reflect(conn, 'goals')
+    index = next((index for index in goals.indexes if index.name == 'ix_goals_user_pending_end_date'), None)
+    if index is not None and [column.name for column in index.columns] != ['user_id', 'end_date', 'id']:
+        index.drop(conn)
+        goals = reflect(conn, 'goals')
+    create_index(conn, goals, 'ix_goals_user_pending_end_date', 'user_id', 'end_date', 'id',
+                 postgresql_where=sa.text('NOT is_completed'),
+                 sqlite_where=sa.text('is_completed = 0'))
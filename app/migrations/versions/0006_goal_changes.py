@@ -0,0 +1,27 @@
+"""Delta sync: goal change index and the tombstone table for deletes"""
+import sqlalchemy as sa
+from .. import reflect, create_index
+
+description = "Goal changes feed: (user_id, updated_at, id) index and goal_tombstones"
+
+
+def upgrade(conn):
+    # Rows without updated_at would never show up in the feed
+    conn.execute(sa.text(
+        'UPDATE goals SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL'
+    ))
+    goals = reflect(conn, 'goals')
+    create_index(conn, goals, 'ix_goals_user_updated_at', 'user_id', 'updated_at', 'id')
+
+    metadata = sa.MetaData()
+    sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+    sa.Table(
+        'goal_tombstones', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('goal_id', sa.Integer, nullable=False),
+        sa.Column('deleted_at', sa.DateTime, nullable=False),
+        sa.Index('ix_goal_tombstones_user_deleted_at', 'user_id', 'deleted_at', 'id'),
+        sa.Index('ix_goal_tombstones_deleted_at', 'deleted_at'),
+    )
+    metadata.tables['goal_tombstones'].create(conn, checkfirst=True)
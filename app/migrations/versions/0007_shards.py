@@ -0,0 +1,43 @@
+"""Sharding: global user directory and per-database id counters"""
+import sqlalchemy as sa
+
+description = "Sharding: user_shards directory, id_blocks counters, jobs.user_id without users FK"
+
+# Tables whose ids are handed out from id_blocks, so they stay unique when rows move between shards
+ALLOCATED = ('goals', 'goal_tombstones')
+
+
+def upgrade(conn):
+    metadata = sa.MetaData()
+    user_shards = sa.Table(
+        'user_shards', metadata,
+        sa.Column('user_id', sa.Integer, primary_key=True),
+        sa.Column('email', sa.String(120), unique=True, nullable=False),
+        sa.Column('shard', sa.Integer, nullable=False),
+        sa.Column('moving', sa.Boolean, nullable=False),
+    )
+    id_blocks = sa.Table(
+        'id_blocks', metadata,
+        sa.Column('name', sa.String(64), primary_key=True),
+        sa.Column('next_id', sa.BigInteger, nullable=False),
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+    # Every existing user lives on the primary, which is shard 0
+    conn.execute(sa.text(
+        'INSERT INTO user_shards (user_id, email, shard, moving) '
+        'SELECT id, email, 0, :false FROM users WHERE id NOT IN (SELECT user_id FROM user_shards)'
+    ), {'false': False})
+    for name in ALLOCATED:
+        if conn.execute(sa.select(id_blocks.c.name).where(id_blocks.c.name == name)).first() is None:
+            next_id = conn.execute(sa.text(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {name}')).scalar()
+            conn.execute(id_blocks.insert().values(name=name, next_id=next_id))
+
+    if conn.dialect.name == 'postgresql':
+        # New user ids come from the directory from now on
+        conn.execute(sa.text(
+            "SELECT setval(pg_get_serial_sequence('user_shards', 'user_id'), "
+            "(SELECT COALESCE(MAX(user_id), 0) + 1 FROM user_shards), false)"
+        ))
+        # Jobs stay on the primary, their users may not
+        conn.execute(sa.text('ALTER TABLE jobs DROP CONSTRAINT IF EXISTS jobs_user_id_fkey'))
@@ -0,0 +1,10 @@
+"""Optimistic concurrency: a row version on goals"""
+import sqlalchemy as sa
+from .. import add_column
+
+description = "Goal row version for If-Match updates and deletes"
+
+
+def upgrade(conn):
+    # Existing rows start at version 1, like new ones
+    add_column(conn, 'goals', sa.Column('version', sa.Integer, nullable=False, server_default='1'))
@@ -0,0 +1,33 @@
+"""Hot/cold storage: goals_archive for goals completed long ago"""
+import sqlalchemy as sa
+
+description = "goals_archive table for archived completed goals"
+
+
+def upgrade(conn):
+    metadata = sa.MetaData()
+    sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+    sa.Table(
+        'goals_archive', metadata,
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('goal_title', sa.String(200), nullable=False),
+        sa.Column('description', sa.Text, nullable=True),
+        sa.Column('goal_type', sa.String(50), nullable=False),
+        sa.Column('priority', sa.String(20), nullable=False),
+        sa.Column('category', sa.String(50), nullable=False),
+        sa.Column('start_date', sa.Date, nullable=False),
+        sa.Column('end_date', sa.Date, nullable=False),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('is_completed', sa.Boolean),
+        sa.Column('completion_date', sa.Date, nullable=True),
+        sa.Column('version', sa.Integer, nullable=False),
+        sa.Column('archived_at', sa.DateTime, nullable=False),
+        sa.Index('ix_goals_archive_user_created_at', 'user_id', 'created_at', 'id'),
+        sa.Index('ix_goals_archive_user_start_date', 'user_id', 'start_date', 'id'),
+        sa.Index('ix_goals_archive_user_end_date', 'user_id', 'end_date', 'id'),
+        sa.Index('ix_goals_archive_user_updated_at', 'user_id', 'updated_at', 'id'),
+        sa.Index('ix_goals_archive_user_completion_date', 'user_id', 'completion_date'),
+    )
+    metadata.tables['goals_archive'].create(conn, checkfirst=True)
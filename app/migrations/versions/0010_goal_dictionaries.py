@@ -0,0 +1,81 @@
+"""Compact goal columns: priority as a rank, goal_type and category as lookup table ids"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from .. import add_column, create_index, has_column, primary_connection, reflect
+
+description = "goals/goals_archive: priority_rank, goal_type_id, category_id; goal_types and goal_categories lookup tables"
+
+PRIORITY_RANK = "CASE lower(priority) WHEN 'low' THEN 1 WHEN 'high' THEN 3 ELSE 2 END"
+# (string column, id column, lookup table)
+ENCODED = (('goal_type', 'goal_type_id', 'goal_types'), ('category', 'category_id', 'goal_categories'))
+# Names per lookup statement, well below the bound parameter limits
+CHUNK_SIZE = 500
+
+metadata = sa.MetaData()
+lookups = {
+    name: sa.Table(
+        name, metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('name', sa.String(50), unique=True, nullable=False),
+    )
+    for name in ('goal_types', 'goal_categories')
+}
+
+
+def _insert_missing(conn, table, rows):
+    insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}[conn.dialect.name]
+    conn.execute(insert(table).on_conflict_do_nothing(index_elements=['name']), rows)
+
+
+def _encode(conn, tables, column, id_column, lookup):
+    """Fill ``id_column`` from ``column`` through the lookup table"""
+    table = lookups[lookup]
+    names = sorted({name for goals_table in tables for name in
+                    conn.execute(sa.text(f'SELECT DISTINCT {column} FROM {goals_table}')).scalars()})
+    # Ids come from the primary's lookup table; a shard keeps a copy of the entries its goals use
+    with primary_connection(conn) as primary:
+        entries = []
+        for start in range(0, len(names), CHUNK_SIZE):
+            chunk = names[start:start + CHUNK_SIZE]
+            _insert_missing(primary, table, [{'name': name} for name in chunk])
+            entries += [dict(row) for row in primary.execute(
+                sa.select(table.c.id, table.c.name).where(table.c.name.in_(chunk))
+            ).mappings()]
+    if entries and primary is not conn:
+        _insert_missing(conn, table, entries)
+    for name in tables:
+        conn.execute(sa.text(
+            f'UPDATE {name} SET {id_column} = (SELECT id FROM {lookup} WHERE {lookup}.name = {name}.{column})'
+        ))
+
+
+def upgrade(conn):
+    with primary_connection(conn) as primary:
+        metadata.create_all(primary, checkfirst=True)
+    metadata.create_all(conn, checkfirst=True)
+
+    tables = [name for name in ('goals', 'goals_archive') if has_column(conn, name, 'goal_type')]
+    for name in tables:
+        add_column(conn, name, sa.Column('priority_rank', sa.SmallInteger, nullable=False, server_default='2'))
+        conn.execute(sa.text(f'UPDATE {name} SET priority_rank = {PRIORITY_RANK}'))
+        for _, id_column, _ in ENCODED:
+            add_column(conn, name, sa.Column(id_column, sa.Integer, nullable=True))
+    for column, id_column, lookup in ENCODED:
+        _encode(conn, tables, column, id_column, lookup)
+
+    if 'goals' in tables:
+        # SQLite refuses to drop an indexed column
+        for index in ('ix_goals_user_goal_type', 'ix_goals_user_category'):
+            conn.execute(sa.text(f'DROP INDEX IF EXISTS {index}'))
+    for name in tables:
+        for column in ('goal_type', 'priority', 'category'):
+            conn.execute(sa.text(f'ALTER TABLE {name} DROP COLUMN {column}'))
+        if conn.dialect.name == 'postgresql':
+            for _, id_column, _ in ENCODED:
+                conn.execute(sa.text(f'ALTER TABLE {name} ALTER COLUMN {id_column} SET NOT NULL'))
+
+    goals = reflect(conn, 'goals')
+    create_index(conn, goals, 'ix_goals_user_priority', 'user_id', 'priority_rank', 'id')
+    create_index(conn, goals, 'ix_goals_user_goal_type', 'user_id', 'goal_type_id')
+    create_index(conn, goals, 'ix_goals_user_category', 'user_id', 'category_id')
+    create_index(conn, reflect(conn, 'goals_archive'), 'ix_goals_archive_user_priority', 'user_id', 'priority_rank', 'id')
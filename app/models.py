@@ -7,6 +7,12 @@ This maintains backward compatibility while organizing models in separate files
 # Import all models from the models package
 from .models.user import User
 from .models.goal import Goal
+from .models.goal_archive import GoalArchive
+from .models.goal_dictionary import GoalType, GoalCategory
+from .models.goal_stats import GoalStats
+from .models.goal_tombstone import GoalTombstone
+from .models.job import Job
+from .models.user_shard import UserShard, IdBlock
 
 # Make models available at module level for backward compatibility
-__all__ = ['User', 'Goal']
+__all__ = ['User', 'Goal', 'GoalArchive', 'GoalType', 'GoalCategory', 'GoalStats', 'GoalTombstone', 'Job', 'UserShard', 'IdBlock']
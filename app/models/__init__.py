@@ -4,6 +4,12 @@ Models package - imports all models for easy access
 """
 from .user import User
 from .goal import Goal
+from .goal_archive import GoalArchive
+from .goal_dictionary import GoalType, GoalCategory
+from .goal_stats import GoalStats
+from .goal_tombstone import GoalTombstone
+from .job import Job
+from .user_shard import UserShard, IdBlock
 
 # Make models available at package level
-__all__ = ['User', 'Goal']
\ No newline at end of file
+__all__ = ['User', 'Goal', 'GoalArchive', 'GoalType', 'GoalCategory', 'GoalStats', 'GoalTombstone', 'Job', 'UserShard', 'IdBlock']
\ No newline at end of file
@@ -1,16 +1,60 @@
-from ..extensions import db
+from ..extensions import db, goal_dictionaries
+from ..dictionaries import DictionaryName, PriorityRank
+from ..sharding import allocated_id
 from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class days_between(FunctionElement):
+    """SQL ``end - start`` in whole days for two DATE expressions"""
+    type = db.Integer()
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    # Postgres: date - date is an integer number of days
+    start, end = list(element.clauses)
+    return f"({compiler.process(end, **kw)} - {compiler.process(start, **kw)})"
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}) AS INTEGER)"
+
 
 class Goal(db.Model):
     __tablename__ = "goals"
+    __table_args__ = (
+        # Every query is scoped by user_id; each list sort gets a (user_id, <sort column>, id)
+        # index so a page (offset or keyset) is one ordered range scan
+        db.Index('ix_goals_user_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_goals_user_start_date', 'user_id', 'start_date', 'id'),
+        db.Index('ix_goals_user_end_date', 'user_id', 'end_date', 'id'),
+        # Delta sync reads a user's changes in (updated_at, id) order
+        db.Index('ix_goals_user_updated_at', 'user_id', 'updated_at', 'id'),
+        # Priority sort: ranks order like the priorities, so this is an ordered range scan too
+        db.Index('ix_goals_user_priority', 'user_id', 'priority_rank', 'id'),
+        # Equality filters of the list endpoint
+        db.Index('ix_goals_user_goal_type', 'user_id', 'goal_type_id'),
+        db.Index('ix_goals_user_category', 'user_id', 'category_id'),
+        # Pending goals by deadline (overdue / due-soon lookups); queries must filter
+        # with ``Goal.is_completed == False`` to match the index predicate
+        db.Index('ix_goals_user_pending_end_date', 'user_id', 'end_date', 'id',
+                 postgresql_where=db.text('NOT is_completed'),
+                 sqlite_where=db.text('is_completed = 0')),
+    )
     
-    # Primary fields
-    id = db.Column(db.Integer, primary_key=True)
+    # Primary fields (ids are unique across shards, see app/sharding.py)
+    id = db.Column(db.Integer, primary_key=True, default=allocated_id('goals'))
     goal_title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    goal_type = db.Column(db.String(50), nullable=False)  # personal, professional, health, etc.
-    priority = db.Column(db.String(20), nullable=False, default="medium")  # low, medium, high
-    category = db.Column(db.String(50), nullable=False)
+    # Stored as small integers and read back as names (see app/dictionaries.py)
+    goal_type = db.Column('goal_type_id', DictionaryName(goal_dictionaries.goal_type), nullable=False)  # personal, professional, health, etc.
+    priority = db.Column('priority_rank', PriorityRank, nullable=False, default="medium", server_default='2')  # low, medium, high
+    category = db.Column('category_id', DictionaryName(goal_dictionaries.category), nullable=False)
     
     # Date fields
     start_date = db.Column(db.Date, nullable=False)
@@ -27,6 +71,9 @@ class Goal(db.Model):
     is_completed = db.Column(db.Boolean, default=False)
     completion_date = db.Column(db.Date, nullable=True)
     
+    # Bumped by every update; sent as the ETag and checked against If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
     # Relationships
     user = db.relationship('User', backref=db.backref('goals', lazy=True, cascade='all, delete-orphan'))
     
@@ -60,6 +107,11 @@ class Goal(db.Model):
         self.completion_date = None
         self.updated_at = datetime.utcnow()
     
+    @classmethod
+    def days_remaining_expression(cls, today):
+        """SQL counterpart of ``days_remaining`` for a given day (negative when overdue)"""
+        return days_between(db.literal(today, db.Date), cls.end_date)
+    
     @property
     def days_remaining(self):
         """Calculate days remaining until end date"""
@@ -0,0 +1,41 @@
+from ..extensions import db, goal_dictionaries
+from ..dictionaries import DictionaryName, PriorityRank
+from datetime import datetime
+
+class GoalArchive(db.Model):
+    """Cold storage for goals completed long ago (see ``app/archive.py``).
+
+    Same columns as ``goals`` (ids and versions are kept) plus ``archived_at``.
+    Only list reads that ask for completed or archived goals, and misses of
+    single-goal reads, look here; a write to an archived goal moves it back first.
+    """
+    __tablename__ = "goals_archive"
+    __table_args__ = (
+        # Same (user_id, <sort column>, id) orderings as the hot table's list indexes
+        db.Index('ix_goals_archive_user_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_goals_archive_user_start_date', 'user_id', 'start_date', 'id'),
+        db.Index('ix_goals_archive_user_end_date', 'user_id', 'end_date', 'id'),
+        db.Index('ix_goals_archive_user_priority', 'user_id', 'priority_rank', 'id'),
+        # Delta sync and completion analytics
+        db.Index('ix_goals_archive_user_updated_at', 'user_id', 'updated_at', 'id'),
+        db.Index('ix_goals_archive_user_completion_date', 'user_id', 'completion_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    goal_title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    goal_type = db.Column('goal_type_id', DictionaryName(goal_dictionaries.goal_type), nullable=False)
+    priority = db.Column('priority_rank', PriorityRank, nullable=False)
+    category = db.Column('category_id', DictionaryName(goal_dictionaries.category), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    is_completed = db.Column(db.Boolean)
+    completion_date = db.Column(db.Date, nullable=True)
+    version = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GoalArchive {self.goal_title} (archived {self.archived_at})>'
@@ -0,0 +1,25 @@
+from ..extensions import db
+
+class GoalType(db.Model):
+    """Lookup table of goal type names; goals store the id (see ``app/dictionaries.py``).
+
+    Global, like the shard directory: only the primary database's table is used.
+    """
+    __tablename__ = "goal_types"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<GoalType {self.id} {self.name}>'
+
+
+class GoalCategory(db.Model):
+    """Lookup table of goal category names; goals store the id (see ``app/dictionaries.py``)"""
+    __tablename__ = "goal_categories"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<GoalCategory {self.id} {self.name}>'
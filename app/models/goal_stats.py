@@ -0,0 +1,162 @@
+from ..extensions import db, replica_router
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+class GoalStats(db.Model):
+    """Per-user goal counters, maintained incrementally by every goal write.
+
+    ``overdue_goals`` is the only time-dependent counter. It is stored together
+    with ``overdue_as_of``, the day it was computed for; writes keep it exact
+    for that day and the first read on a new day recomputes the whole row.
+    """
+    __tablename__ = "goal_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_goals = db.Column(db.Integer, nullable=False, default=0)
+    completed_goals = db.Column(db.Integer, nullable=False, default=0)
+    overdue_goals = db.Column(db.Integer, nullable=False, default=0)
+    overdue_as_of = db.Column(db.Date, nullable=True)
+
+    @staticmethod
+    def compute_query(user_id, today):
+        """Single conditional-aggregate query for ``(total, completed, overdue)``"""
+        from .goal import Goal
+        from .goal_archive import GoalArchive
+
+        pending = Goal.is_completed == False  # noqa: E712 (matches the partial index predicate)
+        # Archived goals are all completed (see app/archive.py)
+        archived = db.select(db.func.count()).where(GoalArchive.user_id == user_id).scalar_subquery()
+        return db.select(
+            db.func.count(Goal.id) + archived,
+            db.func.coalesce(db.func.sum(db.case((Goal.is_completed.is_(True), 1), else_=0)), 0) + archived,
+            db.func.coalesce(db.func.sum(db.case((db.and_(pending, Goal.end_date < today), 1), else_=0)), 0)
+        ).where(Goal.user_id == user_id)
+
+    @staticmethod
+    def counters(row, today):
+        """Column values of a summary row from a ``compute_query`` result"""
+        total, completed, overdue = row
+        return {
+            'total_goals': int(total),
+            'completed_goals': int(completed),
+            'overdue_goals': int(overdue),
+            'overdue_as_of': today
+        }
+
+    @classmethod
+    def compute(cls, user_id, today=None):
+        """Compute all counters for a user in a single conditional-aggregate query"""
+        today = today or datetime.utcnow().date()
+        return cls.counters(db.session.execute(cls.compute_query(user_id, today)).one(), today)
+
+    @classmethod
+    def rebuild(cls, user_id, today=None):
+        """Recompute a user's summary row from the goals table (adds the row if missing)"""
+        values = cls.compute(user_id, today)
+        stats = db.session.get(cls, user_id)
+        if stats is None:
+            stats = cls(user_id=user_id, **values)
+            db.session.add(stats)
+        else:
+            for key, value in values.items():
+                setattr(stats, key, value)
+        return stats
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Load a user's summary row with one primary-key lookup, rebuilding it when stale"""
+        today = datetime.utcnow().date()
+        stats = db.session.get(cls, user_id)
+        if stats is None or stats.overdue_as_of != today:
+            # Counters are written back, so they must not be computed from a lagging replica
+            with replica_router.primary():
+                stats = cls.rebuild(user_id, today)
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # A concurrent request created the row first; use theirs
+                    db.session.rollback()
+                    stats = db.session.get(cls, user_id)
+        return stats
+
+    @staticmethod
+    def delta(as_of, before=None, after=None):
+        """Counter delta ``(total, completed, overdue)`` of one goal write.
+
+        ``before`` and ``after`` are ``(is_completed, end_date)`` pairs describing the
+        goal before and after the write; pass ``None`` for a create or a delete.
+        """
+        def contribution(state):
+            if state is None:
+                return 0, 0, 0
+            is_completed, end_date = state
+            overdue = not is_completed and as_of is not None and end_date is not None and end_date < as_of
+            return 1, 1 if is_completed else 0, 1 if overdue else 0
+
+        old, new = contribution(before), contribution(after)
+        return tuple(n - o for o, n in zip(old, new))
+
+    @classmethod
+    def delta_statement(cls, user_id, total=0, completed=0, overdue=0):
+        """UPDATE adding to a user's counters, or ``None`` when there is nothing to add"""
+        if not (total or completed or overdue):
+            return None
+        # Increment in SQL rather than in Python, so concurrent writers don't lose updates
+        return db.update(cls).where(cls.user_id == user_id).values(
+            total_goals=cls.total_goals + total,
+            completed_goals=cls.completed_goals + completed,
+            overdue_goals=cls.overdue_goals + overdue
+        )
+
+    @classmethod
+    def apply_delta(cls, user_id, total=0, completed=0, overdue=0):
+        """Add to a user's counters with one UPDATE inside the caller's transaction"""
+        statement = cls.delta_statement(user_id, total, completed, overdue)
+        if statement is not None:
+            db.session.execute(statement, execution_options={'synchronize_session': False})
+
+    @classmethod
+    def change_statement(cls, user_id, before=None, after=None):
+        """UPDATE applying one goal write to a user's counters, or ``None`` when they don't move.
+
+        Same contributions as ``delta``, but the overdue one is compared with the stored
+        ``overdue_as_of`` in SQL, so the counters don't have to be read first. A user
+        without a summary row is left alone (it is built lazily by the first read).
+        """
+        def contribution(state):
+            if state is None:
+                return 0, 0, 0
+            is_completed, end_date = state
+            if is_completed or end_date is None:
+                return 1, 1 if is_completed else 0, 0
+            return 1, 0, db.case((cls.overdue_as_of > end_date, 1), else_=0)
+
+        if before == after:
+            return None
+        old, new = contribution(before), contribution(after)
+        return db.update(cls).where(cls.user_id == user_id).values(
+            total_goals=cls.total_goals + (new[0] - old[0]),
+            completed_goals=cls.completed_goals + (new[1] - old[1]),
+            overdue_goals=cls.overdue_goals + new[2] - old[2]
+        )
+
+    @classmethod
+    def record_change(cls, user_id, before=None, after=None):
+        """Keep a user's summary row in step with a single goal create, update or delete"""
+        statement = cls.change_statement(user_id, before, after)
+        if statement is not None:
+            db.session.execute(statement, execution_options={'synchronize_session': False})
+
+    def to_dict(self):
+        """Convert the summary row to the statistics block of the goals list response"""
+        pending_goals = self.total_goals - self.completed_goals
+        return {
+            'total_goals': self.total_goals,
+            'completed_goals': self.completed_goals,
+            'pending_goals': pending_goals,
+            'overdue_goals': self.overdue_goals,
+            'completion_rate': round((self.completed_goals / self.total_goals * 100), 2) if self.total_goals > 0 else 0
+        }
+
+    def __repr__(self):
+        return f'<GoalStats user={self.user_id} total={self.total_goals}>'
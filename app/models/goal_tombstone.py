@@ -0,0 +1,36 @@
+from ..extensions import db
+from ..sharding import allocated_id
+from datetime import datetime
+
+class GoalTombstone(db.Model):
+    """Record of a deleted goal, so delta sync (see ``app/sync.py``) can tell clients what disappeared.
+
+    Tombstones are kept for ``TOMBSTONE_RETENTION_DAYS`` and then compacted.
+    """
+    __tablename__ = "goal_tombstones"
+    __table_args__ = (
+        # The changes feed reads a user's deletes in (deleted_at, id) order
+        db.Index('ix_goal_tombstones_user_deleted_at', 'user_id', 'deleted_at', 'id'),
+        # Compaction deletes by age across all users
+        db.Index('ix_goal_tombstones_deleted_at', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, default=allocated_id('goal_tombstones'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    goal_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @staticmethod
+    def rows(user_id, goal_ids):
+        """INSERT parameters for the tombstones of deleted goals"""
+        now = datetime.utcnow()
+        return [{'user_id': user_id, 'goal_id': goal_id, 'deleted_at': now} for goal_id in goal_ids]
+
+    @classmethod
+    def record(cls, user_id, goal_ids):
+        """Add tombstones for deleted goals to the current transaction (one multi-row INSERT)"""
+        if goal_ids:
+            db.session.execute(db.insert(cls), cls.rows(user_id, goal_ids))
+
+    def __repr__(self):
+        return f'<GoalTombstone goal {self.goal_id} ({self.deleted_at})>'
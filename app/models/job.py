@@ -0,0 +1,52 @@
+from ..extensions import db
+from datetime import datetime
+
+class Job(db.Model):
+    """A unit of deferred work, run by the in-process job runner (see ``app/jobs.py``).
+
+    ``status`` moves queued -> running -> succeeded, or back to queued with a later
+    ``run_at`` after a failed attempt, until ``max_attempts`` is used up (failed).
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The runner's poll: due jobs in run_at order
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_user_created_at', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(64), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    # Owner, for jobs started by a user (None for system jobs). No foreign key: jobs
+    # stay on the primary database while the user may live on another shard
+    user_id = db.Column(db.Integer, nullable=True)
+    # Periodic jobs use "<name>:<period number>" so each period is enqueued once across workers
+    dedupe_key = db.Column(db.String(150), unique=True, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """Convert job object to dictionary for JSON response"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'result': self.result,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} ({self.status})>'
@@ -1,6 +1,5 @@
 # app/models/user.py
-from ..extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from ..extensions import db, password_hasher
 
 class User(db.Model):
     __tablename__ = "users"
@@ -12,12 +11,22 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
 
     def set_password(self, password):
-        """Hash and set the user's password"""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set the user's password (on the hashing worker pool)"""
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         """Check if provided password matches the hashed password"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def upgrade_password_hash(self, password):
+        """Re-hash a verified password if it was hashed with outdated parameters.
+        
+        Returns True if the stored hash changed.
+        """
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
     
     def to_dict(self):
         """Convert user object to dictionary for JSON response"""
@@ -0,0 +1,29 @@
+from ..extensions import db
+
+class UserShard(db.Model):
+    """Global user directory: which shard holds a user (see ``app/sharding.py``).
+
+    Lives on the primary database only. It allocates user ids and keeps emails
+    unique across all shards.
+    """
+    __tablename__ = "user_shards"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    shard = db.Column(db.Integer, nullable=False, default=0)
+    # Set while the user's rows are copied to another shard; their writes are refused meanwhile
+    moving = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f'<UserShard {self.user_id} on {self.shard}>'
+
+
+class IdBlock(db.Model):
+    """Per-database id counter; ids are reserved from it in blocks (see ``app/sharding.py``)"""
+    __tablename__ = "id_blocks"
+
+    name = db.Column(db.String(64), primary_key=True)
+    next_id = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<IdBlock {self.name} next {self.next_id}>'
@@ -0,0 +1,94 @@
+# app/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key and id of the last
+row of a page. The next page starts strictly after that row, so every page is a
+single index range scan no matter how deep the client has paged, and rows
+inserted meanwhile never shift the pages.
+"""
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import literal, tuple_
+
+
+def encode_token(payload):
+    """Opaque URL-safe token for a JSON-serializable payload"""
+    data = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Payload of a token created by ``encode_token``; raises ``ValueError`` if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def encode_cursor(sort_by, sort_order, key, row_id):
+    """Build the opaque token pointing just past the row with the given sort key and id"""
+    if isinstance(key, (date, datetime)):
+        key = key.isoformat()
+    return encode_token([sort_by, sort_order, key, row_id])
+
+
+def _cursor_key(key, key_type):
+    """Sort key of a decoded cursor as ``key_type``; raises ``ValueError`` if it is not one"""
+    if key is None:
+        return None
+    if key_type in (datetime, date):
+        if not isinstance(key, str):
+            raise ValueError("Invalid cursor")
+        return key_type.fromisoformat(key)
+    allowed = {int: (int,), float: (int, float), str: (str,)}.get(key_type, (str, int, float))
+    # bool is an int, but never a sort key
+    if isinstance(key, bool) or not isinstance(key, allowed):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def decode_cursor(token, sort_by, sort_order, key_type=None):
+    """Decode a token created by ``encode_cursor`` into ``(key, id)``.
+
+    Raises ``ValueError`` if the token is malformed, holds a key that is not a
+    ``key_type`` or an id that is not an integer, or was issued for another ordering.
+    """
+    try:
+        cursor_sort_by, cursor_order, key, row_id = decode_token(token)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort_by != sort_by or cursor_order != sort_order:
+        raise ValueError("Cursor does not match sort_by/sort_order")
+    if isinstance(row_id, bool) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    try:
+        key = _cursor_key(key, key_type)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return key, row_id
+
+
+def keyset_query(query, sort_key, id_column, descending, after=None):
+    """Order ``query`` by ``(sort_key, id)`` and restrict it to rows after the ``(key, id)`` position"""
+    if after is not None:
+        position = tuple_(sort_key, id_column)
+        bound = tuple_(literal(after[0], sort_key.type), literal(after[1], id_column.type))
+        query = query.filter(position < bound if descending else position > bound)
+    if descending:
+        return query.order_by(sort_key.desc(), id_column.desc())
+    return query.order_by(sort_key.asc(), id_column.asc())
+
+
+def keyset_page(query, sort_key, id_column, descending, after=None, limit=10):
+    """Fetch one keyset page; returns ``(rows, has_next)``.
+
+    One extra row is fetched to tell whether a next page exists. Raises
+    ``ValueError`` unless ``limit`` is at least 1.
+    """
+    if limit < 1:
+        raise ValueError("per_page must be at least 1")
+    rows = keyset_query(query, sort_key, id_column, descending, after).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
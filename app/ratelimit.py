@@ -0,0 +1,419 @@
+# app/ratelimit.py
+"""
+Rate limiting and admission control shared by all worker processes.
+
+Two checks run before a view does any work:
+- token buckets per client IP and per user. A limit ``(requests, seconds)`` is a
+  bucket of ``requests`` tokens refilled at ``requests / seconds`` per second, so
+  a client may burst up to ``requests`` and then keeps that average. An empty
+  bucket answers 429 with ``Retry-After`` (seconds until the next token).
+- a global in-flight limit: at most ``RATE_LIMIT_MAX_IN_FLIGHT`` requests run at
+  once across all workers (0 turns it off). Beyond it a request is turned away
+  at once with 503 + Retry-After instead of queueing on the database pool.
+
+IP limits are checked in ``before_request``; user limits when the access token's
+user is resolved (``UserResolver``), before the user is loaded, so a throttled
+client costs no query.
+
+``RATE_LIMITS`` maps an endpoint (``auth_bp.login``), a blueprint (``goals``)
+or ``default`` to ``{scope: (requests, seconds)}``, scope being ``ip`` or
+``user``. For each scope the most specific entry wins, and ``None`` turns the
+scope off. Endpoints using the same entry share its buckets: every endpoint on
+the ``default`` user limit draws from one budget per user.
+
+Buckets and in-flight counts live in a memory-mapped file (``RATE_LIMIT_FILE``)
+that every worker process on the host maps, so no external service is needed.
+The file is a set-associative table: a key hashes to a set of ``WAYS`` slots,
+guarded by an fcntl record lock on that set's bytes (and a thread lock, since
+record locks belong to a process). A check is a hash, two lock syscalls and one
+read and write of the set - a few microseconds. When every slot of a set holds
+a bucket, the one updated longest ago is reused and its key starts over with a
+full bucket, so keep ``RATE_LIMIT_SLOTS`` well above the number of clients seen
+within a limit's window.
+
+In-flight counts are kept per process as well as in total, so requests of a
+worker that died (killed on timeout, say) are written off the next time the
+limit is reached.
+
+The same table also holds expiring marks (``mark``/``marked``) for other state
+that every worker on the host must see, such as the replica router's
+read-your-writes window. A mark's slot stores its expiry, negated, instead of
+tokens, and a bucket never takes the slot of a mark that has not expired: in a
+set full of live marks a bucket check lets the request through, and a new mark
+replaces the one that expires first.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from flask import jsonify, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: no record locks, so limits only hold within one process
+    fcntl = None
+
+DEFAULT_RATE_LIMITS = {
+    'default': {'ip': (600, 60), 'user': (300, 60)},
+    # Password hashing costs hundreds of milliseconds of CPU per call
+    'auth_bp.login': {'ip': (10, 60)},
+    'auth_bp.register': {'ip': (5, 60)},
+    # The heaviest reads: six queries per uncached list, whole tables per export
+    'goals.get_all_goals': {'user': (120, 60)},
+    'goals.export_goals': {'user': (5, 60)},
+    'goals.import_goals': {'user': (5, 60)},
+}
+SCOPES = ('ip', 'user')
+
+MAGIC = b'SSSBRL01'
+# magic, slots, in-flight requests of all processes
+HEADER = struct.Struct('<8sQq')
+# pid, in-flight requests of that process
+PROCESS = struct.Struct('<qq')
+MAX_PROCESSES = 1024
+# Seconds between looks for dead processes while the in-flight limit is reached
+SWEEP_INTERVAL = 1.0
+PROCESSES_OFFSET = 64
+# key hash (0: free), tokens (or a mark's expiry, negated), last update (epoch seconds)
+SLOT = struct.Struct('<Qdd')
+WAYS = 8
+SET = struct.Struct('<' + 'Qdd' * WAYS)
+SLOTS_OFFSET = PROCESSES_OFFSET + MAX_PROCESSES * PROCESS.size
+
+
+class RateLimited(Exception):
+    """A rate limit is exhausted; ``retry_after`` is the whole seconds until it admits a request again"""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """The global in-flight limit is reached"""
+
+
+def parse_rate_limits(text):
+    """``RATE_LIMITS`` entries from ``"auth_bp.login ip=10/60; default user=300/60 ip=off"``"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in text.split(';'))):
+        name, *rules = entry.split()
+        limits[name] = {}
+        for rule in rules:
+            scope, _, limit = rule.partition('=')
+            if scope not in SCOPES:
+                raise ValueError(f"RATE_LIMITS: unknown scope {scope!r} in {entry!r}")
+            if limit == 'off':
+                limits[name][scope] = None
+            else:
+                requests, _, seconds = limit.partition('/')
+                limits[name][scope] = (int(requests), float(seconds))
+    return limits
+
+
+def client_ip(remote_addr, forwarded_for, proxy_hops):
+    """Client address behind ``proxy_hops`` trusted proxies, each appending to X-Forwarded-For"""
+    if proxy_hops and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',')]
+        return hops[max(0, len(hops) - proxy_hops)]
+    return remote_addr
+
+
+def _key_hash(key):
+    # Stable across processes (unlike hash()); never 0, which marks a free slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') | 1
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _RecordLock:
+    """Exclusive fcntl lock on a byte range of the file, for the duration of a with block"""
+
+    __slots__ = ('fd', 'start', 'length')
+
+    def __init__(self, fd, start, length):
+        self.fd, self.start, self.length = fd, start, length
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.start)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.start)
+
+
+class SharedState:
+    """One process's mapping of the limiter file"""
+
+    def __init__(self, path, slots):
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock = threading.Lock()
+        self._swept = 0.0
+        with _RecordLock(self.fd, 0, PROCESSES_OFFSET):
+            header = os.pread(self.fd, HEADER.size, 0)
+            if len(header) == HEADER.size and header[:len(MAGIC)] == MAGIC:
+                # Another process set the file up; its size wins over ours
+                slots = HEADER.unpack(header)[1]
+            else:
+                slots -= slots % WAYS
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, SLOTS_OFFSET + slots * SLOT.size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, slots, 0), 0)
+            self.sets = slots // WAYS
+            self.mm = mmap.mmap(self.fd, SLOTS_OFFSET + slots * SLOT.size)
+            self.process_offset = self._claim_process_entry()
+
+    def _claim_process_entry(self):
+        """Offset of this process's in-flight entry (header lock held); None if the table is full"""
+        pid = os.getpid()
+        free = None
+        for n in range(MAX_PROCESSES):
+            offset = PROCESSES_OFFSET + n * PROCESS.size
+            entry_pid, _ = PROCESS.unpack_from(self.mm, offset)
+            if entry_pid == pid or (entry_pid and not _alive(entry_pid)):
+                # A dead process's entry, or an earlier process with our (reused) pid
+                self._write_off(offset)
+                entry_pid = 0
+            if not entry_pid and free is None:
+                free = offset
+        if free is not None:
+            PROCESS.pack_into(self.mm, free, pid, 0)
+        return free
+
+    def _write_off(self, offset):
+        """Drop an entry and its requests from the in-flight total (header lock held)"""
+        _, count = PROCESS.unpack_from(self.mm, offset)
+        magic, slots, total = HEADER.unpack_from(self.mm, 0)
+        HEADER.pack_into(self.mm, 0, magic, slots, max(0, total - count))
+        PROCESS.pack_into(self.mm, offset, 0, 0)
+
+    def _forget_dead(self):
+        now = time.monotonic()
+        if now - self._swept < SWEEP_INTERVAL:
+            return
+        self._swept = now
+        for n in range(MAX_PROCESSES):
+            offset = PROCESSES_OFFSET + n * PROCESS.size
+            entry_pid, _ = PROCESS.unpack_from(self.mm, offset)
+            if entry_pid and entry_pid != os.getpid() and not _alive(entry_pid):
+                self._write_off(offset)
+
+    def _add_in_flight(self, delta):
+        magic, slots, total = HEADER.unpack_from(self.mm, 0)
+        HEADER.pack_into(self.mm, 0, magic, slots, max(0, total + delta))
+        if self.process_offset is not None:
+            pid, count = PROCESS.unpack_from(self.mm, self.process_offset)
+            PROCESS.pack_into(self.mm, self.process_offset, pid, max(0, count + delta))
+
+    def in_flight(self):
+        return HEADER.unpack_from(self.mm, 0)[2]
+
+    def acquire(self, limit):
+        """Count one more request in flight, unless ``limit`` requests already are"""
+        with self._lock, _RecordLock(self.fd, 0, PROCESSES_OFFSET):
+            if HEADER.unpack_from(self.mm, 0)[2] >= limit:
+                self._forget_dead()
+                if HEADER.unpack_from(self.mm, 0)[2] >= limit:
+                    return False
+            self._add_in_flight(1)
+            return True
+
+    def release(self):
+        with self._lock, _RecordLock(self.fd, 0, PROCESSES_OFFSET):
+            self._add_in_flight(-1)
+
+    def _set_offset(self, key_hash):
+        return SLOTS_OFFSET + (key_hash % self.sets) * SET.size
+
+    @staticmethod
+    def _way(values, key_hash, now):
+        """``(way, found)``: the slot holding ``key_hash``, else a free slot or the one updated longest ago
+        that holds no live mark (None if every slot does)"""
+        try:
+            return values[0::3].index(key_hash), True
+        except ValueError:
+            pass
+        reusable = [w for w in range(WAYS) if -values[3 * w + 1] <= now]
+        if not reusable:
+            return None, False
+        return min(reusable, key=lambda w: (values[3 * w] != 0 and values[3 * w + 1] >= 0, values[3 * w + 2])), False
+
+    def hit(self, key, requests, seconds, now=None):
+        """Take a token from ``key``'s bucket; returns 0 if there was one, else the seconds until there is"""
+        now = time.time() if now is None else now
+        rate = requests / seconds
+        key_hash = _key_hash(key)
+        start = self._set_offset(key_hash)
+        with self._lock, _RecordLock(self.fd, start, SET.size):
+            values = SET.unpack_from(self.mm, start)
+            way, found = self._way(values, key_hash, now)
+            if way is None:
+                # Every slot holds a live mark; the bucket can't be kept
+                return 0.0
+            if not found:
+                tokens = requests
+            else:
+                # max(): the wall clock may step back
+                tokens = min(requests, values[3 * way + 1] + max(0.0, now - values[3 * way + 2]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            SLOT.pack_into(self.mm, start + way * SLOT.size, key_hash, tokens, now)
+        return wait
+
+    def mark(self, key, seconds, now=None):
+        """Set ``key``'s mark for the next ``seconds``"""
+        now = time.time() if now is None else now
+        key_hash = _key_hash(key)
+        start = self._set_offset(key_hash)
+        with self._lock, _RecordLock(self.fd, start, SET.size):
+            values = SET.unpack_from(self.mm, start)
+            way, _ = self._way(values, key_hash, now)
+            if way is None:
+                way = min(range(WAYS), key=lambda w: -values[3 * w + 1])
+            SLOT.pack_into(self.mm, start + way * SLOT.size, key_hash, -(now + seconds), now)
+
+    def marked(self, key, now=None):
+        """Whether ``key``'s mark is set and has not expired"""
+        now = time.time() if now is None else now
+        key_hash = _key_hash(key)
+        start = self._set_offset(key_hash)
+        with self._lock, _RecordLock(self.fd, start, SET.size):
+            values = SET.unpack_from(self.mm, start)
+        way, found = self._way(values, key_hash, now)
+        return found and -values[3 * way + 1] > now
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
+
+class RateLimiter:
+    """Flask extension enforcing ``RATE_LIMITS`` and ``RATE_LIMIT_MAX_IN_FLIGHT``"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.limits = {}
+        self.max_in_flight = 0
+        self.exempt = frozenset()
+        self.proxy_hops = 0
+        self._path = None
+        self._slots = 0
+        self._rules = {}
+        self._state = None
+        self._state_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMITS', DEFAULT_RATE_LIMITS)
+        app.config.setdefault('RATE_LIMIT_MAX_IN_FLIGHT', 0)
+        app.config.setdefault('RATE_LIMIT_FILE', os.path.join(tempfile.gettempdir(), 'sssb-ratelimit'))
+        app.config.setdefault('RATE_LIMIT_SLOTS', 65536)
+        app.config.setdefault('RATE_LIMIT_PROXY_HOPS', 0)  # trusted proxies appending to X-Forwarded-For
+        app.config.setdefault('RATE_LIMIT_EXEMPT', ('main_bp.health', 'main_bp.metrics'))
+
+        config = app.config
+        self.enabled = config['RATE_LIMIT_ENABLED']
+        self.limits = config['RATE_LIMITS']
+        self.max_in_flight = config['RATE_LIMIT_MAX_IN_FLIGHT']
+        self.exempt = frozenset(config['RATE_LIMIT_EXEMPT'])
+        self.proxy_hops = config['RATE_LIMIT_PROXY_HOPS']
+        self._path, self._slots = config['RATE_LIMIT_FILE'], config['RATE_LIMIT_SLOTS']
+        self._rules = {}
+        with self._lock:
+            if self._state is not None and self._state_pid == os.getpid():
+                self._state.close()
+            self._state = None
+        app.extensions['rate_limiter'] = self
+
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+        app.register_error_handler(RateLimited, self._limited_response)
+        app.register_error_handler(Overloaded, self._overloaded_response)
+
+    @staticmethod
+    def _limited_response(error):
+        return jsonify({"error": "Too many requests, please retry later"}), 429, {'Retry-After': str(error.retry_after)}
+
+    @staticmethod
+    def _overloaded_response(error):
+        return jsonify({"error": "Server is busy, please retry"}), 503, {'Retry-After': '1'}
+
+    def state(self):
+        # Mappings and locks don't survive fork; gunicorn workers each open the file after forking
+        if self._state_pid != os.getpid():
+            with self._lock:
+                if self._state_pid != os.getpid():
+                    self._state = SharedState(self._path, self._slots)
+                    self._state_pid = os.getpid()
+        return self._state
+
+    def rules(self, endpoint):
+        """``{scope: (entry name, requests, seconds)}`` of an endpoint, most specific entry first"""
+        rules = self._rules.get(endpoint)
+        if rules is None:
+            rules = {}
+            blueprint = (endpoint or '').rpartition('.')[0]
+            for name in ('default', blueprint, endpoint):
+                for scope, limit in self.limits.get(name, {}).items():
+                    rules[scope] = None if limit is None else (name, *limit)
+            rules = {scope: rule for scope, rule in rules.items() if rule is not None}
+            self._rules[endpoint] = rules
+        return rules
+
+    def check(self, scope, client, endpoint):
+        """Raise ``RateLimited`` if ``client``'s bucket for the endpoint's ``scope`` limit is empty"""
+        if not self.enabled or endpoint in self.exempt:
+            return
+        rule = self.rules(endpoint).get(scope)
+        if rule is None:
+            return
+        name, requests, seconds = rule
+        wait = self.state().hit(f'{scope}:{client}:{name}', requests, seconds)
+        if wait:
+            raise RateLimited(max(1, math.ceil(wait)))
+
+    def admit(self, endpoint):
+        """Count a request in flight, or raise ``Overloaded``; returns whether ``release`` is due"""
+        if not self.enabled or not self.max_in_flight or endpoint in self.exempt:
+            return False
+        if not self.state().acquire(self.max_in_flight):
+            raise Overloaded()
+        return True
+
+    def release(self):
+        self.state().release()
+
+    def mark(self, key, seconds):
+        """Set a mark every worker on the host sees for ``seconds``, whether or not limits are enabled"""
+        self.state().mark(key, seconds)
+
+    def marked(self, key):
+        return self.state().marked(key)
+
+    def _before(self):
+        endpoint = request.endpoint
+        self.check('ip', client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'), self.proxy_hops),
+                   endpoint)
+        if self.admit(endpoint):
+            request.environ['sssb.admitted'] = True
+
+    def _teardown(self, exc=None):
+        if request.environ.pop('sssb.admitted', False):
+            self.release()
@@ -0,0 +1,232 @@
+# app/replicas.py
+"""
+Read replicas with read-your-writes.
+
+Replica URLs in ``SQLALCHEMY_REPLICA_URIS`` become the binds ``replica1``,
+``replica2``, ... with the primary's engine options. ``RoutingSession`` then
+sends a statement to a replica only when all of these hold:
+- it is a plain SELECT (no FOR UPDATE) issued during a GET/HEAD request
+  authenticated with a JWT, by a session that has not written in its transaction
+- that JWT identity has not committed a write in the last ``REPLICA_STICKY_SECONDS``
+- the replica passed its last health check
+Everything else - writes, reads in write requests, user lookups during JWT
+verification, background jobs, scripts - uses the primary. A request picks one
+healthy replica at random and keeps it.
+
+A write through one worker must pin the user's reads on all the others, so
+the sticky marks never live in a single process: with the 'redis' response
+cache backend they go to redis (shared by every host), otherwise to the rate
+limiter's memory-mapped file (shared by the workers of one host - run more
+than one host only with redis). Health is checked at most every ``REPLICA_HEALTH_INTERVAL`` seconds per
+process: a replica that fails ``SELECT 1``, or on Postgres lags further behind
+than the sticky window, serves no reads until a later check passes. A
+connection or operational error on a replica takes it out straight away
+(the failing request still gets the error).
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session as BaseSession
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset(('GET', 'HEAD'))
+
+# Seconds since the last replayed transaction, or 0 while the replica has replayed all it received
+PG_REPLICATION_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingSession(BaseSession):
+    """Flask-SQLAlchemy session sending per-user tables to their shard (see ``app/sharding.py``)
+    and eligible reads of the primary to a replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            shards = current_app.extensions.get('shard_router')
+            shard = shards.engine_for(mapper, clause) if shards is not None else None
+            if shard is not None:
+                return shard
+        if (bind is None and not self._flushing and not self.info.get('replicas_wrote')
+                and getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None):
+            router = current_app.extensions.get('replica_router')
+            replica = router.read_engine() if router is not None else None
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Flask extension registering replica binds and deciding which one serves a request's reads.
+
+    Must be initialised before ``db.init_app``, which creates the bind engines.
+    """
+
+    def __init__(self, app=None):
+        self._health = {}
+        self._watched = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 10)  # reads stay on the primary this long after a write
+        app.config.setdefault('REPLICA_HEALTH_INTERVAL', 5)
+        app.extensions['replica_router'] = self
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for n, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS'], 1):
+            binds[f'replica{n}'] = {'url': uri, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+        for name, listener in (('after_flush', self._mark_wrote),
+                               ('do_orm_execute', self._mark_wrote_dml),
+                               ('after_commit', self._after_commit),
+                               ('after_rollback', self._after_rollback)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    # Engines and health
+
+    def replicas(self):
+        """``{bind name: engine}`` of the configured replicas"""
+        from .extensions import db
+        engines = {key: engine for key, engine in db.engines.items()
+                   if key is not None and key.startswith('replica')}
+        for key, engine in engines.items():
+            if engine not in self._watched:
+                event.listen(engine, 'handle_error', self._connection_error(key))
+                self._watched.add(engine)
+        return engines
+
+    def _connection_error(self, key):
+        def listener(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+                logger.warning("Replica %s failed, reading from the primary: %s", key, context.original_exception)
+                self._health[key] = (False, time.monotonic())
+        return listener
+
+    def check(self, key, engine):
+        """Probe one replica; True if it can serve reads"""
+        try:
+            with engine.connect() as conn:
+                if conn.dialect.name == 'postgresql':
+                    lag = float(conn.execute(PG_REPLICATION_LAG).scalar() or 0)
+                    if lag > current_app.config['REPLICA_STICKY_SECONDS']:
+                        logger.warning("Replica %s is %.1fs behind, reading from the primary", key, lag)
+                        return False
+                else:
+                    conn.execute(text('SELECT 1'))
+            return True
+        except SQLAlchemyError as e:
+            logger.warning("Replica %s is unavailable, reading from the primary: %s", key, e)
+            return False
+
+    def healthy(self, key, engine):
+        now = time.monotonic()
+        status = self._health.get(key)
+        if status is None or now - status[1] >= current_app.config['REPLICA_HEALTH_INTERVAL']:
+            status = (self.check(key, engine), now)
+            self._health[key] = status
+        return status[0]
+
+    # Routing
+
+    @staticmethod
+    def identity():
+        """JWT identity of the current request, or None before/without verification"""
+        try:
+            return get_jwt_identity()
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def _sticky_key(identity):
+        return f'replicas:sticky:{identity}'
+
+    @staticmethod
+    def _shared_backend():
+        """The response cache backend if all hosts share it, else None"""
+        from .cache import SharedBackend
+        from .extensions import response_cache
+        return response_cache.backend if isinstance(response_cache.backend, SharedBackend) else None
+
+    def is_sticky(self, identity):
+        from .extensions import rate_limiter
+        backend = self._shared_backend()
+        if backend is not None:
+            return backend.get(self._sticky_key(identity)) is not None
+        return rate_limiter.marked(self._sticky_key(identity))
+
+    def stick(self, identity):
+        """Keep ``identity``'s reads on the primary for the sticky window"""
+        from .extensions import rate_limiter
+        if not current_app.config['SQLALCHEMY_REPLICA_URIS']:
+            return
+        seconds = current_app.config['REPLICA_STICKY_SECONDS']
+        backend = self._shared_backend()
+        if backend is not None:
+            backend.set(self._sticky_key(identity), 1, ttl=seconds)
+        else:
+            rate_limiter.mark(self._sticky_key(identity), seconds)
+
+    def read_engine(self):
+        """Replica engine for the current request's reads, or None for the primary"""
+        if (not has_request_context() or not current_app.config['SQLALCHEMY_REPLICA_URIS']
+                or request.method not in READ_METHODS or g.get('replicas_primary')):
+            return None
+        if 'replicas_engine' in g:
+            return g.replicas_engine
+        identity = self.identity()
+        if identity is None:
+            # Not verified yet (user lookup) or not a JWT route: not cached, decided again later
+            return None
+        engine = None
+        if not self.is_sticky(identity):
+            candidates = [engine for key, engine in self.replicas().items() if self.healthy(key, engine)]
+            engine = random.choice(candidates) if candidates else None
+        g.replicas_engine = engine
+        return engine
+
+    @contextmanager
+    def primary(self):
+        """Read from the primary inside the block (e.g. data that is about to be written back)"""
+        previous = g.get('replicas_primary') if has_request_context() else None
+        if has_request_context():
+            g.replicas_primary = True
+        try:
+            yield
+        finally:
+            if has_request_context():
+                g.replicas_primary = previous
+
+    # Write tracking
+
+    @staticmethod
+    def _mark_wrote(session, flush_context):
+        session.info['replicas_wrote'] = True
+
+    @staticmethod
+    def _mark_wrote_dml(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            state.session.info['replicas_wrote'] = True
+
+    def _after_commit(self, session):
+        if session.info.pop('replicas_wrote', False) and has_request_context():
+            identity = self.identity()
+            if identity is not None:
+                self.stick(identity)
+                # Later reads in this request must see the write too
+                g.replicas_engine = None
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('replicas_wrote', None)
@@ -1,8 +1,9 @@
 # app/routes/auth_routes.py
 from flask import Blueprint, request, jsonify
-from ..extensions import db
-from ..models import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from ..extensions import db, shard_router
+from ..models import User, UserShard
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 
 auth_bp = Blueprint("auth_bp", __name__)
 
@@ -16,13 +17,16 @@ def register():
     email = data.get("email")
     password = data.get("password")
 
-    if User.query.filter_by(email=email).first():
+    # Emails are unique across all shards, so check the global directory
+    if UserShard.query.filter_by(email=email).first():
         return jsonify({"error": "Email already exists"}), 400
 
     user = User(username=username, email=email)
     user.set_password(password)
-    db.session.add(user)
-    db.session.commit()
+    try:
+        shard_router.add_user(user)
+    except IntegrityError:
+        return jsonify({"error": "Email already exists"}), 400
 
     return jsonify({"message": "User registered successfully"}), 201
 
@@ -33,10 +37,19 @@ def login():
     email = data.get("email")
     password = data.get("password")
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    shard = shard_router.shard_for_email(email)
+    if shard is None:
         return jsonify({"error": "Invalid credentials"}), 401
 
+    with shard_router.using(shard):
+        user = User.query.filter_by(email=email).first()
+        if not user or not user.check_password(password):
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        # Transparently move the stored hash to the current hash parameters
+        if user.upgrade_password_hash(password):
+            db.session.commit()
+
     token = create_access_token(identity=str(user.id))
     return jsonify({"access_token": token}), 200
 
@@ -44,6 +57,4 @@ def login():
 @auth_bp.route("/profile", methods=["GET"])
 @jwt_required()
 def profile():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    return jsonify({"id": user.id, "username": user.username, "email": user.email})
\ No newline at end of file
+    return jsonify({"id": current_user.id, "username": current_user.username, "email": current_user.email})
\ No newline at end of file
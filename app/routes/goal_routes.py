@@ -1,30 +1,281 @@
 # app/routes/goal_routes.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from ..extensions import db
-from ..models import User, Goal
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
+from datetime import datetime, timedelta
+from sqlalchemy.orm.attributes import set_committed_value
+from .. import analytics, archive, sync
+from ..dictionaries import PRIORITY_RANKS
+from ..extensions import db, response_cache, job_runner, goal_dictionaries
+from ..models import Goal, GoalStats, GoalTombstone
+from ..importer import GoalImport, UploadError, READERS, IMPORT_FORMATS
+from ..pagination import encode_cursor, decode_cursor, keyset_page, keyset_query
+from ..search import search_query, MAX_QUERY_LENGTH
+from ..serializers import parse_fields, goal_columns, rows_to_dicts, json_response, ndjson_chunk, csv_chunk
 
 goal_bp = Blueprint("goals", __name__)
 
+# Sort keys accepted by the goals list endpoint (priority is stored as its rank: low -> medium -> high)
+SORT_KEYS = {
+    'created_at': Goal.created_at,
+    'start_date': Goal.start_date,
+    'end_date': Goal.end_date,
+    'priority': Goal.priority
+}
+
+# Rows fetched from the database cursor (and written to the response) at a time
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Largest look-ahead window of the due endpoint, in days
+MAX_DUE_WITHIN = 3650
+
+VALID_PRIORITIES = ['low', 'medium', 'high']
+REQUIRED_GOAL_FIELDS = ['goal_title', 'goal_type', 'priority', 'category', 'start_date', 'end_date']
+
+def _valid_priority(value):
+    return isinstance(value, str) and value.lower() in VALID_PRIORITIES
+
+def _names_error(data):
+    """Error for a goal_type or category that is not a string (they are stored as lookup table ids)"""
+    for field in ('goal_type', 'category'):
+        if field in data and not isinstance(data[field], str):
+            return f"{field} must be a string"
+    return None
+
+def parse_new_goal(data):
+    """Validate an add-goal payload.
+    
+    Returns ``(values, error)``: the column values for a new goal, or an error message.
+    """
+    # Validate required fields
+    missing_fields = [field for field in REQUIRED_GOAL_FIELDS if not data.get(field)]
+    if missing_fields:
+        return None, f"Missing required fields: {', '.join(missing_fields)}"
+    names_error = _names_error(data)
+    if names_error:
+        return None, names_error
+    
+    # Parse dates
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+    except (ValueError, TypeError) as e:
+        return None, f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"
+    
+    # Validate date logic - allow same day goals
+    if start_date > end_date:
+        return None, "End date must be on or after start date"
+    
+    # Validate priority
+    if not _valid_priority(data['priority']):
+        return None, "Priority must be one of: low, medium, high"
+    
+    return {
+        'goal_title': data['goal_title'],
+        'description': data.get('description', ''),
+        'goal_type': data['goal_type'],
+        'priority': data['priority'].lower(),
+        'category': data['category'],
+        'start_date': start_date,
+        'end_date': end_date
+    }, None
+
+def parse_goal_changes(data):
+    """Validate a partial goal update.
+    
+    Returns ``(changes, error)``: the column values to set, or an error message. Date
+    order can only be checked against the stored goal, see ``dates_in_order``.
+    """
+    names_error = _names_error(data)
+    if names_error:
+        return None, names_error
+    changes = {}
+    for field in ('goal_title', 'description', 'goal_type', 'category'):
+        if field in data:
+            changes[field] = data[field]
+    if 'priority' in data:
+        if not _valid_priority(data['priority']):
+            return None, "Priority must be one of: low, medium, high"
+        changes['priority'] = data['priority'].lower()
+    for field in ('start_date', 'end_date'):
+        if field in data:
+            try:
+                changes[field] = datetime.strptime(data[field], '%Y-%m-%d').date()
+            except (ValueError, TypeError):
+                return None, f"Invalid {field} format. Use YYYY-MM-DD"
+    if 'is_completed' in data:
+        changes['is_completed'] = data['is_completed']
+        changes['completion_date'] = datetime.utcnow().date() if data['is_completed'] else None
+    return changes, None
+
+def dates_in_order(start_date, end_date):
+    """Date logic shared by create and update - allow same day goals"""
+    return not (start_date and end_date and start_date > end_date)
+
+# Goal columns the statistics counters depend on
+STATS_FIELDS = frozenset(('is_completed', 'end_date'))
+
+def goal_etag(version):
+    """Strong ETag of a goal at a row version"""
+    return f'v{version}'
+
+def if_match_versions(if_match):
+    """Goal versions an ``If-Match`` header accepts, or None when any version will do.
+    
+    ``if_match`` is the parsed header (werkzeug ``ETags``). Only strong ``v<version>``
+    tags can match, so a header naming none of them accepts no version at all.
+    """
+    if not if_match or if_match.star_tag:
+        return None
+    return {int(tag[1:]) for tag in if_match.as_set() if tag[:1] == 'v' and tag[1:].isdigit()}
+
+def goal_write_conditions(goal_id, user_id, versions=None, changes=None):
+    """WHERE clause of a single-goal update or delete.
+    
+    Scopes the write to the owner, applies the ``If-Match`` versions and, when an update
+    moves only one of the dates, keeps the stored other date in order.
+    """
+    conditions = [Goal.id == goal_id, Goal.user_id == user_id]
+    if versions is not None:
+        conditions.append(Goal.version.in_(versions))
+    changes = changes or {}
+    if 'start_date' in changes and 'end_date' not in changes:
+        conditions.append(Goal.end_date >= changes['start_date'])
+    elif 'end_date' in changes and 'start_date' not in changes:
+        conditions.append(Goal.start_date <= changes['end_date'])
+    return conditions
+
+def goal_update_statements(conditions, changes, dialect):
+    """Statements of a single-goal update: ``(before, update)``.
+    
+    ``update`` is one ``UPDATE ... RETURNING`` of the goal that bumps its version.
+    When the change can move the statistics counters, the goal's previous
+    ``(is_completed, end_date)`` is needed as well: on Postgres the UPDATE locks and
+    returns it itself (``UPDATE ... FROM (SELECT ... FOR UPDATE)``), so its rows are
+    ``(goal, is_completed, end_date)``. SQLite's RETURNING only sees the new row, so
+    there ``before`` is a locking SELECT of the old values to run first. ``before``
+    is None otherwise.
+    """
+    update = db.update(Goal).values(**changes, version=Goal.version + 1).returning(Goal)
+    if not STATS_FIELDS.intersection(changes):
+        return None, update.where(*conditions)
+    if dialect == 'postgresql':
+        previous = db.select(Goal.id, Goal.is_completed, Goal.end_date) \
+            .where(*conditions).with_for_update().subquery('previous')
+        return None, update.where(Goal.id == previous.c.id).returning(previous.c.is_completed, previous.c.end_date)
+    before = db.select(Goal.is_completed, Goal.end_date).where(*conditions).with_for_update()
+    return before, update.where(*conditions)
+
+def goal_delete_statement(conditions):
+    """One ``DELETE ... RETURNING`` of the goal's ``(is_completed, end_date)``"""
+    return db.delete(Goal).where(*conditions).returning(Goal.is_completed, Goal.end_date)
+
+def current_goal_query(goal_id, user_id):
+    """The goal's version and dates (wherever it is stored), to explain a write that matched no row"""
+    query = db.select(Goal.version, Goal.start_date, Goal.end_date).where(Goal.id == goal_id, Goal.user_id == user_id)
+    return db.union_all(query, archive.archived(query))
+
+def rejected_write(current, versions=None, changes=None):
+    """Why a single-goal write matched no row: ``(error, status)``.
+    
+    ``current`` is the row of ``current_goal_query`` (None if the goal is gone).
+    """
+    if current is None:
+        return "Goal not found", 404
+    if versions is not None and current.version not in versions:
+        return "Goal has been modified; fetch it again for its current ETag", 412
+    if changes and not dates_in_order(changes.get('start_date', current.start_date),
+                                      changes.get('end_date', current.end_date)):
+        return "End date must be on or after start date", 400
+    # The goal changed between the write and this check
+    return "Goal was modified concurrently; please retry", 409
+
+def goal_filters(args):
+    """Conditions for the list endpoint's filter parameters"""
+    conditions = []
+    
+    # Apply filters if provided (a name no goal was ever written with matches nothing)
+    for field, column in (('goal_type', Goal.goal_type), ('category', Goal.category)):
+        if args.get(field):
+            known = goal_dictionaries.fields[field].id_for(args[field]) is not None
+            conditions.append(column == args[field] if known else db.false())
+    if args.get('priority'):
+        priority = args['priority'].lower()
+        conditions.append(Goal.priority == priority if priority in PRIORITY_RANKS else db.false())
+    if args.get('is_completed') is not None:
+        completed = args['is_completed'].lower() == 'true'
+        conditions.append(Goal.is_completed == completed)
+    return conditions
+
+def filtered_goals_query(user_id, args):
+    """Goals of a user narrowed by the list endpoint's filter parameters"""
+    return Goal.query.filter(Goal.user_id == user_id, *goal_filters(args))
+
+def _sort_value(goal, sort_by):
+    """Value of a goal's sort key, as used in pagination cursors"""
+    if sort_by == 'priority':
+        return PRIORITY_RANKS.get(goal.priority)
+    return getattr(goal, sort_by)
+
+def cursor_key_type(sort_field, sort_key):
+    """Type of the sort key a cursor carries (priority cursors carry the rank)"""
+    return int if sort_field == 'priority' else sort_key.type.python_type
+
+def paginated_rows(query, sort_field, sort_key, sort_order, page, per_page, id_column=Goal.id):
+    """One page of a goals query, in cursor or offset mode per the request args.
+    
+    ``id_column`` is the tie-breaker of the order (the union's id when reading the archive too).
+    Returns ``(rows, pagination)``; raises ``ValueError`` for an invalid cursor or page size.
+    """
+    descending = sort_order == 'desc'
+    
+    # Cursor mode: keyset pagination, no COUNT unless explicitly requested
+    cursor = request.args.get('cursor')
+    if cursor is not None or request.args.get('pagination') == 'cursor':
+        after = None
+        if cursor:
+            after = decode_cursor(cursor, sort_field, sort_order, cursor_key_type(sort_field, sort_key))
+        
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        total_items = query.order_by(None).count() if include_total else None
+        
+        rows, has_next = keyset_page(query, sort_key, id_column, descending, after=after, limit=per_page)
+        next_cursor = None
+        if has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_field, sort_order, _sort_value(last, sort_field), last.id)
+        
+        pagination = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_next": has_next
+        }
+        if include_total:
+            pagination["total_items"] = total_items
+        return rows, pagination
+    
+    # Execute query with pagination
+    rows_pagination = keyset_query(query, sort_key, id_column, descending).paginate(
+        page=page, 
+        per_page=per_page, 
+        error_out=False
+    )
+    return rows_pagination.items, {
+        "current_page": page,
+        "per_page": per_page,
+        "total_pages": rows_pagination.pages,
+        "total_items": rows_pagination.total,
+        "has_next": rows_pagination.has_next,
+        "has_prev": rows_pagination.has_prev
+    }
+
 # Add Goal API
 @goal_bp.route("/add/goal", methods=["POST"])
 @jwt_required()
 def add_goal():
     try:
-        # Get current user
-        user_id_str = get_jwt_identity()
-        
-        # Convert string back to integer with error handling
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid user ID in token"}), 401
-            
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+        # Get current user (resolved from the token by the user lookup hook)
+        user_id = current_user.id
         
         # Get request data
         data = request.get_json()
@@ -32,50 +283,19 @@ def add_goal():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        # Debug: Print received data
-        print(f"Received data: {data}")
-        
-        # Validate required fields
-        required_fields = ['goal_title', 'goal_type', 'priority', 'category', 'start_date', 'end_date']
-        missing_fields = []
-        for field in required_fields:
-            if not data.get(field):
-                missing_fields.append(field)
-        
-        if missing_fields:
-            return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
-        
-        # Parse dates
-        try:
-            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-            end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        except ValueError as e:
-            return jsonify({"error": f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"}), 400
-        
-        # Validate date logic - allow same day goals
-        if start_date > end_date:
-            return jsonify({"error": "End date must be on or after start date"}), 400
-        
-        # Validate priority
-        valid_priorities = ['low', 'medium', 'high']
-        if data['priority'].lower() not in valid_priorities:
-            return jsonify({"error": "Priority must be one of: low, medium, high"}), 400
+        values, error = parse_new_goal(data)
+        if error:
+            return jsonify({"error": error}), 400
+        goal_dictionaries.register([values])
         
         # Create new goal
-        new_goal = Goal(
-            goal_title=data['goal_title'],
-            description=data.get('description', ''),
-            goal_type=data['goal_type'],
-            priority=data['priority'].lower(),
-            category=data['category'],
-            start_date=start_date,
-            end_date=end_date,
-            user_id=user_id
-        )
+        new_goal = Goal(user_id=user_id, **values)
         
-        # Save to database
+        # Save to database, keeping the per-user counters in the same transaction
         db.session.add(new_goal)
+        GoalStats.record_change(user_id, after=(False, new_goal.end_date))
         db.session.commit()
+        response_cache.bump(user_id)
         
         return jsonify({
             "message": "Goal created successfully",
@@ -89,10 +309,10 @@ def add_goal():
 # Get All Goals API
 @goal_bp.route("/goals", methods=["GET"])
 @jwt_required()
+@response_cache.cached
 def get_all_goals():
     try:
-        user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)  # Convert string back to integer
+        user_id = current_user.id
         
         # Get query parameters for filtering
         goal_type = request.args.get('goal_type')
@@ -108,92 +328,38 @@ def get_all_goals():
         sort_by = request.args.get('sort_by', 'created_at')  # created_at, start_date, end_date, priority
         sort_order = request.args.get('sort_order', 'desc')  # asc or desc
         
-        # Build query
-        query = Goal.query.filter_by(user_id=user_id)
-        
-        # Apply filters if provided
-        if goal_type:
-            query = query.filter_by(goal_type=goal_type)
-        if priority:
-            query = query.filter_by(priority=priority.lower())
-        if category:
-            query = query.filter_by(category=category)
-        if is_completed is not None:
-            completed = is_completed.lower() == 'true'
-            query = query.filter_by(is_completed=completed)
-        
-        # Apply sorting
-        if sort_by == 'created_at':
-            sort_column = Goal.created_at
-        elif sort_by == 'start_date':
-            sort_column = Goal.start_date
-        elif sort_by == 'end_date':
-            sort_column = Goal.end_date
-        elif sort_by == 'priority':
-            # Custom priority ordering: high -> medium -> low
-            if sort_order == 'desc':
-                query = query.order_by(
-                    db.case(
-                        (Goal.priority == 'high', 1),
-                        (Goal.priority == 'medium', 2),
-                        (Goal.priority == 'low', 3)
-                    )
-                )
-            else:
-                query = query.order_by(
-                    db.case(
-                        (Goal.priority == 'low', 1),
-                        (Goal.priority == 'medium', 2),
-                        (Goal.priority == 'high', 3)
-                    )
-                )
-            sort_column = None
-        else:
-            sort_column = Goal.created_at  # Default fallback
-        
-        if sort_column is not None:
-            if sort_order == 'desc':
-                query = query.order_by(sort_column.desc())
-            else:
-                query = query.order_by(sort_column.asc())
-        
-        # Execute query with pagination
-        goals_pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # Sparse fieldset, e.g. fields=id,goal_title,end_date,is_completed
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Apply sorting (priority sorts high -> medium -> low when descending)
+        sort_field = sort_by if sort_by in SORT_KEYS else 'created_at'  # Default fallback
+        sort_key = SORT_KEYS[sort_field]
         
-        goals = goals_pagination.items
+        # Build query: plain row tuples of the requested columns (plus the cursor's sort key and id)
+        query = filtered_goals_query(user_id, request.args).with_entities(
+            *goal_columns(fields, extra=('id', sort_field))
+        )
+        id_column = Goal.id
+        if archive.includes_archive(request.args):
+            # Completed goals may have moved to the archive table
+            all_goals, adapt = archive.with_archive(query.statement)
+            query, sort_key, id_column = db.session.query(*all_goals.c), adapt(sort_key), adapt(Goal.id)
         
-        # Calculate additional statistics
-        total_goals = Goal.query.filter_by(user_id=user_id).count()
-        completed_goals = Goal.query.filter_by(user_id=user_id, is_completed=True).count()
-        pending_goals = Goal.query.filter_by(user_id=user_id, is_completed=False).count()
+        try:
+            goals, pagination = paginated_rows(query, sort_field, sort_key, sort_order, page, per_page, id_column)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Get overdue goals count
-        from datetime import date
-        overdue_goals = Goal.query.filter_by(user_id=user_id, is_completed=False).filter(
-            Goal.end_date < date.today()
-        ).count()
+        # Statistics come from the per-user summary row (one primary-key lookup)
+        statistics = GoalStats.for_user(user_id).to_dict()
         
-        return jsonify({
-            "goals": [goal.to_dict() for goal in goals],
-            "pagination": {
-                "current_page": page,
-                "per_page": per_page,
-                "total_pages": goals_pagination.pages,
-                "total_items": goals_pagination.total,
-                "has_next": goals_pagination.has_next,
-                "has_prev": goals_pagination.has_prev
-            },
-            "statistics": {
-                "total_goals": total_goals,
-                "completed_goals": completed_goals,
-                "pending_goals": pending_goals,
-                "overdue_goals": overdue_goals,
-                "completion_rate": round((completed_goals / total_goals * 100), 2) if total_goals > 0 else 0
-            },
+        return json_response({
+            "goals": rows_to_dicts(goals, fields),
+            "pagination": pagination,
+            "statistics": statistics,
             "filters_applied": {
                 "goal_type": goal_type,
                 "priority": priority,
@@ -202,72 +368,383 @@ def get_all_goals():
                 "sort_by": sort_by,
                 "sort_order": sort_order
             }
-        }), 200
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Search Goals API
+@goal_bp.route("/goals/search", methods=["GET"])
+@jwt_required()
+@response_cache.cached
+def search_goals():
+    """Ranked full-text search over goal titles and descriptions.
+    
+    Accepts the list endpoint's filters, ``fields`` and pagination parameters;
+    results are ordered by relevance unless ``sort_by`` names a list sort key.
+    """
+    try:
+        user_id = current_user.id
+        
+        q = (request.args.get('q') or '').strip()
+        if not q:
+            return jsonify({"error": "Search query (q) is required"}), 400
+        if len(q) > MAX_QUERY_LENGTH:
+            return jsonify({"error": f"Search query may be at most {MAX_QUERY_LENGTH} characters"}), 400
+        
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+        sort_by = request.args.get('sort_by', 'rank')  # rank or any list sort key
+        sort_order = request.args.get('sort_order', 'desc')
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        query, rank = search_query(filtered_goals_query(user_id, request.args), q, db.engine.dialect.name)
+        if sort_by in SORT_KEYS:
+            sort_field, sort_key = sort_by, SORT_KEYS[sort_by]
+            query = query.with_entities(*goal_columns(fields, extra=('id', sort_field)))
+        else:
+            sort_field, sort_key = 'rank', rank
+            query = query.with_entities(*goal_columns(fields, extra=('id',)), rank.label('rank'))
+        
+        try:
+            goals, pagination = paginated_rows(query, sort_field, sort_key, sort_order, page, per_page)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return json_response({
+            "goals": rows_to_dicts(goals, fields),
+            "pagination": pagination,
+            "query": q,
+            "filters_applied": {
+                "goal_type": request.args.get('goal_type'),
+                "priority": request.args.get('priority'),
+                "category": request.args.get('category'),
+                "is_completed": request.args.get('is_completed'),
+                "sort_by": sort_field,
+                "sort_order": sort_order
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Due Goals API
+@goal_bp.route("/goals/due", methods=["GET"])
+@jwt_required()
+@response_cache.cached
+def get_due_goals():
+    """Pending goals due within ``within`` days (default 7), most urgent first.
+    
+    Overdue goals come first unless ``include_overdue=false``. Each goal carries
+    ``days_remaining`` and ``is_overdue``, computed by the database; the whole list
+    is one range scan of the pending-deadline index.
+    """
+    try:
+        user_id = current_user.id
+        
+        try:
+            within = int(request.args.get('within', 7))
+        except ValueError:
+            return jsonify({"error": "within must be a whole number of days"}), 400
+        if not 0 <= within <= MAX_DUE_WITHIN:
+            return jsonify({"error": f"within must be between 0 and {MAX_DUE_WITHIN}"}), 400
+        include_overdue = request.args.get('include_overdue', 'true').lower() == 'true'
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        today = datetime.utcnow().date()
+        days_remaining = Goal.days_remaining_expression(today)
+        pending = Goal.is_completed == False  # noqa: E712 (matches the partial index predicate)
+        query = Goal.query.filter(Goal.user_id == user_id, pending, Goal.end_date <= today + timedelta(days=within))
+        if not include_overdue:
+            query = query.filter(Goal.end_date >= today)
+        query = query.with_entities(*goal_columns(fields, extra=('id', 'end_date')), days_remaining.label('days_remaining'))
+        
+        try:
+            goals, pagination = paginated_rows(query, 'end_date', Goal.end_date, 'asc', page, per_page)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return json_response({
+            "goals": [
+                dict(zip(fields, row), days_remaining=row.days_remaining, is_overdue=row.days_remaining < 0)
+                for row in goals
+            ],
+            "pagination": pagination,
+            "as_of": today,
+            "within": within,
+            "include_overdue": include_overdue
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Goal Changes API
+@goal_bp.route("/goals/changes", methods=["GET"])
+@jwt_required()
+def get_goal_changes():
+    """Goals created or updated and goal ids deleted since the ``since`` cursor.
+    
+    Without ``since`` the feed starts with every goal (a full sync). Keep calling
+    with ``next_cursor`` while ``has_more`` is true, then store it for the next
+    sync. A cursor older than the tombstone retention gets 410; sync again
+    without ``since``.
+    """
+    try:
+        user_id = current_user.id
+        
+        try:
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            return jsonify({"error": "limit must be a whole number"}), 400
+        if not 1 <= limit <= sync.MAX_CHANGES_PAGE:
+            return jsonify({"error": f"limit must be between 1 and {sync.MAX_CHANGES_PAGE}"}), 400
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            goals, deleted, next_cursor, has_more = sync.changes_since(
+                user_id, request.args.get('since'), fields, limit
+            )
+        except sync.CursorExpired as e:
+            return jsonify({"error": str(e)}), 410
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return json_response({
+            "goals": rows_to_dicts(goals, fields),
+            "deleted": deleted,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Goal Analytics API
+@goal_bp.route("/goals/analytics", methods=["GET"])
+@jwt_required()
+@response_cache.cached
+def get_goal_analytics():
+    """Goals created and completed per ``bucket`` (week or month) over the last ``periods`` periods.
+    
+    ``group_by`` (category, goal_type or priority) splits each count into a map of
+    group value to count. Closed periods are served from the cache; only the
+    current period is recounted on every load.
+    """
+    try:
+        user_id = current_user.id
+        
+        bucket = request.args.get('bucket', 'week')
+        if bucket not in analytics.BUCKETS:
+            return jsonify({"error": f"bucket must be one of: {', '.join(analytics.BUCKETS)}"}), 400
+        group_by = request.args.get('group_by') or None
+        if group_by is not None and group_by not in analytics.GROUP_BY:
+            return jsonify({"error": f"group_by must be one of: {', '.join(analytics.GROUP_BY)}"}), 400
+        try:
+            periods = int(request.args.get('periods', 12))
+        except ValueError:
+            return jsonify({"error": "periods must be a whole number"}), 400
+        if not 1 <= periods <= analytics.MAX_PERIODS:
+            return jsonify({"error": f"periods must be between 1 and {analytics.MAX_PERIODS}"}), 400
+        
+        return json_response({
+            "bucket": bucket,
+            "group_by": group_by,
+            "series": analytics.goal_analytics(user_id, bucket, group_by, periods)
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Export Goals API
+@goal_bp.route("/goals/export", methods=["GET"])
+@jwt_required()
+def export_goals():
+    """Stream all of the user's goals (archived ones included) matching the list filters as NDJSON or CSV.
+    
+    Rows come from a server-side cursor in chunks of ``EXPORT_CHUNK_SIZE`` and are
+    written out as they arrive, so memory use does not grow with the number of goals.
+    """
+    try:
+        user_id = current_user.id
+        
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # An export covers archived goals too; created_at, id order is served by the
+        # (user_id, created_at, id) index of each table (merged on Postgres)
+        all_goals, adapt = archive.with_archive(
+            filtered_goals_query(user_id, request.args).with_entities(
+                *goal_columns(fields, extra=('created_at', 'id'))
+            ).statement
+        )
+        statement = db.select(*all_goals.c).order_by(adapt(Goal.created_at), adapt(Goal.id))
+        
+        def generate():
+            try:
+                result = db.session.execute(statement, execution_options={'yield_per': EXPORT_CHUNK_SIZE})
+                if export_format == 'csv':
+                    yield csv_chunk([], fields, header=True)
+                for rows in result.partitions():
+                    yield csv_chunk(rows, fields) if export_format == 'csv' else ndjson_chunk(rows, fields)
+            except Exception:
+                # Headers are already sent; the truncated body is all the client will see
+                current_app.logger.exception("Goal export for user %s failed", user_id)
+                db.session.rollback()
+        
+        response = current_app.response_class(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename=goals.{export_format}'
+        return response
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Import Goals API
+@goal_bp.route("/goals/import", methods=["POST"])
+@jwt_required()
+def import_goals():
+    """Create goals from a CSV or NDJSON upload, validated like add_goal.
+    
+    The body is the file itself, or a multipart form with a ``file`` part. The
+    format comes from ``format=csv|ndjson``, else the file name or Content-Type.
+    ``dry_run=true`` only validates. Invalid rows are reported and skipped.
+    """
+    user_id = current_user.id
+    
+    # Get the upload without reading it into memory
+    filename = None
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({"error": "No file provided"}), 400
+        stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, mimetype = request.stream, request.mimetype
+    
+    import_format = request.args.get('format')
+    if import_format is None and filename and '.' in filename:
+        import_format = filename.rsplit('.', 1)[1].lower()
+    if import_format not in IMPORT_FORMATS:
+        import_format = next((name for name, media_type in IMPORT_FORMATS.items() if media_type == mimetype), import_format)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+    
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    goal_import = GoalImport(user_id, parse_new_goal, dry_run=dry_run)
+    try:
+        goal_import.run(READERS[import_format](stream))
+        status, message = 200, "Dry run completed" if dry_run else "Import completed"
+    except UploadError as e:
+        db.session.rollback()
+        status, message = 400, str(e)
+    except Exception as e:
+        db.session.rollback()
+        status, message = 500, f"An error occurred: {str(e)}"
+    finally:
+        if goal_import.summary['imported']:
+            response_cache.bump(user_id)
+    
+    body = {
+        "dry_run": dry_run,
+        "summary": goal_import.summary,
+        "errors": goal_import.errors,
+        "errors_truncated": goal_import.summary['failed'] > len(goal_import.errors),
+        "duration_ms": round(goal_import.elapsed * 1000, 1),
+        "rows_per_second": goal_import.rows_per_second
+    }
+    # Chunks committed before a failure stay imported; the summary says how many
+    body["message" if status == 200 else "error"] = message
+    return jsonify(body), status
+
+# Rebuild Statistics API
+@goal_bp.route("/goals/stats/rebuild", methods=["POST"])
+@jwt_required()
+def rebuild_goal_stats():
+    """Recompute the user's goal counters in the background; poll the returned job"""
+    try:
+        user_id = current_user.id
+        job = job_runner.enqueue('rebuild_stats', {'user_id': user_id}, user_id=user_id)
+        db.session.commit()
+        return jsonify({"message": "Statistics rebuild queued", "job": job.to_dict()}), 202, \
+            {'Location': f'/api/jobs/{job.id}'}
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 # Update Goal API
 @goal_bp.route("/goal/<int:goal_id>", methods=["PUT"])
 @jwt_required()
 def update_goal(goal_id):
+    """Partial update with one owner-scoped ``UPDATE ... RETURNING``; honours ``If-Match``"""
     try:
-        user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)  # Convert string back to integer
-        
-        # Find the goal
-        goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
-        if not goal:
-            return jsonify({"error": "Goal not found"}), 404
+        user_id = current_user.id
         
         # Get request data
         data = request.get_json()
         
-        # Update fields if provided
-        if 'goal_title' in data:
-            goal.goal_title = data['goal_title']
-        if 'description' in data:
-            goal.description = data['description']
-        if 'goal_type' in data:
-            goal.goal_type = data['goal_type']
-        if 'priority' in data:
-            if data['priority'].lower() in ['low', 'medium', 'high']:
-                goal.priority = data['priority'].lower()
-            else:
-                return jsonify({"error": "Priority must be one of: low, medium, high"}), 400
-        if 'category' in data:
-            goal.category = data['category']
-        if 'start_date' in data:
-            try:
-                goal.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({"error": "Invalid start_date format. Use YYYY-MM-DD"}), 400
-        if 'end_date' in data:
-            try:
-                goal.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({"error": "Invalid end_date format. Use YYYY-MM-DD"}), 400
-        if 'is_completed' in data:
-            goal.is_completed = data['is_completed']
-            if data['is_completed']:
-                goal.completion_date = datetime.utcnow().date()
-            else:
-                goal.completion_date = None
-        
-        # Validate date logic if both dates are present - allow same day goals
-        if goal.start_date and goal.end_date and goal.start_date > goal.end_date:
+        # Validate the changes (both dates given: checked here, one date: checked in the UPDATE)
+        changes, error = parse_goal_changes(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if not dates_in_order(changes.get('start_date'), changes.get('end_date')):
             return jsonify({"error": "End date must be on or after start date"}), 400
-        
-        # Update timestamp
-        goal.updated_at = datetime.utcnow()
-        
-        # Save changes
-        db.session.commit()
-        
-        return jsonify({
+        goal_dictionaries.register([changes])
+        
+        # Write the goal (updated_at is set by the column's onupdate)
+        versions = if_match_versions(request.if_match)
+        conditions = goal_write_conditions(goal_id, user_id, versions, changes)
+        before_query, statement = goal_update_statements(conditions, changes, db.engine.dialect.name)
+        
+        def write():
+            before = db.session.execute(before_query).first() if before_query is not None else None
+            if before_query is not None and before is None:
+                return None, None
+            return db.session.execute(statement, execution_options={'synchronize_session': False}).first(), before
+        
+        row, before = write()
+        if row is None and archive.restore(user_id, [goal_id]):
+            # An archived goal moves back to the hot table before it is written
+            row, before = write()
+        if row is None:
+            db.session.rollback()
+            error, status = rejected_write(db.session.execute(current_goal_query(goal_id, user_id)).first(),
+                                           versions, changes)
+            return jsonify({"error": error}), status
+        goal, before = row[0], tuple(row[1:]) or before
+        
+        # Save changes (the response is built first: committing expires the returned goal)
+        if before is not None:
+            GoalStats.record_change(user_id, before=tuple(before), after=(goal.is_completed, goal.end_date))
+        response = jsonify({
             "message": "Goal updated successfully",
             "goal": goal.to_dict()
-        }), 200
+        })
+        response.set_etag(goal_etag(goal.version))
+        db.session.commit()
+        response_cache.bump(user_id)
+        if analytics.HISTORY_FIELDS.intersection(changes):
+            analytics.invalidate(user_id)
+        
+        return response, 200
         
     except Exception as e:
         db.session.rollback()
@@ -276,16 +753,27 @@ def update_goal(goal_id):
 # Get Single Goal API
 @goal_bp.route("/goal/<int:goal_id>", methods=["GET"])
 @jwt_required()
+@response_cache.cached
 def get_goal(goal_id):
     try:
-        user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)  # Convert string back to integer
+        user_id = current_user.id
         
-        goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
-        if not goal:
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        query = Goal.query.filter_by(id=goal_id, user_id=user_id).with_entities(*goal_columns(fields), Goal.version)
+        row = query.first()
+        if not row:
+            # Completed long ago: moved to the archive table
+            row = db.session.execute(archive.archived(query.statement)).first()
+        if not row:
             return jsonify({"error": "Goal not found"}), 404
         
-        return jsonify({"goal": goal.to_dict()}), 200
+        response = json_response({"goal": rows_to_dicts([row], fields)[0]})
+        response.set_etag(goal_etag(row[-1]))
+        return response
         
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
@@ -294,19 +782,170 @@ def get_goal(goal_id):
 @goal_bp.route("/goal/<int:goal_id>", methods=["DELETE"])
 @jwt_required()
 def delete_goal(goal_id):
+    """Delete with one owner-scoped ``DELETE ... RETURNING``; honours ``If-Match``"""
     try:
-        user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)  # Convert string back to integer
+        user_id = current_user.id
+        
+        versions = if_match_versions(request.if_match)
+        statement = goal_delete_statement(goal_write_conditions(goal_id, user_id, versions))
+        row = db.session.execute(statement, execution_options={'synchronize_session': False}).first()
+        if row is None and archive.restore(user_id, [goal_id]):
+            row = db.session.execute(statement, execution_options={'synchronize_session': False}).first()
+        if row is None:
+            db.session.rollback()
+            error, status = rejected_write(db.session.execute(current_goal_query(goal_id, user_id)).first(), versions)
+            return jsonify({"error": error}), status
+        
+        GoalStats.record_change(user_id, before=tuple(row))
+        GoalTombstone.record(user_id, [goal_id])
+        db.session.commit()
+        response_cache.bump(user_id)
+        analytics.invalidate(user_id)
         
-        goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
-        if not goal:
-            return jsonify({"error": "Goal not found"}), 404
+        return jsonify({"message": "Goal deleted successfully"}), 200
         
-        db.session.delete(goal)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# Largest number of operations accepted by one batch request
+MAX_BATCH_SIZE = 500
+
+# Batch Create/Update/Delete API
+@goal_bp.route("/goals/batch", methods=["POST"])
+@jwt_required()
+def batch_goals():
+    """Apply many creates, partial updates and deletes in one transaction.
+    
+    Body: ``{"create": [goal, ...], "update": [{"id": ..., <fields>}, ...], "delete": [id, ...]}``.
+    Each item is validated like its single-goal endpoint and gets its own result; invalid
+    items are reported without affecting the others. Valid items are written with one
+    bulk INSERT, one bulk UPDATE and one DELETE.
+    """
+    try:
+        user_id = current_user.id
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        creates = data.get('create') or []
+        updates = data.get('update') or []
+        deletes = data.get('delete') or []
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            return jsonify({"error": "create, update and delete must be lists"}), 400
+        if len(creates) + len(updates) + len(deletes) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"A batch may contain at most {MAX_BATCH_SIZE} operations"}), 413
+        # Before the first write: new names are added in a transaction of their own
+        goal_dictionaries.register(item for item in creates + updates if isinstance(item, dict))
+        
+        stats = db.session.get(GoalStats, user_id)
+        as_of = stats.overdue_as_of if stats else None
+        stats_delta = [0, 0, 0]
+        
+        def track(before=None, after=None):
+            for i, value in enumerate(GoalStats.delta(as_of, before, after)):
+                stats_delta[i] += value
+        
+        # Creates: validate each, then one multi-row INSERT ... RETURNING
+        create_results = [None] * len(creates)
+        rows, row_indexes = [], []
+        for index, item in enumerate(creates):
+            values, error = parse_new_goal(item) if isinstance(item, dict) else (None, "Goal must be an object")
+            if error:
+                create_results[index] = {"index": index, "status": 400, "error": error}
+                continue
+            rows.append(dict(values, user_id=user_id))
+            row_indexes.append(index)
+        if rows:
+            created = db.session.scalars(db.insert(Goal).returning(Goal, sort_by_parameter_order=True), rows).all()
+            for index, goal in zip(row_indexes, created):
+                track(after=(goal.is_completed, goal.end_date))
+                create_results[index] = {"index": index, "status": 201, "goal": goal.to_dict()}
+        
+        # Updates: lock the targeted goals with one owner-scoped SELECT ... FOR UPDATE, so the
+        # versions and previous values read here stay current until the bulk UPDATE by id
+        update_results = [None] * len(updates)
+        ids = [item.get('id') for item in updates if isinstance(item, dict) and isinstance(item.get('id'), int)]
+        delete_ids = {goal_id for goal_id in deletes if isinstance(goal_id, int)}
+        if ids or delete_ids:
+            # Archived goals move back to the hot table before they are written
+            archive.restore(user_id, set(ids) | delete_ids)
+        goals = {
+            goal.id: goal for goal in
+            Goal.query.filter(Goal.user_id == user_id, Goal.id.in_(ids)).with_for_update().populate_existing()
+        } if ids else {}
+        seen, update_rows, updated = set(), [], []
+        now = datetime.utcnow()
+        for index, item in enumerate(updates):
+            goal_id = item.get('id') if isinstance(item, dict) else None
+            goal = goals.get(goal_id) if isinstance(goal_id, int) else None
+            if goal is None:
+                update_results[index] = {"index": index, "id": goal_id, "status": 404, "error": "Goal not found"}
+                continue
+            if goal_id in seen:
+                update_results[index] = {"index": index, "id": goal_id, "status": 400, "error": "Goal appears more than once in update"}
+                continue
+            seen.add(goal_id)
+            
+            changes, error = parse_goal_changes({k: v for k, v in item.items() if k != 'id'})
+            if not error and not dates_in_order(changes.get('start_date', goal.start_date), changes.get('end_date', goal.end_date)):
+                error = "End date must be on or after start date"
+            if error:
+                update_results[index] = {"index": index, "id": goal_id, "status": 400, "error": error}
+                continue
+            
+            changes['updated_at'] = now
+            changes['version'] = goal.version + 1
+            update_rows.append(dict(changes, id=goal_id))
+            updated.append((index, goal, changes, (goal.is_completed, goal.end_date)))
+        if update_rows:
+            db.session.execute(db.update(Goal), update_rows)
+            for index, goal, changes, before in updated:
+                # Reflect the written values on the loaded objects without another flush
+                for field, value in changes.items():
+                    set_committed_value(goal, field, value)
+                track(before=before, after=(goal.is_completed, goal.end_date))
+                update_results[index] = {"index": index, "id": goal.id, "status": 200, "goal": goal.to_dict()}
+        
+        # Deletes: one owner-scoped DELETE ... RETURNING
+        deleted = set()
+        if delete_ids:
+            result = db.session.execute(
+                db.delete(Goal)
+                .where(Goal.user_id == user_id, Goal.id.in_(delete_ids))
+                .returning(Goal.id, Goal.is_completed, Goal.end_date),
+                execution_options={'synchronize_session': False}
+            )
+            for goal_id, is_completed, end_date in result:
+                deleted.add(goal_id)
+                track(before=(is_completed, end_date))
+            GoalTombstone.record(user_id, deleted)
+        delete_results = [
+            {"index": index, "id": goal_id, "status": 200} if goal_id in deleted
+            else {"index": index, "id": goal_id, "status": 404, "error": "Goal not found"}
+            for index, goal_id in enumerate(deletes)
+        ]
+        
+        GoalStats.apply_delta(user_id, *stats_delta)
         db.session.commit()
+        response_cache.bump(user_id)
+        if deleted or any(analytics.HISTORY_FIELDS.intersection(changes) for _, _, changes, _ in updated):
+            analytics.invalidate(user_id)
         
-        return jsonify({"message": "Goal deleted successfully"}), 200
+        results = {"create": create_results, "update": update_results, "delete": delete_results}
+        return jsonify({
+            "message": "Batch processed",
+            "results": results,
+            "summary": {
+                operation: {
+                    "succeeded": sum(1 for item in items if item["status"] < 400),
+                    "failed": sum(1 for item in items if item["status"] >= 400)
+                }
+                for operation, items in results.items()
+            }
+        }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
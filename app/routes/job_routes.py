@@ -0,0 +1,34 @@
+# app/routes/job_routes.py
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, current_user
+from ..models import Job
+
+job_bp = Blueprint("jobs", __name__)
+
+# Get Job Status API
+@job_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    try:
+        job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify({"job": job.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# List Jobs API
+@job_bp.route("/jobs", methods=["GET"])
+@jwt_required()
+def get_jobs():
+    try:
+        query = Job.query.filter_by(user_id=current_user.id)
+        if request.args.get('status'):
+            query = query.filter_by(status=request.args['status'])
+        limit = min(int(request.args.get('limit', 20)), 100)
+        jobs = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit).all()
+        return jsonify({"jobs": [job.to_dict() for job in jobs]}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
+from ..extensions import instrumentation
 
 main_bp = Blueprint("main_bp", __name__)
 
@@ -9,3 +10,9 @@ def home():
 @main_bp.route("/health")
 def health():
     return jsonify({"status": "ok"}), 200
+
+@main_bp.route("/metrics")
+def metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return instrumentation.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,48 @@
+# app/search.py
+"""
+Ranked full-text search over goal titles and descriptions.
+
+The index lives in the database and is kept current on every write (see
+migration 0003):
+- Postgres: the generated ``goals.search_vector`` tsvector column (title
+  weighted above description) with a GIN index; queries use
+  ``websearch_to_tsquery``, so quoted phrases, ``or`` and ``-word`` work.
+- SQLite: the ``goals_fts`` FTS5 table, maintained by triggers; every word of
+  the query must match.
+
+Both stem English words and rank title matches first. Higher rank is better.
+"""
+import re
+import sqlalchemy as sa
+from .models import Goal
+
+SEARCH_CONFIG = 'english'
+MAX_QUERY_LENGTH = 200
+
+_goals_search = sa.table('goals', sa.column('search_vector'))
+_goals_fts = sa.table('goals_fts', sa.column('rowid'), sa.column('goals_fts'))
+
+
+def fts5_query(q):
+    """FTS5 MATCH expression requiring every word of ``q`` (operators in ``q`` are not interpreted)"""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', q))
+
+
+def search_query(query, q, dialect):
+    """Narrow a goals query to matches of ``q``; returns ``(query, rank)``"""
+    if dialect == 'postgresql':
+        tsquery = sa.func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        vector = _goals_search.c.search_vector
+        rank = sa.func.ts_rank_cd(vector, tsquery, type_=sa.Float)
+        return query.filter(vector.op('@@')(tsquery)), rank
+
+    if dialect == 'sqlite':
+        # bm25() is lower for better matches; weights are (goal_title, description)
+        rank = -sa.func.bm25(sa.literal_column('goals_fts'), 10.0, 1.0, type_=sa.Float)
+        match = fts5_query(q)
+        query = query.join(_goals_fts, _goals_fts.c.rowid == Goal.id)
+        # A query without any words matches nothing (FTS5 rejects an empty expression)
+        query = query.filter(_goals_fts.c.goals_fts.op('MATCH')(match) if match else sa.false())
+        return query, rank
+
+    raise NotImplementedError(f"Full-text search is not supported on {dialect}")
@@ -0,0 +1,110 @@
+# app/serializers.py
+"""
+ORM-free serialization of goal responses.
+
+List and detail reads select only the columns a response needs as plain row
+tuples (no ``Goal`` instances, no identity map) and encode them straight to
+JSON bytes. The output matches ``Goal.to_dict()`` + ``jsonify`` key for key;
+``fields=`` narrows it to a sparse fieldset.
+
+``ndjson_chunk`` and ``csv_chunk`` encode batches of the same rows for exports.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from flask import current_app
+from .instrumentation import serialization_timer
+from .models import Goal
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to the standard library
+    orjson = None
+
+# Response fields in Goal.to_dict() order, with the column each one reads
+GOAL_FIELDS = {
+    'id': Goal.id,
+    'goal_title': Goal.goal_title,
+    'description': Goal.description,
+    'goal_type': Goal.goal_type,
+    'priority': Goal.priority,
+    'category': Goal.category,
+    'start_date': Goal.start_date,
+    'end_date': Goal.end_date,
+    'user_id': Goal.user_id,
+    'created_at': Goal.created_at,
+    'updated_at': Goal.updated_at,
+    'is_completed': Goal.is_completed,
+    'completion_date': Goal.completion_date
+}
+
+
+def parse_fields(value):
+    """Field names requested with ``fields=a,b,c`` (all fields when empty).
+
+    Raises ``ValueError`` naming any unknown field.
+    """
+    if not value:
+        return list(GOAL_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in GOAL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def goal_columns(fields, extra=()):
+    """Columns to select for ``fields``, followed by any ``extra`` fields needed internally"""
+    names = list(fields) + [name for name in extra if name not in fields]
+    return [GOAL_FIELDS[name].label(name) for name in names]
+
+
+def rows_to_dicts(rows, fields):
+    """Plain dicts for projected rows; only the first ``len(fields)`` columns are kept"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode a response payload to JSON bytes (sorted keys, like ``jsonify``)"""
+    with serialization_timer():
+        if orjson is not None:
+            return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(payload, default=_default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def json_response(payload, status=200):
+    """Response with a payload encoded by ``dumps``"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+def ndjson_chunk(rows, fields):
+    """One JSON object per line for a batch of projected rows"""
+    return b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in rows)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunk(rows, fields, header=False):
+    """CSV lines for a batch of projected rows, optionally preceded by the header line"""
+    with serialization_timer():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        if header:
+            writer.writerow(fields)
+        writer.writerows([_csv_value(value) for value in row[:len(fields)]] for row in rows)
+        return buffer.getvalue().encode()
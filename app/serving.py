@@ -0,0 +1,170 @@
+# app/serving.py
+"""
+Production serving profile.
+
+One place derives both the gunicorn settings and the SQLAlchemy pool settings
+from a few environment variables, so the number of requests a worker can run at
+once and the number of database connections it may hold always agree:
+
+    WEB_CONCURRENCY          gunicorn worker processes
+    GUNICORN_WORKER_CLASS    sync | gthread | gevent | uvicorn (default gthread)
+    GUNICORN_THREADS         threads per worker (gthread)
+    GUNICORN_WORKER_CONNECTIONS  greenlets per worker (gevent)
+    GUNICORN_TIMEOUT         worker timeout, seconds
+    DB_MAX_CONNECTIONS       connections the database (or PgBouncer) grants this app
+    DB_POOL_MODE             direct | pgbouncer
+    DB_POOL_OVERFLOW         extra connections per worker for background work
+    DB_STATEMENT_TIMEOUT_MS  per-statement timeout (direct mode)
+
+Each in-flight request holds at most one connection (Flask-SQLAlchemy's scoped
+session), so a worker's pool is sized to its request concurrency. If
+workers x (pool + overflow) would exceed DB_MAX_CONNECTIONS, per-worker
+concurrency is reduced until it fits, never the other way around.
+
+In ``pgbouncer`` mode the app talks to PgBouncer in transaction pooling mode:
+PgBouncer owns the server connections, the app keeps no pool of its own
+(``NullPool``) and sends no startup parameters (PgBouncer rejects them), so set
+``statement_timeout`` on the database role instead.
+
+The ``uvicorn`` worker class serves the async app (``asgi:app``, see
+``app/asgi.py``). Its pool gets the whole per-worker budget; requests beyond
+the pool wait for a connection as suspended coroutines rather than blocked
+threads, so a worker can hold many more client connections than it runs queries.
+"""
+import multiprocessing
+import os
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent', 'uvicorn')
+
+
+def _int(env, name, default):
+    value = env.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def serving_profile(env=None):
+    """Worker model, per-worker concurrency and pool sizing derived from the environment"""
+    env = os.environ if env is None else env
+    cpus = multiprocessing.cpu_count()
+
+    worker_class = env.get('GUNICORN_WORKER_CLASS', 'gthread')
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f"GUNICORN_WORKER_CLASS must be one of: {', '.join(WORKER_CLASSES)}")
+
+    if worker_class == 'sync':
+        workers = _int(env, 'WEB_CONCURRENCY', 2 * cpus + 1)
+        concurrency = 1
+    elif worker_class == 'gthread':
+        workers = _int(env, 'WEB_CONCURRENCY', cpus)
+        concurrency = _int(env, 'GUNICORN_THREADS', 4)
+    else:
+        workers = _int(env, 'WEB_CONCURRENCY', cpus)
+        concurrency = _int(env, 'GUNICORN_WORKER_CONNECTIONS', 100)
+
+    pool_mode = env.get('DB_POOL_MODE', 'direct')
+    if pool_mode not in ('direct', 'pgbouncer'):
+        raise ValueError("DB_POOL_MODE must be 'direct' or 'pgbouncer'")
+    max_connections = _int(env, 'DB_MAX_CONNECTIONS', 20)
+    overflow = _int(env, 'DB_POOL_OVERFLOW', 2)
+    if not env.get('WEB_CONCURRENCY'):
+        # CPU-based default, capped so every worker still gets a pool of at least two
+        workers = max(1, min(workers, max_connections // (2 + overflow)))
+
+    # Connections this app may hold per worker process
+    per_worker = max_connections // workers
+    if per_worker < 1 + overflow:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} cannot give {workers} workers a connection each "
+            f"plus DB_POOL_OVERFLOW={overflow}; lower WEB_CONCURRENCY or raise DB_MAX_CONNECTIONS"
+        )
+    pool_size = per_worker - overflow if worker_class == 'uvicorn' else min(concurrency, per_worker - overflow)
+    if worker_class != 'uvicorn':
+        # Threads/greenlets beyond the pool would only queue on it (and time out under load)
+        concurrency = min(concurrency, pool_size)
+
+    return {
+        'worker_class': worker_class,
+        'workers': workers,
+        'concurrency': concurrency,
+        'pool_mode': pool_mode,
+        'pool_size': pool_size,
+        'max_overflow': overflow,
+        'max_connections': max_connections,
+        'timeout': _int(env, 'GUNICORN_TIMEOUT', 30),
+        'pool_timeout': _int(env, 'DB_POOL_TIMEOUT', 10),
+        'pool_recycle': _int(env, 'DB_POOL_RECYCLE', 1800),
+        'statement_timeout_ms': _int(env, 'DB_STATEMENT_TIMEOUT_MS', 5000),
+    }
+
+
+def gunicorn_settings(env=None):
+    """Module-level settings for gunicorn.conf.py"""
+    env = os.environ if env is None else env
+    profile = serving_profile(env)
+    settings = {
+        'bind': f"0.0.0.0:{env.get('PORT', '5000')}",
+        'workers': profile['workers'],
+        'worker_class': profile['worker_class'],
+        'timeout': profile['timeout'],
+        'graceful_timeout': profile['timeout'],
+        'keepalive': 5,
+        # Recycle workers now and then so slow leaks can't accumulate
+        'max_requests': 5000,
+        'max_requests_jitter': 500,
+    }
+    if profile['worker_class'] == 'gthread':
+        settings['threads'] = profile['concurrency']
+    elif profile['worker_class'] == 'gevent':
+        settings['worker_connections'] = profile['concurrency']
+    elif profile['worker_class'] == 'uvicorn':
+        settings['worker_class'] = 'uvicorn.workers.UvicornWorker'
+    return settings
+
+
+def engine_options(database_url, env=None):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` matching the serving profile"""
+    profile = serving_profile(env)
+    if database_url.startswith('sqlite'):
+        if database_url in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {'pool_size': profile['pool_size'], 'max_overflow': profile['max_overflow'],
+                'pool_timeout': profile['pool_timeout']}
+
+    if profile['pool_mode'] == 'pgbouncer':
+        from sqlalchemy.pool import NullPool
+        return {'poolclass': NullPool, 'connect_args': {'connect_timeout': 5}}
+
+    return {
+        'pool_size': profile['pool_size'],
+        'max_overflow': profile['max_overflow'],
+        'pool_timeout': profile['pool_timeout'],
+        'pool_recycle': profile['pool_recycle'],
+        'pool_pre_ping': True,
+        'connect_args': {
+            'connect_timeout': 5,
+            'options': f"-c statement_timeout={profile['statement_timeout_ms']}",
+        },
+    }
+
+
+def async_engine_options(database_url, env=None):
+    """``create_async_engine`` options matching the serving profile (asyncpg / aiosqlite)"""
+    options = engine_options(database_url, env)
+    if database_url.startswith('sqlite'):
+        if options:
+            # aiosqlite defaults to NullPool; keep a pool like the sync engine does
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            options['poolclass'] = AsyncAdaptedQueuePool
+        return options
+    connect_args = options.pop('connect_args', None)
+    if connect_args is None:
+        return options
+    profile = serving_profile(env)
+    # asyncpg names the psycopg2 connect arguments differently
+    options['connect_args'] = {'timeout': connect_args['connect_timeout']}
+    if profile['pool_mode'] == 'pgbouncer':
+        # Prepared statements don't survive PgBouncer's transaction pooling
+        options['connect_args']['statement_cache_size'] = 0
+    else:
+        options['connect_args']['server_settings'] = {'statement_timeout': str(profile['statement_timeout_ms'])}
+    return options
@@ -0,0 +1,457 @@
+# app/sharding.py
+"""
+Horizontal sharding of users and their goals by user id.
+
+The primary database (``SQLALCHEMY_DATABASE_URI``) is shard 0. Each URL in
+``SQLALCHEMY_SHARD_URIS`` adds a shard, reached through the binds ``shard1``,
+``shard2``, ... The ``users``, ``goals``, ``goals_archive``, ``goal_stats`` and
+``goal_tombstones`` rows of a user all live on one shard. The global tables stay on the primary:
+- ``user_shards``: the directory mapping each user to a shard; it also
+  allocates user ids and keeps emails unique across shards
+- ``jobs``
+
+The routing session sends statements on sharded tables to the current shard.
+JWT-protected requests select the user's shard while the token is verified.
+Other code selects one explicitly with ``shard_router.using(shard)`` or
+``shard_router.for_user(user_id)``. With a single shard all of this is a no-op.
+
+Goal and tombstone ids are drawn from an ``id_blocks`` counter on each shard,
+starting at ``shard * SHARD_ID_SPAN``. Ids therefore stay unique when a user's
+rows are moved to another shard, and moves keep them unchanged. A process
+reserves ``SHARD_ID_BLOCK`` ids at a time, inside the inserting transaction. It
+reuses the rest of a block only once that transaction commits. Bulk imports,
+whose COPY skips column defaults, reserve one block per chunk (``allocate_many``).
+
+``move_user`` moves a user online:
+1. The directory entry is marked as moving. After the directory cache TTL and a
+   settle time, every process refuses the user's writes (503), and writes
+   already under way have committed.
+2. The rows are copied to the target shard in one transaction.
+3. The entry is pointed at the target. Once cached entries have expired, the
+   source rows are deleted.
+Reads are served throughout, from the source until the switch.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import Pool
+from sqlalchemy.sql.util import find_tables
+from .cache import LRUBackend
+from .replicas import READ_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Per-user tables, in foreign key order
+SHARDED_TABLES = ('users', 'goals', 'goals_archive', 'goal_stats', 'goal_tombstones')
+# Rows per INSERT when a user is copied between shards
+MOVE_BATCH_SIZE = 1000
+
+
+class ShardNotSelected(RuntimeError):
+    """A sharded table was used outside a request or block that selected a shard"""
+
+
+class UserMoving(Exception):
+    """The user's rows are being moved to another shard; writes are refused until it ends"""
+
+
+def allocated_id(name):
+    """Column default drawing ids for the table ``name`` from its shard's ``id_blocks`` counter"""
+    def default(context):
+        from .extensions import shard_router
+        return shard_router.allocate(context.connection, name)
+    return default
+
+
+def _url_key(url):
+    url = make_url(url)
+    return url.get_backend_name(), url.host, url.port, url.database
+
+
+class ShardRouter:
+    """Flask extension registering shard binds and routing per-user tables to their shard.
+
+    Must be initialised before ``db.init_app``, which creates the bind engines.
+    """
+
+    def __init__(self, app=None):
+        self.count = 1
+        self.directory = None
+        self._shard_of_url = {}
+        self._shard_of_engine = {}
+        self._free = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_SHARD_URIS', [])
+        app.config.setdefault('SHARD_ID_SPAN', 2 ** 27)  # ids per shard; 16 shards fit a 32-bit id
+        app.config.setdefault('SHARD_ID_BLOCK', 100)
+        app.config.setdefault('SHARD_DIRECTORY_TTL', 5)
+        app.config.setdefault('SHARD_DIRECTORY_MAX_ENTRIES', 10000)
+        app.config.setdefault('SHARD_MOVE_SETTLE_SECONDS', 10)  # longest a write request may take
+        app.config.setdefault('SHARDS_FOR_NEW_USERS', None)  # None: any shard
+        uris = app.config['SQLALCHEMY_SHARD_URIS']
+        self.count = 1 + len(uris)
+        self.span = app.config['SHARD_ID_SPAN']
+        self.block = app.config['SHARD_ID_BLOCK']
+        self.directory = LRUBackend(app.config['SHARD_DIRECTORY_MAX_ENTRIES'])
+        self._shard_of_url = {_url_key(app.config['SQLALCHEMY_DATABASE_URI']): 0}
+        self._shard_of_engine = {}
+        app.extensions['shard_router'] = self
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for n, uri in enumerate(uris, 1):
+            binds[f'shard{n}'] = {'url': uri, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+            self._shard_of_url[_url_key(uri)] = n
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+        app.register_error_handler(UserMoving, self._moving_error)
+        for target, name, listener in ((Engine, 'commit', self._commit),
+                                       (Engine, 'rollback', self._rollback),
+                                       (Pool, 'reset', self._reset)):
+            if not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+
+    @property
+    def sharded(self):
+        return self.count > 1
+
+    def engine(self, shard):
+        from .extensions import db
+        return db.engines[None] if shard == 0 else db.engines[f'shard{shard}']
+
+    def engines(self):
+        """Engines of all shards, shard 0 (the primary) first"""
+        return [self.engine(shard) for shard in range(self.count)]
+
+    # Directory
+
+    @staticmethod
+    def _directory_key(user_id):
+        return f'shard:{user_id}'
+
+    def entry(self, user_id):
+        """``(shard, moving)`` of a user from the directory (cached), or None if unknown"""
+        key = self._directory_key(user_id)
+        value = self.directory.get(key)
+        if value is None:
+            from .extensions import db
+            from .models import UserShard
+            row = db.session.execute(
+                db.select(UserShard.shard, UserShard.moving).where(UserShard.user_id == user_id)
+            ).first()
+            if row is None:
+                return None
+            value = (row.shard, row.moving)
+            self.directory.set(key, value, ttl=current_app.config['SHARD_DIRECTORY_TTL'])
+        return value
+
+    def shard_for_email(self, email):
+        """Shard of the user with ``email``, or None if there is none"""
+        if not self.sharded:
+            return 0
+        from .extensions import db
+        from .models import UserShard
+        return db.session.scalar(db.select(UserShard.shard).where(UserShard.email == email))
+
+    def choose_shard(self):
+        """Shard for a new user"""
+        return random.choice(current_app.config['SHARDS_FOR_NEW_USERS'] or range(self.count))
+
+    def add_user(self, user):
+        """Create ``user`` (without id): claim the email and an id in the directory, then add the
+        row on the chosen shard. Commits; raises ``IntegrityError`` if the email is taken.
+        """
+        from .extensions import db
+        from .models import UserShard
+        entry = UserShard(email=user.email, shard=self.choose_shard(), moving=False)
+        db.session.add(entry)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise
+        user.id = entry.user_id
+        try:
+            with self.using(entry.shard):
+                db.session.add(user)
+                db.session.commit()
+        except Exception:
+            # Give the email back
+            db.session.rollback()
+            db.session.execute(db.delete(UserShard).where(UserShard.user_id == user.id))
+            db.session.commit()
+            raise
+        return user
+
+    # Shard selection
+
+    def current(self):
+        """Shard selected for this app context; falls back to the JWT identity's shard"""
+        if not self.sharded:
+            return 0
+        shard = g.get('shard')
+        if shard is None:
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:
+                identity = None
+            entry = self.entry(int(identity)) if identity is not None else None
+            if entry is None:
+                raise ShardNotSelected("No shard selected; use shard_router.using() or shard_router.for_user()")
+            shard = g.shard = entry[0]
+        return shard
+
+    @contextmanager
+    def using(self, shard):
+        """Route sharded tables to ``shard`` inside the block"""
+        previous = g.get('shard')
+        g.shard = shard
+        try:
+            yield shard
+        finally:
+            g.shard = previous
+
+    @contextmanager
+    def for_user(self, user_id):
+        """Route sharded tables to ``user_id``'s shard inside the block"""
+        entry = self.entry(user_id) if self.sharded else (0, False)
+        if entry is None:
+            raise LookupError(f"User {user_id} is not in the shard directory")
+        with self.using(entry[0]) as shard:
+            yield shard
+
+    def each_shard(self):
+        """Iterate over all shards with each one selected in turn (for jobs spanning all users)"""
+        for shard in range(self.count):
+            with self.using(shard):
+                yield shard
+
+    def select_user(self, user_id):
+        """Select the authenticated user's shard for this request; False if the user is unknown.
+
+        Raises ``UserMoving`` for a write request while the user is being moved.
+        """
+        if not self.sharded:
+            return True
+        entry = self.entry(user_id)
+        if entry is None:
+            return False
+        shard, moving = entry
+        if moving and has_request_context() and request.method not in READ_METHODS:
+            raise UserMoving(user_id)
+        g.shard = shard
+        return True
+
+    def engine_for(self, mapper, clause):
+        """Engine of the current shard for a statement on sharded tables; None for the default bind"""
+        if not self.sharded:
+            return None
+        if mapper is not None:
+            sharded = mapper.local_table.name in SHARDED_TABLES
+        elif clause is not None:
+            sharded = any(getattr(table, 'name', None) in SHARDED_TABLES
+                          for table in find_tables(clause, include_crud=True))
+        else:
+            sharded = False
+        if not sharded:
+            return None
+        shard = self.current()
+        return None if shard == 0 else self.engine(shard)
+
+    @staticmethod
+    def _moving_error(e):
+        return jsonify({"error": "Your data is being moved, please retry shortly"}), 503, {'Retry-After': '5'}
+
+    # Id allocation
+
+    def shard_of(self, engine):
+        shard = self._shard_of_engine.get(engine)
+        if shard is None:
+            # Unknown engines (e.g. the async app's) are the primary's
+            shard = self._shard_of_engine[engine] = self._shard_of_url.get(_url_key(engine.url), 0)
+        return shard
+
+    def allocate(self, conn, name):
+        """Next id for the table ``name`` on the shard ``conn`` is connected to"""
+        key = (self.shard_of(conn.engine), name)
+        reserved = conn.info.get('id_blocks', {}).get(name)
+        if reserved is None or reserved[1][0] >= reserved[1][1]:
+            with self._lock:
+                blocks = self._free.get(key)
+                while blocks:
+                    block = blocks[0]
+                    if block[0] < block[1]:
+                        block[0] += 1
+                        return block[0] - 1
+                    blocks.pop(0)
+            reserved = (key, self._reserve(conn, key[0], name))
+            conn.info.setdefault('id_blocks', {})[name] = reserved
+        block = reserved[1]
+        block[0] += 1
+        return block[0] - 1
+
+    def allocate_many(self, conn, name, count):
+        """``count`` ids for the table ``name`` on the shard ``conn`` is connected to, as one reserved block"""
+        first, end = self._reserve(conn, self.shard_of(conn.engine), name, count)
+        return range(first, end)
+
+    def _reserve(self, conn, shard, name, size=None):
+        """Reserve a block of ids in the transaction of ``conn``; returns ``[first, end)``"""
+        from .models import IdBlock
+        table = IdBlock.__table__
+        floor = shard * self.span
+        size = size or self.block
+        conn.execute(
+            table.update().where(table.c.name == name)
+            .values(next_id=sa.case((table.c.next_id < floor, floor), else_=table.c.next_id) + size)
+        )
+        end = conn.execute(sa.select(table.c.next_id).where(table.c.name == name)).scalar()
+        if end is None:
+            raise RuntimeError(f"No id counter for {name}; run the migrations on every shard")
+        return [end - size, end]
+
+    def _commit(self, conn):
+        reserved = conn.info.pop('id_blocks', None)
+        if reserved:
+            # The reservations are durable now; other transactions of this process may use the rest
+            with self._lock:
+                for key, block in reserved.values():
+                    self._free.setdefault(key, []).append(block)
+
+    @staticmethod
+    def _rollback(conn):
+        conn.info.pop('id_blocks', None)
+
+    @staticmethod
+    def _reset(dbapi_connection, connection_record, reset_state):
+        connection_record.info.pop('id_blocks', None)
+
+    # Moving users
+
+    def _tables(self):
+        from .extensions import db
+        return [db.metadata.tables[name] for name in SHARDED_TABLES]
+
+    @staticmethod
+    def _user_column(table):
+        return table.c.id if table.name == 'users' else table.c.user_id
+
+    def copy_user(self, user_id, source, target):
+        """Copy a user's rows from ``source`` to ``target`` in one transaction; returns rows per table"""
+        copied = {}
+        with self.engine(source).connect() as src, self.engine(target).begin() as dst:
+            tables = self._tables()
+            # Leftovers of an earlier, interrupted move
+            for table in reversed(tables):
+                dst.execute(table.delete().where(self._user_column(table) == user_id))
+            for table in tables:
+                rows = src.execute(sa.select(table).where(self._user_column(table) == user_id)).mappings()
+                copied[table.name] = 0
+                while True:
+                    batch = [dict(row) for row in rows.fetchmany(MOVE_BATCH_SIZE)]
+                    if not batch:
+                        break
+                    dst.execute(table.insert(), batch)
+                    copied[table.name] += len(batch)
+        return copied
+
+    def delete_user_rows(self, user_id, shard):
+        with self.engine(shard).begin() as conn:
+            for table in reversed(self._tables()):
+                conn.execute(table.delete().where(self._user_column(table) == user_id))
+
+    def move_user(self, user_id, target, log=logger.info):
+        """Move a user's rows to shard ``target`` while the app keeps serving them.
+
+        Blocks for about twice ``SHARD_DIRECTORY_TTL`` plus ``SHARD_MOVE_SETTLE_SECONDS``.
+        Returns rows copied per table (empty if the user already is on ``target``).
+        """
+        from .extensions import db
+        from .models import UserShard
+
+        if not 0 <= target < self.count:
+            raise ValueError(f"No shard {target}")
+        entry = db.session.get(UserShard, user_id)
+        if entry is None:
+            raise LookupError(f"User {user_id} is not in the shard directory")
+        source = entry.shard
+        if source == target:
+            return {}
+        config = current_app.config
+
+        entry.moving = True
+        db.session.commit()
+        log(f"User {user_id}: writes paused, waiting for shard {source} to settle")
+        time.sleep(config['SHARD_DIRECTORY_TTL'] + config['SHARD_MOVE_SETTLE_SECONDS'])
+        try:
+            copied = self.copy_user(user_id, source, target)
+        except Exception:
+            db.session.rollback()
+            entry.moving = False
+            db.session.commit()
+            raise
+        entry.shard = target
+        entry.moving = False
+        db.session.commit()
+        self.directory.delete(self._directory_key(user_id))
+        log(f"User {user_id}: now on shard {target}, copied {copied}")
+
+        # Processes may still read from the source until their cached entry expires
+        time.sleep(config['SHARD_DIRECTORY_TTL'])
+        self.delete_user_rows(user_id, source)
+        log(f"User {user_id}: removed from shard {source}")
+        return copied
+
+    def moving_users(self):
+        """Ids of users being moved right now; background jobs rewriting rows must skip them"""
+        from .extensions import db
+        from .models import UserShard
+        if not self.sharded:
+            return []
+        return db.session.scalars(db.select(UserShard.user_id).where(UserShard.moving.is_(True))).all()
+
+    def user_counts(self):
+        """``{shard: users}`` from the directory"""
+        from .extensions import db
+        from .models import UserShard
+        counts = dict.fromkeys(range(self.count), 0)
+        for shard, users in db.session.execute(
+                db.select(UserShard.shard, db.func.count()).group_by(UserShard.shard)):
+            counts[shard] = users
+        return counts
+
+    def plan_rebalance(self, max_moves=None):
+        """``[(user_id, source, target)]`` moves evening out the number of users per shard"""
+        from .extensions import db
+        from .models import UserShard
+        counts = self.user_counts()
+        moves = []
+        while max_moves is None or len(moves) < max_moves:
+            fullest = max(counts, key=counts.get)
+            emptiest = min(counts, key=counts.get)
+            if counts[fullest] - counts[emptiest] <= 1:
+                break
+            # Most recently registered users first; their shard filled up last
+            user_id = db.session.scalar(
+                db.select(UserShard.user_id)
+                .where(UserShard.shard == fullest, UserShard.moving.is_(False),
+                       UserShard.user_id.not_in([move[0] for move in moves] or [0]))
+                .order_by(UserShard.user_id.desc()).limit(1)
+            )
+            if user_id is None:
+                break
+            moves.append((user_id, fullest, emptiest))
+            counts[fullest] -= 1
+            counts[emptiest] += 1
+        return moves
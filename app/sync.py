@@ -0,0 +1,138 @@
+# app/sync.py
+"""
+Delta sync: what changed in a user's goals since a cursor.
+
+Two streams are read in ``(timestamp, id)`` order, each one a range scan of its
+own index:
+- goals created or updated, by ``updated_at`` (``ix_goals_user_updated_at``, and
+  the archive's equivalent: a full sync includes archived goals)
+- deleted goal ids, from the ``goal_tombstones`` rows every delete writes
+
+The cursor holds a position in both streams and never moves backwards.
+Timestamps are taken before the writing transaction commits, so a change can
+become visible with a timestamp slightly in the past. Positions therefore never
+pass ``now - SETTLE_SECONDS`` (the horizon): pages list settled changes only,
+and the final page adds the changes newer than the horizon while its cursor
+stays at the horizon, so they are sent again on the next sync. Clients apply
+goals as upserts and deletes by id, so repeats are harmless.
+
+Tombstones older than ``TOMBSTONE_RETENTION_DAYS`` are compacted by a daily job.
+A cursor from before that point can no longer list every delete and raises
+``CursorExpired``; the client then starts over with a full sync.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from . import archive
+from .extensions import db, replica_router
+from .models import Goal, GoalTombstone
+from .pagination import encode_token, decode_token, keyset_page
+from .serializers import goal_columns
+
+# Longest a goal write may take between stamping updated_at and committing
+SETTLE_SECONDS = 5
+TOMBSTONE_RETENTION_DAYS = 30
+MAX_CHANGES_PAGE = 1000
+
+
+class CursorExpired(ValueError):
+    """The cursor is older than the oldest tombstone kept; a full sync is needed"""
+
+
+def retention_days():
+    return current_app.config.get('TOMBSTONE_RETENTION_DAYS', TOMBSTONE_RETENTION_DAYS)
+
+
+def encode_sync_cursor(goals_position, tombstones_position):
+    """Opaque token for the ``(timestamp, id)`` positions reached in both streams"""
+    return encode_token([[value.isoformat() if isinstance(value, datetime) else value
+                          for value in position] if position else None
+                         for position in (goals_position, tombstones_position)])
+
+
+def decode_sync_cursor(token):
+    """``(goals_position, tombstones_position)`` of a sync cursor; raises ``ValueError`` if malformed"""
+    try:
+        goals_position, (deleted_at, tombstone_id) = decode_token(token)
+        if goals_position is not None:
+            goals_position = (datetime.fromisoformat(goals_position[0]), int(goals_position[1]))
+        return goals_position, (datetime.fromisoformat(deleted_at), int(tombstone_id))
+    except (ValueError, TypeError, IndexError):
+        raise ValueError("Invalid cursor")
+
+
+def _settled(query, timestamp, id_column, after, limit, horizon):
+    """Page of a stream's changes up to ``horizon``; returns ``(rows, position, has_more)``"""
+    rows, has_more = keyset_page(query.filter(timestamp <= horizon), timestamp, id_column, False,
+                                 after=after, limit=limit)
+    if has_more:
+        last = rows[-1]
+        return rows, (getattr(last, timestamp.key), last.id), True
+    # Caught up: stop short of changes that may still be committing
+    settled = (horizon, 0)
+    return rows, max(after, settled) if after else settled, False
+
+
+def _unsettled(query, timestamp, id_column, limit, horizon):
+    """Changes newer than ``horizon``, for the final page; the cursor stays behind them"""
+    rows, _ = keyset_page(query.filter(timestamp > horizon), timestamp, id_column, False, limit=limit)
+    return rows
+
+
+def changes_since(user_id, token, fields, limit):
+    """Goals changed and goal ids deleted after ``token`` (``None`` for a full sync).
+
+    Returns ``(goals, deleted_ids, next_cursor, has_more)``; ``goals`` are rows of
+    ``fields`` followed by ``id`` and ``updated_at``. Raises ``ValueError`` for an
+    invalid token and ``CursorExpired`` for one older than the tombstone retention.
+    """
+    now = datetime.utcnow()
+    horizon = now - timedelta(seconds=SETTLE_SECONDS)
+    if token:
+        goals_after, tombstones_after = decode_sync_cursor(token)
+        if tombstones_after[0] < now - timedelta(days=retention_days()):
+            raise CursorExpired("Cursor has expired, sync again without since")
+    else:
+        # A full sync lists every goal; only deletes from here on matter
+        goals_after, tombstones_after = None, (horizon, 0)
+
+    # The settle window assumes changes become visible within seconds; a lagging
+    # replica could hide one behind a cursor for good, so the feed reads the primary
+    with replica_router.primary():
+        return _read_changes(user_id, goals_after, tombstones_after, fields, limit, horizon)
+
+
+def _read_changes(user_id, goals_after, tombstones_after, fields, limit, horizon):
+    # Archived goals belong to a full sync; archiving itself leaves updated_at alone
+    all_goals, adapt = archive.with_archive(
+        db.select(*goal_columns(fields, extra=('id', 'updated_at'))).where(Goal.user_id == user_id)
+    )
+    goals_query = db.session.query(*all_goals.c)
+    updated_at, goal_id = adapt(Goal.updated_at), adapt(Goal.id)
+    goals, goals_position, more_goals = _settled(goals_query, updated_at, goal_id, goals_after, limit, horizon)
+
+    tombstones_query = GoalTombstone.query.filter(GoalTombstone.user_id == user_id).with_entities(
+        GoalTombstone.id, GoalTombstone.goal_id, GoalTombstone.deleted_at
+    )
+    tombstones, tombstones_position, more_tombstones = _settled(
+        tombstones_query, GoalTombstone.deleted_at, GoalTombstone.id, tombstones_after, limit, horizon
+    )
+
+    has_more = more_goals or more_tombstones
+    if not has_more:
+        if len(goals) < limit:
+            goals += _unsettled(goals_query, updated_at, goal_id, limit - len(goals), horizon)
+        if len(tombstones) < limit:
+            tombstones += _unsettled(tombstones_query, GoalTombstone.deleted_at, GoalTombstone.id,
+                                     limit - len(tombstones), horizon)
+
+    next_cursor = encode_sync_cursor(goals_position, tombstones_position)
+    return goals, [tombstone.goal_id for tombstone in tombstones], next_cursor, has_more
+
+def compact_tombstones(now=None):
+    """Delete tombstones past the retention period; returns how many were removed"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days())
+    result = db.session.execute(
+        db.delete(GoalTombstone).where(GoalTombstone.deleted_at < cutoff),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
@@ -0,0 +1,87 @@
+# app/tasks.py
+"""
+Background tasks run by the job runner (see ``app/jobs.py``).
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from . import archive, sync
+from .extensions import db, job_runner, response_cache, shard_router
+from .models import GoalStats, Job
+
+# Users whose overdue counter is refreshed per sweep transaction
+SWEEP_BATCH_SIZE = 500
+
+
+@job_runner.task('rebuild_stats', max_attempts=3)
+def rebuild_stats(user_id):
+    """Recompute a user's goal counters from the goals table"""
+    with shard_router.for_user(user_id):
+        stats = GoalStats.rebuild(user_id, datetime.utcnow().date())
+        db.session.commit()
+        result = stats.to_dict()
+    response_cache.bump(user_id)
+    return result
+
+
+@job_runner.task('sweep_overdue', max_attempts=1)
+def sweep_overdue():
+    """Bring every summary row up to today's overdue count ahead of the users' first read"""
+    today = datetime.utcnow().date()
+    refreshed = 0
+    for _ in shard_router.each_shard():
+        while True:
+            user_ids = db.session.scalars(
+                db.select(GoalStats.user_id)
+                .where(db.or_(GoalStats.overdue_as_of < today, GoalStats.overdue_as_of.is_(None)))
+                .limit(SWEEP_BATCH_SIZE)
+            ).all()
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                GoalStats.rebuild(user_id, today)
+            db.session.commit()
+            for user_id in user_ids:
+                response_cache.bump(user_id)
+            refreshed += len(user_ids)
+    return {'refreshed': refreshed}
+
+
+# Daily counters roll over at midnight UTC; sweeping hourly keeps first reads of the day cheap
+job_runner.periodic('sweep_overdue', every=3600)
+
+
+@job_runner.task('purge_jobs', max_attempts=1)
+def purge_jobs():
+    """Delete finished jobs older than ``JOBS_RETENTION_DAYS``"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['JOBS_RETENTION_DAYS'])
+    result = db.session.execute(
+        db.delete(Job).where(Job.status.in_(('succeeded', 'failed')), Job.finished_at < cutoff),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return {'deleted': result.rowcount}
+
+
+job_runner.periodic('purge_jobs', every=86400)
+
+
+@job_runner.task('compact_tombstones', max_attempts=1)
+def compact_tombstones():
+    """Delete goal tombstones older than ``TOMBSTONE_RETENTION_DAYS``"""
+    deleted = 0
+    for _ in shard_router.each_shard():
+        deleted += sync.compact_tombstones()
+        db.session.commit()
+    return {'deleted': deleted}
+
+
+job_runner.periodic('compact_tombstones', every=86400)
+
+
+@job_runner.task('archive_goals', max_attempts=1)
+def archive_goals():
+    """Move goals completed more than ``ARCHIVE_AFTER_DAYS`` ago to the archive table"""
+    return {'archived': archive.archive_completed()}
+
+
+job_runner.periodic('archive_goals', every=86400)
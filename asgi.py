@@ -0,0 +1,9 @@
+from app.asgi import create_async_app
+from app.extensions import shard_router
+from app.migrations import upgrade
+
+app = create_async_app()
+
+with app.state.flask_app.app_context():
+    for engine in shard_router.engines():
+        upgrade(engine, primary=shard_router.engine(0))  # apply pending schema migrations (on every shard)
@@ -0,0 +1,13 @@
+# benchmarks/__init__.py
+"""
+Benchmarks for the goals API.
+
+Each module is runnable on its own, e.g. ``python -m benchmarks.serialization``.
+They use a throwaway SQLite database unless DATABASE_URL points elsewhere.
+
+- ``seed``: synthetic users and goals with realistic distributions
+- ``loadtest``: every endpoint under concurrency; results saved for ``compare``
+- ``async_serving``: the sync and async apps side by side under gunicorn
+- ``serialization``, ``login_contention``, ``pool_load``, ``export_memory``,
+  ``import_throughput``, ``write_path``, ``storage_encoding``, ``rate_limit``: focused benchmarks
+"""
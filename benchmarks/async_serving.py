@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Side-by-side benchmark of the sync (Flask) and async (Starlette) apps at high connection counts.
+
+Seeds users and goals, then serves the same database with gunicorn twice, with
+the same worker count and database budget (app/serving.py):
+- sync: gthread workers running ``run:app``
+- async: uvicorn workers running ``asgi:app``
+
+Each app is driven by ``--connections`` concurrent keep-alive HTTP connections
+(one asyncio coroutine per connection), for every level given. Requests mix
+reads and writes on endpoints both apps serve. The report gives throughput,
+p50/p95/p99 latency and errors per app and level. Results are written as JSON
+to ``benchmarks/results/``.
+
+    python -m benchmarks.async_serving [--connections 50 200 500] [--duration 10] [--workers 2]
+
+Needs requirements-async.txt. SQLite (the default) has no network round trips
+and serializes writers, so the async app has little waiting to overlap there;
+point DATABASE_URL at Postgres for representative numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db
+from app.migrations import upgrade
+from app.models import Goal
+from benchmarks.common import percentile, git_revision
+from benchmarks.seed import seed, goal_rows, PRIORITIES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+APPS = {
+    'sync': ('gthread', 'run:app'),
+    'async': ('uvicorn', 'asgi:app'),
+}
+
+# Relative weights, all on endpoints served by both apps
+OPERATIONS = {
+    'profile': 10,
+    'list_goals': 35,
+    'get_goal': 35,
+    'add_goal': 10,
+    'update_goal': 10,
+}
+
+
+def prepare(users, goals_per_user, rng_seed):
+    """Seed the database; returns ``[(auth header, goal_ids)]``"""
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+        prefix = f'async{int(time.time())}-'
+        user_ids = seed(users, goals_per_user, rng_seed, email_prefix=prefix)
+        goal_ids = {user_id: [] for user_id in user_ids}
+        for goal_id, user_id in db.session.execute(
+                db.select(Goal.id, Goal.user_id).where(Goal.user_id.in_(user_ids))):
+            goal_ids[user_id].append(goal_id)
+        return [(f'Bearer {create_access_token(identity=str(user_id))}', goal_ids[user_id]) for user_id in user_ids]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, port, args):
+    """Run one app under gunicorn; returns the process once /health answers"""
+    worker_class, target = APPS[name]
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(args.workers),
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_TIMEOUT='120',
+        DB_MAX_CONNECTIONS=str(args.db_connections),
+        # Every request reaches the database, and nothing else competes for it
+        GOAL_CACHE_ENABLED='false',
+        JOBS_ENABLED='false',
+        INSTRUMENTATION_SAMPLE_RATE='0',
+    )
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', target],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} server exited: {process.stderr.read().decode()[-2000:]}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(64).startswith(b'HTTP/1.1 200'):
+                    return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start within 60s")
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client connection (Content-Length bodies only)"""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, authorization, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = (f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: {authorization}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n')
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length, close = 0, False
+        while True:
+            line = (await self.reader.readline()).strip()
+            if not line:
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+        data = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def _goal_payload(rng):
+    row = next(goal_rows(rng, 0, 1, date.today()))
+    return {
+        'goal_title': row['goal_title'], 'description': row['description'] or '',
+        'goal_type': row['goal_type'], 'priority': row['priority'], 'category': row['category'],
+        'start_date': row['start_date'].isoformat(), 'end_date': row['end_date'].isoformat()
+    }
+
+
+async def drive(port, users, connections, duration, warmup, rng_seed):
+    """Run ``connections`` client loops; returns ``[(seconds, status)]`` and the measured time"""
+    operations, weights = zip(*OPERATIONS.items())
+    samples = []
+    state = {'measuring': False, 'stop': False}
+
+    async def loop(n):
+        rng = random.Random(rng_seed * 1000 + n)
+        connection = Connection(port)
+        while not state['stop']:
+            authorization, goal_ids = rng.choice(users)
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                if operation == 'profile':
+                    status, _ = await connection.request('GET', '/auth/profile', authorization)
+                elif operation == 'list_goals':
+                    sort_by = rng.choice(('created_at', 'end_date', 'priority'))
+                    status, _ = await connection.request('GET', f'/api/goals?sort_by={sort_by}&per_page=20', authorization)
+                elif operation == 'get_goal':
+                    status, _ = await connection.request('GET', f'/api/goal/{rng.choice(goal_ids)}', authorization)
+                elif operation == 'add_goal':
+                    status, _ = await connection.request('POST', '/api/add/goal', authorization, _goal_payload(rng))
+                else:
+                    status, _ = await connection.request('PUT', f'/api/goal/{rng.choice(goal_ids)}', authorization,
+                                                         {'priority': rng.choice(PRIORITIES)[0]})
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                connection.close()
+                status = 599  # connection error
+            if state['measuring']:
+                samples.append((time.perf_counter() - started, status))
+        connection.close()
+
+    tasks = [asyncio.create_task(loop(n)) for n in range(connections)]
+    await asyncio.sleep(warmup)
+    state['measuring'] = True
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    state['measuring'] = False
+    elapsed = time.perf_counter() - started
+    state['stop'] = True
+    await asyncio.gather(*tasks)
+    return samples, elapsed
+
+
+def summarize(samples, elapsed):
+    latencies = [seconds * 1000 for seconds, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status in samples if status >= 500),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--connections', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers per app')
+    parser.add_argument('--threads', type=int, default=4, help='threads per sync worker')
+    parser.add_argument('--db-connections', type=int, default=20, help='DB_MAX_CONNECTIONS for each app')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--goals', type=int, default=100, help='seeded goals per user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/async-serving-<commit>-<time>.json)')
+    args = parser.parse_args()
+
+    users = prepare(args.users, args.goals, args.seed)
+    results = {}
+    print(f"{'app':<6} {'conns':>6} {'reqs':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in APPS:
+        port = free_port()
+        process = start_server(name, port, args)
+        try:
+            for connections in args.connections:
+                samples, elapsed = asyncio.run(drive(port, users, connections, args.duration, args.warmup, args.seed))
+                stats = summarize(samples, elapsed)
+                results.setdefault(name, {})[str(connections)] = stats
+                print(f"{name:<6} {connections:>6} {stats['requests']:>8} {stats['throughput_rps']:>9.1f} "
+                      f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['errors']:>7}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    revision = git_revision()
+    result = {
+        'meta': {
+            'benchmark': 'async_serving',
+            'commit': revision,
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'database': os.environ['DATABASE_URL'].split('@')[-1],
+            'python': platform.python_version(),
+            'workers': args.workers,
+            'threads': args.threads,
+            'db_connections': args.db_connections,
+            'users': args.users,
+            'goals_per_user': args.goals,
+            'duration': args.duration,
+            'mix': OPERATIONS,
+        },
+        'results': results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"async-serving-{revision}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# benchmarks/common.py
+"""
+Shared benchmark setup.
+
+Importing this module points the app at a throwaway SQLite database (unless
+DATABASE_URL is already set) with the production config and rate limiting off,
+so import it before creating the app.
+"""
+import os
+import subprocess
+import tempfile
+
+os.environ.setdefault('FLASK_ENV', 'production')
+# Load generators send everything from one address and a few users
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='sssb-bench-'), 'bench.db')
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (NaN when empty)"""
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def git_revision():
+    """Commit the benchmark ran against (``unknown`` outside a git checkout)"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Compare two load test result files.
+
+Prints each operation's latency percentiles, throughput and SQL statements per
+request side by side with the relative change from the baseline.
+
+    python -m benchmarks.compare benchmarks/results/loadtest-<old>.json benchmarks/results/loadtest-<new>.json
+"""
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'sql_per_request')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return '    n/a'
+    return f'{(new - old) / old * 100:>+6.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    for label, result in (('baseline', baseline), ('candidate', candidate)):
+        meta = result['meta']
+        print(f"{label:<10} {meta['commit']} {meta['timestamp']} {meta['dialect']} "
+              f"users={meta['users']} goals={meta['goals_per_user']} concurrency={meta['concurrency']} cache={meta['cache']}")
+    params = ('dialect', 'users', 'goals_per_user', 'concurrency', 'cache', 'mix')
+    differing = [name for name in params if baseline['meta'].get(name) != candidate['meta'].get(name)]
+    if differing:
+        print(f"warning: runs differ in {', '.join(differing)}; results are not directly comparable")
+
+    print(f"\n{'operation':<22}" + ''.join(f"{metric:>26}" for metric in METRICS))
+    rows = dict(baseline['endpoints'], TOTAL=baseline['overall'])
+    new_rows = dict(candidate['endpoints'], TOTAL=candidate['overall'])
+    for operation in list(rows) + [name for name in new_rows if name not in rows]:
+        old, new = rows.get(operation, {}), new_rows.get(operation, {})
+        cells = []
+        for metric in METRICS:
+            a, b = old.get(metric), new.get(metric)
+            values = f"{a if a is not None else '-'} -> {b if b is not None else '-'}"
+            cells.append(f"{values:>17} {change(a, b)}")
+        print(f"{operation:<22}" + ''.join(f"{cell:>26}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: streaming goal export.
+
+Seeds one user with ``--goals`` goals (100k by default), then downloads
+GET /api/goals/export in each format while sampling the process RSS. Fails if
+the export grows RSS by more than ``--budget-mb`` over the level before it
+started, i.e. if memory use scales with the number of goals.
+
+    python -m benchmarks.export_memory [--goals 100000] [--budget-mb 25]
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db
+from app.migrations import upgrade
+from benchmarks.seed import seed
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """Samples RSS on a background thread while the block runs"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--goals', type=int, default=100_000)
+    parser.add_argument('--budget-mb', type=float, default=25)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['SLOW_REQUEST_MS'] = 0
+    with app.app_context():
+        upgrade(db.engine)
+        started = time.perf_counter()
+        user_id, = seed(users=1, goals_per_user=args.goals, email_prefix=f'export{int(time.time())}-')
+        print(f"seeded {args.goals} goals in {time.perf_counter() - started:.1f}s")
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        db.session.remove()
+
+    client = app.test_client()
+    ok = True
+    for export_format in ('ndjson', 'csv'):
+        baseline = rss_bytes()
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            response = client.get(f'/api/goals/export?format={export_format}', headers=headers, buffered=False)
+            size = lines = 0
+            for chunk in response.response:
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+            response.close()
+            elapsed = time.perf_counter() - started
+        growth_mb = (rss.peak - baseline) / 2**20
+        rows = lines - (1 if export_format == 'csv' else 0)
+        passed = response.status_code == 200 and rows >= args.goals and growth_mb <= args.budget_mb
+        ok = ok and passed
+        print(f"{export_format:>6}: {rows} rows, {size / 2**20:.1f} MiB in {elapsed:.2f}s "
+              f"({rows / elapsed:,.0f} rows/s), RSS +{growth_mb:.1f} MiB (budget {args.budget_mb:g}) "
+              f"{'ok' if passed else 'FAIL'}")
+
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: bulk goal import vs. one POST /api/add/goal per goal.
+
+Generates ``--rows`` synthetic goals (benchmarks/seed.py distributions) as CSV
+and NDJSON, imports each through POST /api/goals/import (dry run, then for
+real) and compares the rows per second with replaying ``--baseline`` of them
+through the single-goal endpoint.
+
+    python -m benchmarks.import_throughput [--rows 20000] [--baseline 500]
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from datetime import date
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db
+from app.migrations import upgrade
+from benchmarks.seed import seed, goal_rows
+
+FIELDS = ('goal_title', 'description', 'goal_type', 'priority', 'category', 'start_date', 'end_date')
+
+
+def payloads(count, rng_seed=7):
+    rng = random.Random(rng_seed)
+    for row in goal_rows(rng, 0, count, date.today()):
+        yield {field: row[field].isoformat() if isinstance(row[field], date) else (row[field] or '')
+               for field in FIELDS}
+
+
+def as_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode()
+
+
+def as_ndjson(records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--baseline', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['SLOW_REQUEST_MS'] = 0
+    with app.app_context():
+        upgrade(db.engine)
+        user_id, = seed(users=1, goals_per_user=0, email_prefix=f'import{int(time.time())}-')
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+    client = app.test_client()
+    records = list(payloads(args.rows))
+
+    print(f"{'method':<28} {'rows':>7} {'seconds':>8} {'rows/s':>10}")
+    for name, body in (('csv', as_csv(records)), ('ndjson', as_ndjson(records))):
+        for dry_run in ('true', 'false'):
+            started = time.perf_counter()
+            response = client.post(f'/api/goals/import?format={name}&dry_run={dry_run}', headers=headers, data=body)
+            elapsed = time.perf_counter() - started
+            summary = response.get_json()['summary']
+            assert response.status_code == 200 and summary['failed'] == 0, response.get_json()
+            label = f"import {name}{' (dry run)' if dry_run == 'true' else ''}"
+            print(f"{label:<28} {summary['rows']:>7} {elapsed:>8.2f} {summary['rows'] / elapsed:>10,.0f}")
+
+    started = time.perf_counter()
+    for record in records[:args.baseline]:
+        assert client.post('/api/add/goal', headers=headers, json=record).status_code == 201
+    elapsed = time.perf_counter() - started
+    print(f"{'POST /api/add/goal each':<28} {args.baseline:>7} {elapsed:>8.2f} {args.baseline / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
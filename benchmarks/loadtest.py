@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Load test for every auth, goal and job endpoint.
+
+Seeds N users x M goals (benchmarks/seed.py), then runs ``--concurrency``
+client threads against the app for ``--duration`` seconds. Each thread owns a
+slice of the users and picks operations from a weighted mix covering
+auth_routes.py, goal_routes.py and job_routes.py. An endpoint added to the API
+gets an operation here, so runs keep covering all of it. SQL statements are counted per request with
+a SQLAlchemy cursor event.
+
+Reports p50/p95/p99 latency, throughput and SQL statements per request for each
+operation and writes the results as JSON to ``benchmarks/results/`` (or
+``--output``), tagged with the commit, so runs can be compared with
+``python -m benchmarks.compare``.
+
+    python -m benchmarks.loadtest [--users 50] [--goals 200] [--concurrency 8] [--duration 10]
+
+Uses a throwaway SQLite database unless DATABASE_URL is set (e.g. a local
+Postgres). The response cache is off unless ``--cache`` is given, so every
+request reaches the database.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+from app.migrations import upgrade
+from app.models import Goal
+from benchmarks.common import percentile, git_revision
+from benchmarks.seed import seed, goal_rows, SEED_PASSWORD, PRIORITIES, CATEGORIES, TITLES
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Relative weights; password hashing makes register/login orders of magnitude slower than the rest,
+# and export/import move a user's whole goal list or a file of goals per request
+OPERATIONS = {
+    'register': 1,
+    'login': 2,
+    'profile': 5,
+    'list_goals': 20,
+    'list_goals_filtered': 10,
+    'list_goals_cursor': 10,
+    'search_goals': 5,
+    'due_goals': 5,
+    'goal_changes': 3,
+    'goal_analytics': 3,
+    'export_goals': 1,
+    'import_goals': 1,
+    'get_goal': 20,
+    'add_goal': 10,
+    'update_goal': 10,
+    'delete_goal': 5,
+    'batch_goals': 3,
+    'rebuild_stats': 1,
+    'get_job': 2,
+    'list_jobs': 2,
+}
+
+# Goals per import upload
+IMPORT_ROWS = 20
+
+
+class StatementCounter:
+    """Counts SQL statements executed by the current thread"""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+class Client:
+    """One simulated client: a test client, a slice of users and their goal ids"""
+
+    def __init__(self, app, n, users, rng):
+        self.http = app.test_client()
+        self.n = n
+        self.users = users  # [(user_id, email, headers, goal_ids)]
+        self.rng = rng
+        self.registered = 0
+        self.cursors = {}
+        self.sync_cursors = {}
+        self.jobs = defaultdict(list)
+
+    def _goal_payload(self, user_id):
+        row = next(goal_rows(self.rng, user_id, 1, date.today()))
+        return {
+            'goal_title': row['goal_title'], 'description': row['description'] or '',
+            'goal_type': row['goal_type'], 'priority': row['priority'], 'category': row['category'],
+            'start_date': row['start_date'].isoformat(), 'end_date': row['end_date'].isoformat()
+        }
+
+    def run(self, operation):
+        """Perform ``operation`` as a random owned user; returns the response"""
+        user_id, email, headers, goal_ids = self.rng.choice(self.users)
+        rng = self.rng
+
+        if operation == 'register':
+            self.registered += 1
+            suffix = f'{self.n}-{self.registered}-{time.time_ns()}'
+            return self.http.post('/auth/register', json={
+                'username': f'load-{suffix}', 'email': f'load-{suffix}@example.com', 'password': SEED_PASSWORD
+            })
+        if operation == 'login':
+            return self.http.post('/auth/login', json={'email': email, 'password': SEED_PASSWORD})
+        if operation == 'profile':
+            return self.http.get('/auth/profile', headers=headers)
+
+        if operation == 'list_goals':
+            sort_by = rng.choice(('created_at', 'start_date', 'end_date', 'priority'))
+            page = rng.choice((1, 1, 1, 2, 3))
+            return self.http.get(f'/api/goals?sort_by={sort_by}&page={page}&per_page=20', headers=headers)
+        if operation == 'list_goals_filtered':
+            filters = rng.choice((
+                f'priority={rng.choice(PRIORITIES)[0]}',
+                f'category={rng.choice(CATEGORIES[:4])}',
+                'is_completed=false',
+                'is_completed=false&sort_by=end_date&sort_order=asc',
+            ))
+            return self.http.get(f'/api/goals?{filters}&per_page=20', headers=headers)
+        if operation == 'list_goals_cursor':
+            # Walk the user's list page by page, starting over at the end
+            cursor = self.cursors.pop(user_id, None)
+            query = f'cursor={cursor}' if cursor else 'pagination=cursor'
+            response = self.http.get(f'/api/goals?{query}&per_page=20', headers=headers)
+            if response.status_code == 200:
+                next_cursor = response.get_json()['pagination']['next_cursor']
+                if next_cursor:
+                    self.cursors[user_id] = next_cursor
+            return response
+
+        if operation == 'search_goals':
+            word = rng.choice(rng.choice(TITLES).split()[:2])
+            return self.http.get(f'/api/goals/search?q={word}&per_page=20', headers=headers)
+        if operation == 'due_goals':
+            return self.http.get(f'/api/goals/due?within={rng.choice((7, 30))}&per_page=20', headers=headers)
+        if operation == 'goal_changes':
+            # Sync like a client: a full sync, then deltas from the returned cursor
+            since = self.sync_cursors.get(user_id)
+            response = self.http.get('/api/goals/changes?limit=100' + (f'&since={since}' if since else ''),
+                                     headers=headers)
+            if response.status_code == 200:
+                self.sync_cursors[user_id] = response.get_json()['next_cursor']
+            return response
+        if operation == 'goal_analytics':
+            query = f"bucket={rng.choice(('week', 'month'))}"
+            group_by = rng.choice((None, 'category', 'priority'))
+            return self.http.get(f'/api/goals/analytics?{query}' + (f'&group_by={group_by}' if group_by else ''),
+                                 headers=headers)
+        if operation == 'export_goals':
+            response = self.http.get(f"/api/goals/export?format={rng.choice(('ndjson', 'csv'))}", headers=headers)
+            response.get_data()  # the body is streamed; time all of it
+            return response
+        if operation == 'import_goals':
+            body = ''.join(json.dumps(self._goal_payload(user_id)) + '\n' for _ in range(IMPORT_ROWS))
+            return self.http.post('/api/goals/import?format=ndjson', headers=headers, data=body,
+                                  content_type='application/x-ndjson')
+        if operation == 'rebuild_stats':
+            response = self.http.post('/api/goals/stats/rebuild', headers=headers)
+            if response.status_code == 202:
+                self.jobs[user_id].append(response.get_json()['job']['id'])
+            return response
+        if operation == 'get_job' and self.jobs[user_id]:
+            return self.http.get(f'/api/jobs/{rng.choice(self.jobs[user_id])}', headers=headers)
+        if operation in ('get_job', 'list_jobs'):
+            return self.http.get('/api/jobs?limit=20', headers=headers)
+
+        if operation == 'add_goal':
+            response = self.http.post('/api/add/goal', headers=headers, json=self._goal_payload(user_id))
+            if response.status_code == 201:
+                goal_ids.append(response.get_json()['goal']['id'])
+            return response
+        if operation == 'batch_goals':
+            body = {'create': [self._goal_payload(user_id) for _ in range(5)]}
+            if goal_ids:
+                body['update'] = [{'id': goal_id, 'priority': rng.choice(PRIORITIES)[0]}
+                                  for goal_id in rng.sample(goal_ids, min(3, len(goal_ids)))]
+            response = self.http.post('/api/goals/batch', headers=headers, json=body)
+            if response.status_code == 200:
+                goal_ids.extend(item['goal']['id'] for item in response.get_json()['results']['create']
+                                if item['status'] == 201)
+            return response
+
+        if not goal_ids:
+            return self.http.get('/api/goals?per_page=20', headers=headers)
+        goal_id = rng.choice(goal_ids)
+        if operation == 'get_goal':
+            return self.http.get(f'/api/goal/{goal_id}', headers=headers)
+        if operation == 'update_goal':
+            changes = rng.choice((
+                {'is_completed': rng.random() < 0.5},
+                {'priority': rng.choice(PRIORITIES)[0]},
+                {'goal_title': f'Updated {rng.randint(1, 10**6)}'},
+                {'end_date': (date.today() + timedelta(days=rng.randint(-30, 180))).isoformat(),
+                 'start_date': (date.today() - timedelta(days=rng.randint(31, 400))).isoformat()},
+            ))
+            return self.http.put(f'/api/goal/{goal_id}', headers=headers, json=changes)
+        if operation == 'delete_goal':
+            goal_ids.remove(goal_id)
+            return self.http.delete(f'/api/goal/{goal_id}', headers=headers)
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+def prepare(app, users, goals_per_user, rng_seed):
+    """Seed the database; returns ``[(user_id, email, headers, goal_ids)]``"""
+    with app.app_context():
+        upgrade(db.engine)
+        # Unique email prefix so repeated runs against the same database don't collide
+        prefix = f'load{int(time.time())}-'
+        user_ids = seed(users, goals_per_user, rng_seed, email_prefix=prefix)
+        goal_ids = defaultdict(list)
+        for goal_id, user_id in db.session.execute(
+                db.select(Goal.id, Goal.user_id).where(Goal.user_id.in_(user_ids))):
+            goal_ids[user_id].append(goal_id)
+        return [
+            (user_id, f'{prefix}{n}-{rng_seed}@example.com',
+             {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}, goal_ids[user_id])
+            for n, user_id in enumerate(user_ids)
+        ]
+
+
+def run(app, clients, duration, warmup, mix):
+    """Drive every client on its own thread; returns ``{operation: [(seconds, statements, status)]}``"""
+    counter = StatementCounter(db.engine)
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    operations, weights = zip(*mix.items())
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def loop(client):
+        local = defaultdict(list)
+        while not stop.is_set():
+            operation = client.rng.choices(operations, weights)[0]
+            counter.reset()
+            started = time.perf_counter()
+            response = client.run(operation)
+            elapsed = time.perf_counter() - started
+            if measuring.is_set():
+                local[operation].append((elapsed, counter.count, response.status_code))
+        with lock:
+            for operation, items in local.items():
+                samples[operation].extend(items)
+
+    threads = [threading.Thread(target=loop, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    measuring.set()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    def stats(items):
+        latencies = [seconds * 1000 for seconds, _, _ in items]
+        return {
+            'requests': len(items),
+            'errors': sum(1 for _, _, status in items if status >= 500),
+            'client_errors': sum(1 for _, _, status in items if 400 <= status < 500),
+            'throughput_rps': round(len(items) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'sql_per_request': round(sum(count for _, count, _ in items) / len(items), 2) if items else None,
+        }
+
+    endpoints = {operation: stats(items) for operation, items in sorted(samples.items())}
+    overall = stats([item for items in samples.values() for item in items])
+    return endpoints, overall
+
+
+def print_report(endpoints, overall):
+    print(f"{'operation':<22} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sql/req':>8} {'5xx':>5} {'4xx':>5}")
+    for operation, stats in list(endpoints.items()) + [('TOTAL', overall)]:
+        print(f"{operation:<22} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['sql_per_request'] or 0:>8.2f} "
+              f"{stats['errors']:>5} {stats['client_errors']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--goals', type=int, default=200, help='seeded goals per user')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache', action='store_true', help='enable the goal response cache')
+    parser.add_argument('--only', help='comma-separated operations to run (default: the full mix)')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/loadtest-<commit>-<time>.json)')
+    args = parser.parse_args()
+    if args.users < args.concurrency:
+        parser.error('--users must be at least --concurrency (each client thread owns its users)')
+
+    mix = dict(OPERATIONS)
+    if args.only:
+        names = args.only.split(',')
+        unknown = [name for name in names if name not in OPERATIONS]
+        if unknown:
+            parser.error(f"unknown operations: {', '.join(unknown)}")
+        mix = {name: OPERATIONS[name] for name in names}
+
+    app = create_app()
+    app.config['GOAL_CACHE_ENABLED'] = args.cache
+    users = prepare(app, args.users, args.goals, args.seed)
+    clients = [Client(app, n, users[n::args.concurrency], random.Random(args.seed * 1000 + n))
+               for n in range(args.concurrency)]
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        database = db.engine.url.render_as_string(hide_password=True)
+        samples, elapsed = run(app, clients, args.duration, args.warmup, mix)
+    endpoints, overall = summarize(samples, elapsed)
+    print_report(endpoints, overall)
+
+    revision = git_revision()
+    result = {
+        'meta': {
+            'benchmark': 'loadtest',
+            'commit': revision,
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'dialect': dialect,
+            'database': database,
+            'python': platform.python_version(),
+            'users': args.users,
+            'goals_per_user': args.goals,
+            'concurrency': args.concurrency,
+            'duration': round(elapsed, 3),
+            'seed': args.seed,
+            'cache': args.cache,
+            'mix': mix,
+        },
+        'endpoints': endpoints,
+        'overall': overall,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"loadtest-{revision}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput vs. concurrent goal-read latency.
+
+Runs a burst of logins on several threads while other threads keep reading
+GET /api/goals, once with hashing on the request thread (inline) and once on
+the hashing pool. Reports logins/s, 503s, and p50/p95/p99 read latency.
+
+    python -m benchmarks.login_contention [--duration 5] [--login-threads 8] [--read-threads 4]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.common import percentile
+from app import create_app
+from app.extensions import db, password_hasher
+from app.migrations import upgrade
+
+EMAIL = 'login-bench@example.com'
+PASSWORD = 'correct horse battery staple'
+
+
+def run(app, token, duration, login_threads, read_threads):
+    stop = threading.Event()
+    logins, busy, read_latencies = [], [], []
+
+    def login_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            status = client.post('/auth/login', json={'email': EMAIL, 'password': PASSWORD}).status_code
+            (logins if status == 200 else busy).append(status)
+
+    def read_loop():
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/goals', headers=headers)
+            read_latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(login_threads)]
+    threads += [threading.Thread(target=read_loop) for _ in range(read_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'logins_per_s': len(logins) / duration,
+        'busy_503': len(busy),
+        'reads_per_s': len(read_latencies) / duration,
+        'read_p50_ms': percentile(read_latencies, 50) * 1000,
+        'read_p95_ms': percentile(read_latencies, 95) * 1000,
+        'read_p99_ms': percentile(read_latencies, 99) * 1000,
+        'read_mean_ms': statistics.fmean(read_latencies) * 1000 if read_latencies else float('nan')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--read-threads', type=int, default=4)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['GOAL_CACHE_ENABLED'] = False  # measure the database path, not cache hits
+    with app.app_context():
+        upgrade(db.engine)
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'bench', 'email': EMAIL, 'password': PASSWORD})
+    token = client.post('/auth/login', json={'email': EMAIL, 'password': PASSWORD}).get_json()['access_token']
+
+    print(f"hash method {app.config['PASSWORD_HASH_METHOD']}, pool workers {app.config['PASSWORD_HASH_WORKERS']}, "
+          f"{args.login_threads} login threads, {args.read_threads} read threads, {args.duration}s per mode")
+    print(f"{'mode':<8} {'logins/s':>9} {'503s':>6} {'reads/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for mode, inline in (('inline', True), ('pool', False)):
+        app.config['PASSWORD_HASH_INLINE'] = inline
+        result = run(app, token, args.duration, args.login_threads, args.read_threads)
+        print(f"{mode:<8} {result['logins_per_s']:>9.1f} {result['busy_503']:>6} {result['reads_per_s']:>8.1f} "
+              f"{result['read_p50_ms']:>6.1f}ms {result['read_p95_ms']:>6.1f}ms {result['read_p99_ms']:>6.1f}ms")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
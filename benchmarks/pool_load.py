@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Load test: the serving profile never exhausts the database pool.
+
+Starts one process per gunicorn worker of the serving profile (app/serving.py)
+and drives each with as many concurrent request threads as the profile lets a
+worker run, for reads and writes on the goals API. Pool checkouts are tracked
+with SQLAlchemy pool events. The test fails if any request times out waiting
+for a connection, or if the connections held across all workers ever exceed
+DB_MAX_CONNECTIONS.
+
+The profile comes from the usual environment variables (WEB_CONCURRENCY,
+GUNICORN_WORKER_CLASS, GUNICORN_THREADS, DB_MAX_CONNECTIONS, ...).
+
+    python -m benchmarks.pool_load [--duration 5] [--overload 1.0]
+
+``--overload 2`` runs twice the profile's concurrency per worker, to show what
+would happen without the profile's limits.
+"""
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+from app.migrations import upgrade
+from app.serving import serving_profile
+
+
+def prepare():
+    """Schema, one user and a few goals; returns a token for the user"""
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+    client = app.test_client()
+    credentials = {'email': 'pool-load@example.com', 'password': 'pool-load'}
+    client.post('/auth/register', json=dict(credentials, username='pool-load'))
+    token = client.post('/auth/login', json=credentials).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(20):
+        client.post('/api/add/goal', headers=headers, json={
+            'goal_title': f'Goal {i}', 'goal_type': 'personal', 'priority': 'medium',
+            'category': 'fitness', 'start_date': '2024-01-01', 'end_date': '2030-01-01'
+        })
+    return token
+
+
+def worker(token, threads, duration, results):
+    """One gunicorn-like worker process: ``threads`` concurrent requests for ``duration`` seconds"""
+    app = create_app()
+    app.config['GOAL_CACHE_ENABLED'] = False  # every request must reach the database
+    with app.app_context():
+        engine = db.engine
+    state = {'checked_out': 0, 'max_checked_out': 0}
+    lock = threading.Lock()
+
+    def on_checkout(*args):
+        with lock:
+            state['checked_out'] += 1
+            state['max_checked_out'] = max(state['max_checked_out'], state['checked_out'])
+
+    def on_checkin(*args):
+        with lock:
+            state['checked_out'] -= 1
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+    counts = {'requests': 0, 'pool_timeouts': 0, 'errors': 0}
+    stop = threading.Event()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def loop(n):
+        client = app.test_client()
+        i = 0
+        while not stop.is_set():
+            i += 1
+            if i % 10 == 0:
+                response = client.put(f'/api/goal/{1 + (n + i) % 20}', headers=headers, json={'goal_title': f'edit {i}'})
+            elif i % 3 == 0:
+                response = client.get(f'/api/goal/{1 + i % 20}', headers=headers)
+            else:
+                response = client.get('/api/goals?per_page=20', headers=headers)
+            with lock:
+                counts['requests'] += 1
+                if response.status_code >= 500:
+                    if b'QueuePool limit' in response.data or b'TimeoutError' in response.data:
+                        counts['pool_timeouts'] += 1
+                    else:
+                        counts['errors'] += 1
+
+    pool = [threading.Thread(target=loop, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    results.put(dict(counts, max_checked_out=state['max_checked_out'],
+                     pool_capacity=engine.pool.size() + engine.pool._max_overflow))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--overload', type=float, default=1.0)
+    args = parser.parse_args()
+
+    profile = serving_profile()
+    threads = max(1, int(profile['concurrency'] * args.overload))
+    print(f"profile: {profile['workers']} x {profile['worker_class']} workers, concurrency {profile['concurrency']} "
+          f"(running {threads}), pool {profile['pool_size']}+{profile['max_overflow']}, "
+          f"DB_MAX_CONNECTIONS {profile['max_connections']}")
+
+    token = prepare()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(token, threads, args.duration, results))
+                 for _ in range(profile['workers'])]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    total_requests = sum(report['requests'] for report in reports)
+    pool_timeouts = sum(report['pool_timeouts'] for report in reports)
+    errors = sum(report['errors'] for report in reports)
+    peak_connections = sum(report['max_checked_out'] for report in reports)
+    for n, report in enumerate(reports):
+        print(f"worker {n}: {report['requests']} requests, peak {report['max_checked_out']}/{report['pool_capacity']} "
+              f"connections, {report['pool_timeouts']} pool timeouts, {report['errors']} other errors")
+    print(f"total: {total_requests / args.duration:.1f} req/s, peak connections (upper bound) {peak_connections}"
+          f"/{profile['max_connections']}, pool timeouts {pool_timeouts}, other errors {errors}")
+
+    ok = pool_timeouts == 0 and peak_connections <= profile['max_connections']
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Rate limiter benchmark: cost of a check and correctness across processes.
+
+Runs the limiter's shared state (``app/ratelimit.py``) on a scratch file:
+- per-check latency in one process: a token bucket hit over ``--clients``
+  distinct keys, and an in-flight acquire + release pair
+- ``--processes`` forked processes hitting one bucket of ``--burst`` tokens
+  (no refill during the run): exactly ``--burst`` hits may succeed in total
+- the same processes holding in-flight slots under a limit of ``--in-flight``:
+  the highest count any of them saw must stay within the limit
+
+    python -m benchmarks.rate_limit [--checks 100000] [--processes 8]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import percentile
+from app.ratelimit import SharedState
+
+
+def timed(func, runs):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def hammer_bucket(path, slots, attempts, burst, results):
+    state = SharedState(path, slots)
+    started = time.perf_counter()
+    allowed = sum(1 for _ in range(attempts) if not state.hit('ip:203.0.113.7:default', burst, 1e9))
+    results.put((allowed, time.perf_counter() - started))
+
+
+def hold_slots(path, slots, rounds, limit, results):
+    state = SharedState(path, slots)
+    admitted = highest = 0
+    for _ in range(rounds):
+        if state.acquire(limit):
+            admitted += 1
+            highest = max(highest, state.in_flight())
+            state.release()
+    results.put((admitted, highest))
+
+
+def run_processes(target, processes, *args):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=target, args=(*args, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--checks', type=int, default=100_000, help='checks per measurement')
+    parser.add_argument('--clients', type=int, default=10_000, help='distinct keys in the latency run')
+    parser.add_argument('--slots', type=int, default=65536)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--burst', type=int, default=10_000)
+    parser.add_argument('--in-flight', type=int, default=4)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='sssb-ratelimit-'), 'limits')
+    state = SharedState(path, args.slots)
+
+    keys = [f'user:{n}:default' for n in range(args.clients)]
+    hits = timed(lambda: state.hit(random.choice(keys), 1_000_000, 1), args.checks)
+    admission = timed(lambda: state.release() if state.acquire(1_000_000) else None, args.checks)
+    print(f"{'check':<22} {'p50 us':>8} {'p99 us':>8}")
+    for name, latencies in (('bucket hit', hits), ('acquire + release', admission)):
+        print(f"{name:<22} {percentile(latencies, 50) * 1e6:>8.2f} {percentile(latencies, 99) * 1e6:>8.2f}")
+
+    attempts = 2 * args.burst // args.processes + 1
+    outcomes = run_processes(hammer_bucket, args.processes, path, args.slots, attempts, args.burst)
+    total = args.processes * attempts
+    busy = sum(elapsed for _, elapsed in outcomes)
+    print(f"\nshared bucket: {args.processes} processes, {total} hits, {sum(allowed for allowed, _ in outcomes)} "
+          f"allowed (expected {args.burst}), {busy / total * 1e6:.2f} us per hit under contention")
+
+    outcomes = run_processes(hold_slots, args.processes, path, args.slots, args.checks // args.processes,
+                             args.in_flight)
+    print(f"in-flight limit {args.in_flight}: {sum(admitted for admitted, _ in outcomes)} admitted, "
+          f"highest seen {max(highest for _, highest in outcomes)}, left in flight {state.in_flight()}")
+    state.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
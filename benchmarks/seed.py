@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Synthetic data seeding for benchmarks.
+
+Creates N users x M goals with realistic, reproducible distributions:
+- priority skews to medium (low 30%, medium 50%, high 20%)
+- goal_type and category follow a long-tail (Zipf-like) popularity
+- start dates spread over the last two years, durations from a week to a year
+- older goals are more likely to be completed; completion lands inside the goal window
+
+All users share one password (``SEED_PASSWORD``), hashed once.
+
+    python -m benchmarks.seed --users 100 --goals 200 [--seed 42]
+"""
+import argparse
+import random
+from datetime import date, datetime, time, timedelta
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from app import create_app
+from app.extensions import db, goal_dictionaries, password_hasher, shard_router
+from app.migrations import upgrade
+from app.models import User, Goal, UserShard
+
+SEED_PASSWORD = 'benchmark-password'
+
+PRIORITIES = (('low', 0.3), ('medium', 0.5), ('high', 0.2))
+GOAL_TYPES = ('personal', 'professional', 'health', 'financial', 'education', 'social')
+CATEGORIES = ('fitness', 'career', 'learning', 'finance', 'travel', 'family', 'hobby',
+              'reading', 'nutrition', 'mindfulness', 'home', 'community')
+TITLES = ('Run a half marathon', 'Read {n} books', 'Save ${n}00', 'Learn {n} new recipes',
+          'Finish certification part {n}', 'Meditate {n} minutes daily', 'Visit {n} new places',
+          'Ship side project v{n}', 'Call family {n} times a month', 'Declutter {n} rooms')
+
+CHUNK_SIZE = 5000
+
+
+def _zipf_weights(items, exponent=1.1):
+    return [1 / (rank + 1) ** exponent for rank in range(len(items))]
+
+
+def goal_rows(rng, user_id, count, today):
+    """``count`` synthetic goal rows for one user"""
+    priorities, priority_weights = zip(*PRIORITIES)
+    type_weights = _zipf_weights(GOAL_TYPES)
+    category_weights = _zipf_weights(CATEGORIES)
+    for _ in range(count):
+        start_date = today - timedelta(days=rng.randint(0, 730))
+        end_date = start_date + timedelta(days=int(min(365, max(7, rng.lognormvariate(3.7, 0.8)))))
+        created_at = datetime.combine(start_date, time()) - timedelta(minutes=rng.randint(0, 60 * 24 * 14))
+        age_days = (today - start_date).days
+        is_completed = rng.random() < min(0.85, age_days / 500)
+        completion_date = None
+        if is_completed:
+            completion_date = min(today, start_date + timedelta(days=rng.randint(0, (end_date - start_date).days + 30)))
+        yield {
+            'goal_title': rng.choice(TITLES).format(n=rng.randint(2, 20)),
+            'description': rng.choice((None, '', 'Keep it consistent.', 'Track weekly progress and adjust the plan. ' * 3)),
+            'goal_type': rng.choices(GOAL_TYPES, type_weights)[0],
+            'priority': rng.choices(priorities, priority_weights)[0],
+            'category': rng.choices(CATEGORIES, category_weights)[0],
+            'start_date': start_date,
+            'end_date': end_date,
+            'user_id': user_id,
+            'created_at': created_at,
+            'updated_at': datetime.combine(completion_date, time()) if completion_date else created_at,
+            'is_completed': is_completed,
+            'completion_date': completion_date
+        }
+
+
+def seed(users=10, goals_per_user=100, seed=42, email_prefix='user'):
+    """Insert the synthetic data set; returns the new user ids. Needs an app context."""
+    rng = random.Random(seed)
+    today = date.today()
+    password_hash = password_hasher.hash(SEED_PASSWORD)
+    goal_dictionaries.goal_type.register(GOAL_TYPES)
+    goal_dictionaries.category.register(CATEGORIES)
+
+    # Everything goes to shard 0 (the primary database)
+    with shard_router.using(0):
+        user_ids = []
+        for start in range(0, users, CHUNK_SIZE):
+            rows = [{'username': f'{email_prefix}{n}', 'email': f'{email_prefix}{n}-{seed}@example.com',
+                     'password_hash': password_hash}
+                    for n in range(start, min(users, start + CHUNK_SIZE))]
+            # Directory entries first: they hand out the user ids (see app/sharding.py)
+            ids = db.session.scalars(
+                db.insert(UserShard).returning(UserShard.user_id, sort_by_parameter_order=True),
+                [{'email': row['email'], 'shard': 0, 'moving': False} for row in rows]
+            ).all()
+            for row, user_id in zip(rows, ids):
+                row['id'] = user_id
+            user_ids += db.session.scalars(db.insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+
+        batch = []
+        for user_id in user_ids:
+            batch.extend(goal_rows(rng, user_id, goals_per_user, today))
+            if len(batch) >= CHUNK_SIZE:
+                db.session.execute(db.insert(Goal), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Goal), batch)
+        db.session.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--goals', type=int, default=200, help='goals per user')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+        user_ids = seed(args.users, args.goals, args.seed)
+        print(f"Seeded {len(user_ids)} users x {args.goals} goals into {db.engine.url.render_as_string(hide_password=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: goal list serialization.
+
+Compares the ORM path (hydrate ``Goal`` instances, ``to_dict()``, ``jsonify``)
+with the projection path (select plain row tuples, encode straight to JSON
+bytes) for 10/100/1000-row pages, with all fields and with a sparse fieldset.
+
+    python -m benchmarks.serialization [--repeat 50]
+"""
+import argparse
+import random
+import timeit
+from datetime import date, datetime, timedelta
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from flask import jsonify
+from app import create_app
+from app.extensions import db, goal_dictionaries
+from app.migrations import upgrade
+from app.models import User, Goal
+from app.serializers import parse_fields, goal_columns, rows_to_dicts, dumps
+
+PAGE_SIZES = (10, 100, 1000)
+SPARSE_FIELDS = 'id,goal_title,end_date,is_completed'
+
+
+GOAL_TYPES = ['personal', 'professional', 'health']
+CATEGORIES = ['fitness', 'career', 'learning', 'finance']
+
+
+def seed(rows):
+    goal_dictionaries.goal_type.register(GOAL_TYPES)
+    goal_dictionaries.category.register(CATEGORIES)
+    user = User(username='bench', email=f'bench-{random.random()}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    today = date.today()
+    db.session.execute(db.insert(Goal), [
+        {
+            'goal_title': f'Goal {i}',
+            'description': 'Benchmark goal ' * 5,
+            'goal_type': random.choice(GOAL_TYPES),
+            'priority': random.choice(['low', 'medium', 'high']),
+            'category': random.choice(CATEGORIES),
+            'start_date': today - timedelta(days=i % 90),
+            'end_date': today + timedelta(days=i % 120),
+            'user_id': user.id,
+            'created_at': datetime.utcnow() - timedelta(minutes=i),
+            'updated_at': datetime.utcnow(),
+            'is_completed': i % 3 == 0,
+            'completion_date': today if i % 3 == 0 else None
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def orm_page(user_id, size):
+    goals = Goal.query.filter_by(user_id=user_id).order_by(Goal.created_at.desc()).limit(size).all()
+    body = jsonify({"goals": [goal.to_dict() for goal in goals]}).get_data()
+    db.session.expunge_all()
+    return body
+
+
+def projection_page(user_id, size, fields):
+    rows = Goal.query.filter_by(user_id=user_id).order_by(Goal.created_at.desc()) \
+        .with_entities(*goal_columns(fields)).limit(size).all()
+    return dumps({"goals": rows_to_dicts(rows, fields)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+        user_id = seed(max(PAGE_SIZES))
+        all_fields = parse_fields(None)
+        sparse_fields = parse_fields(SPARSE_FIELDS)
+
+        print(f"{'rows':>6} {'to_dict+jsonify':>16} {'projection':>12} {'sparse':>10} {'speed-up':>9}")
+        for size in PAGE_SIZES:
+            assert orm_page(user_id, size).count(b'"id"') == projection_page(user_id, size, all_fields).count(b'"id"')
+            orm = min(timeit.repeat(lambda: orm_page(user_id, size), number=1, repeat=args.repeat))
+            projection = min(timeit.repeat(lambda: projection_page(user_id, size, all_fields), number=1, repeat=args.repeat))
+            sparse = min(timeit.repeat(lambda: projection_page(user_id, size, sparse_fields), number=1, repeat=args.repeat))
+            print(f"{size:>6} {orm * 1000:>14.2f}ms {projection * 1000:>10.2f}ms {sparse * 1000:>8.2f}ms {orm / projection:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
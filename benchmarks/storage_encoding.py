@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Storage benchmark: compact goal columns against the string layout they replaced.
+
+Seeds one user with ``--goals`` goals and copies them into ``goals_legacy``, a
+table with the old layout: ``goal_type``, ``priority`` and ``category`` as
+strings, the old indexes, and priority sorted through a CASE expression. Reports
+table and index bytes per row for both layouts, then p50/p95 latency of a
+priority-sorted list page (first page, a deep offset page and a cursor page)
+run straight against each table.
+
+    python -m benchmarks.storage_encoding [--goals 20000] [--repeat 200]
+"""
+import argparse
+import os
+import time
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from benchmarks.common import percentile
+import sqlalchemy as sa
+from app import create_app
+from app.dictionaries import PRIORITY_RANKS
+from app.extensions import db
+from app.migrations import upgrade
+from app.models import Goal
+from app.pagination import keyset_query
+from app.serializers import GOAL_FIELDS, goal_columns
+from benchmarks.seed import seed
+
+PAGE_SIZE = 20
+
+legacy_metadata = sa.MetaData()
+legacy = sa.Table(
+    'goals_legacy', legacy_metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('goal_title', sa.String(200), nullable=False),
+    sa.Column('description', sa.Text),
+    sa.Column('goal_type', sa.String(50), nullable=False),
+    sa.Column('priority', sa.String(20), nullable=False),
+    sa.Column('category', sa.String(50), nullable=False),
+    sa.Column('start_date', sa.Date, nullable=False),
+    sa.Column('end_date', sa.Date, nullable=False),
+    sa.Column('user_id', sa.Integer, nullable=False),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('updated_at', sa.DateTime),
+    sa.Column('is_completed', sa.Boolean),
+    sa.Column('completion_date', sa.Date),
+    sa.Column('version', sa.Integer, nullable=False),
+    sa.Index('ix_goals_legacy_user_created_at', 'user_id', 'created_at', 'id'),
+    sa.Index('ix_goals_legacy_user_start_date', 'user_id', 'start_date', 'id'),
+    sa.Index('ix_goals_legacy_user_end_date', 'user_id', 'end_date', 'id'),
+    sa.Index('ix_goals_legacy_user_updated_at', 'user_id', 'updated_at', 'id'),
+    sa.Index('ix_goals_legacy_user_goal_type', 'user_id', 'goal_type'),
+    sa.Index('ix_goals_legacy_user_category', 'user_id', 'category'),
+)
+LEGACY_PRIORITY = sa.case(*((legacy.c.priority == name, rank) for name, rank in PRIORITY_RANKS.items()))
+
+
+def copy_to_legacy(user_id):
+    """Copy a user's goals into ``goals_legacy`` with names in place of the encoded columns"""
+    legacy_metadata.drop_all(db.engine, checkfirst=True)
+    legacy_metadata.create_all(db.engine)
+    columns = goal_columns(list(GOAL_FIELDS), extra=())
+    rows = db.session.execute(db.select(*columns, Goal.version.label('version')).where(Goal.user_id == user_id))
+    for chunk in rows.mappings().partitions(5000):
+        db.session.execute(legacy.insert(), [dict(row) for row in chunk])
+    db.session.commit()
+
+
+def table_bytes(conn, name):
+    """``(table bytes, index bytes)`` of a table"""
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(sa.text('SELECT pg_relation_size(:t), pg_indexes_size(:t)'), {'t': name}).one()
+    # SQLite: the dbstat virtual table (SQLITE_ENABLE_DBSTAT_VTAB, on in most builds)
+    indexes = conn.execute(sa.text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"),
+                           {'t': name}).scalars().all()
+    sizes = dict(conn.execute(sa.text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')).all())
+    return sizes.get(name, 0), sum(sizes.get(index, 0) for index in indexes)
+
+
+def page_statements(user_id, goals):
+    """``{(page, layout): statement}`` of priority-sorted (descending) list pages"""
+    middle_id = db.session.scalar(db.select(Goal.id).where(Goal.user_id == user_id).order_by(Goal.id).offset(goals // 2))
+    current = db.select(*goal_columns(list(GOAL_FIELDS))).where(Goal.user_id == user_id)
+    old = db.select(*legacy.c).where(legacy.c.user_id == user_id)
+    layouts = {'legacy': (old, LEGACY_PRIORITY, legacy.c.id), 'encoded': (current, Goal.priority, Goal.id)}
+    statements = {}
+    for layout, (query, sort_key, id_column) in layouts.items():
+        statements[('first page', layout)] = keyset_query(query, sort_key, id_column, True).limit(PAGE_SIZE)
+        statements[('deep offset', layout)] = keyset_query(query, sort_key, id_column, True) \
+            .limit(PAGE_SIZE).offset(goals // 2)
+        # Cursor in the middle of the medium goals (a rank binds as-is in both layouts)
+        statements[('cursor', layout)] = keyset_query(query, sort_key, id_column, True, (2, middle_id)).limit(PAGE_SIZE + 1)
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--goals', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=200, help='runs per page and layout')
+    args = parser.parse_args()
+
+    # The archive job would move completed goals out of the goals table mid-run
+    os.environ['JOBS_ENABLED'] = 'false'
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+        user_id, = seed(users=1, goals_per_user=args.goals, email_prefix=f'storage{int(time.time())}-')
+        copy_to_legacy(user_id)
+
+        with db.engine.connect() as conn:
+            print(f"{'layout':<8} {'rows':>8} {'table B/row':>12} {'index B/row':>12}")
+            for layout, name in (('legacy', 'goals_legacy'), ('encoded', 'goals')):
+                rows = conn.execute(sa.text(f'SELECT COUNT(*) FROM {name}')).scalar()
+                table, indexes = table_bytes(conn, name)
+                print(f"{layout:<8} {rows:>8} {table / rows:>12.1f} {indexes / rows:>12.1f}")
+
+        print(f"\n{'page':<12} {'layout':<8} {'p50 ms':>8} {'p95 ms':>8}")
+        for (page, layout), statement in page_statements(user_id, args.goals).items():
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                db.session.execute(statement).all()
+                latencies.append(time.perf_counter() - started)
+            print(f"{page:<12} {layout:<8} {percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 95) * 1000:>8.2f}")
+
+        db.session.remove()
+        legacy_metadata.drop_all(db.engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-goal update and delete.
+
+Compares the previous write path (SELECT the goal, mutate the ORM object, flush
+an UPDATE/DELETE, read the summary row to adjust the counters) with the current
+one (one owner-scoped ``UPDATE ... RETURNING`` / ``DELETE ... RETURNING`` and a
+counter UPDATE that needs no read). Both run through the test client, so each
+figure includes JWT verification, the user lookup and the commit. Reports SQL
+statements per request and p50/p95 latency for a rename, a completion toggle
+(which moves the counters) and a delete.
+
+    python -m benchmarks.write_path [--requests 500]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import benchmarks.common  # noqa: F401 (configures the benchmark database)
+from benchmarks.common import percentile
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import create_access_token, current_user, jwt_required
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db, goal_dictionaries
+from app.migrations import upgrade
+from app.models import User, Goal, GoalStats, GoalTombstone
+from app.routes.goal_routes import parse_goal_changes, dates_in_order
+
+legacy_bp = Blueprint("legacy_writes", __name__)
+
+
+@legacy_bp.route("/legacy/goal/<int:goal_id>", methods=["PUT"])
+@jwt_required()
+def legacy_update_goal(goal_id):
+    """The update path before RETURNING: SELECT, setattr, flush"""
+    user_id = current_user.id
+    goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
+    if not goal:
+        return jsonify({"error": "Goal not found"}), 404
+    before = (goal.is_completed, goal.end_date)
+    changes, error = parse_goal_changes(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    for field, value in changes.items():
+        setattr(goal, field, value)
+    if not dates_in_order(goal.start_date, goal.end_date):
+        return jsonify({"error": "End date must be on or after start date"}), 400
+    goal.updated_at = datetime.utcnow()
+    goal.version = goal.version + 1
+    stats = db.session.get(GoalStats, user_id)
+    if stats is not None:
+        GoalStats.apply_delta(user_id, *GoalStats.delta(stats.overdue_as_of, before, (goal.is_completed, goal.end_date)))
+    db.session.commit()
+    return jsonify({"message": "Goal updated successfully", "goal": goal.to_dict()}), 200
+
+
+@legacy_bp.route("/legacy/goal/<int:goal_id>", methods=["DELETE"])
+@jwt_required()
+def legacy_delete_goal(goal_id):
+    """The delete path before RETURNING: SELECT, session.delete, flush"""
+    user_id = current_user.id
+    goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
+    if not goal:
+        return jsonify({"error": "Goal not found"}), 404
+    db.session.delete(goal)
+    stats = db.session.get(GoalStats, user_id)
+    if stats is not None:
+        GoalStats.apply_delta(user_id, *GoalStats.delta(stats.overdue_as_of, before=(goal.is_completed, goal.end_date)))
+    GoalTombstone.record(user_id, [goal.id])
+    db.session.commit()
+    return jsonify({"message": "Goal deleted successfully"}), 200
+
+
+def seed(rows):
+    goal_dictionaries.register([{'goal_type': 'personal', 'category': 'fitness'}])
+    user = User(username='bench', email=f'bench-{random.random()}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    today = date.today()
+    ids = db.session.scalars(db.insert(Goal).returning(Goal.id, sort_by_parameter_order=True), [
+        {
+            'goal_title': f'Goal {i}',
+            'description': 'Benchmark goal',
+            'goal_type': 'personal',
+            'priority': random.choice(['low', 'medium', 'high']),
+            'category': 'fitness',
+            'start_date': today - timedelta(days=30),
+            'end_date': today + timedelta(days=i % 60 - 30),
+            'user_id': user.id,
+        }
+        for i in range(rows)
+    ]).all()
+    db.session.commit()
+    return user.id, ids
+
+
+def measure(client, headers, requests, statements):
+    """``(statements per request, latencies)`` of ``(method, url, payload)`` requests"""
+    latencies, counts = [], []
+    for method, url, payload in requests:
+        statements.clear()
+        started = time.perf_counter()
+        response = client.open(url, method=method, json=payload, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+        counts.append(len(statements))
+    return sum(counts) / len(counts), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500, help='requests per operation and path')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.register_blueprint(legacy_bp, url_prefix='/api')
+    with app.app_context():
+        upgrade(db.engine)
+        user_id, goal_ids = seed(4 * args.requests)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        GoalStats.for_user(user_id)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: statements.append(1))
+
+    client = app.test_client()
+    targets = goal_ids[:args.requests]
+    doomed = {'legacy': goal_ids[2 * args.requests:3 * args.requests], 'current': goal_ids[3 * args.requests:]}
+    prefixes = {'legacy': '/api/legacy/goal', 'current': '/api/goal'}
+
+    def operations(path):
+        prefix = prefixes[path]
+        rename = [('PUT', f'{prefix}/{goal_id}', {'goal_title': f'Renamed {i}'}) for i, goal_id in enumerate(targets)]
+        complete = [('PUT', f'{prefix}/{goal_id}', {'is_completed': path == 'legacy'}) for goal_id in targets]
+        delete = [('DELETE', f'{prefix}/{goal_id}', None) for goal_id in doomed[path]]
+        return {'rename': rename, 'complete': complete, 'delete': delete}
+
+    print(f"{'operation':<10} {'path':<8} {'statements':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for path in ('legacy', 'current'):
+        for name, requests in operations(path).items():
+            count, latencies = measure(client, headers, requests, statements)
+            print(f"{name:<10} {path:<8} {count:>10.1f} {percentile(latencies, 50) * 1000:>8.2f} "
+                  f"{percentile(latencies, 95) * 1000:>8.2f}")
+
+    # Both paths must have kept the counters exact
+    with app.app_context():
+        stats = GoalStats.for_user(user_id)
+        assert (stats.total_goals, stats.completed_goals) == tuple(GoalStats.compute(user_id)[key]
+                                                                   for key in ('total_goals', 'completed_goals'))
+
+
+if __name__ == "__main__":
+    main()
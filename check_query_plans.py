@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the goals table.
+
+Builds every filter/sort combination of GET /api/goals (offset and keyset pages)
+plus the search, due-list, changes-feed, analytics and statistics queries, captures the
+database's plan for each one and fails if any of them reads the goals table
+with a sequential scan.
+
+Runs against the configured database (FLASK_ENV / DATABASE_URL); the schema is
+brought up to date with the migrations first. On Postgres sequential scans are
+disabled for the session, so a Seq Scan in a plan means no index could serve it.
+Exits with status 1 when a regression is found.
+"""
+import itertools
+import json
+import re
+import sys
+from datetime import date, datetime, timedelta
+from werkzeug.datastructures import MultiDict
+from app import analytics, create_app
+from app.extensions import db, goal_dictionaries
+from app.migrations import upgrade
+from app.models import Goal, GoalStats
+from app.pagination import keyset_query
+from app.routes.goal_routes import filtered_goals_query, SORT_KEYS
+from app.search import search_query
+
+USER_ID = 1
+
+FILTERS = {
+    'goal_type': 'personal',
+    'priority': 'high',
+    'category': 'fitness',
+    'is_completed': 'false',
+}
+
+
+def goal_list_queries():
+    """``(label, statement)`` for each filter/sort combination of the goals list"""
+    for size in range(len(FILTERS) + 1):
+        for names in itertools.combinations(FILTERS, size):
+            args = MultiDict({name: FILTERS[name] for name in names})
+            for sort_by, sort_key in SORT_KEYS.items():
+                for descending in (True, False):
+                    label = f"filters={','.join(names) or '-'} sort={sort_by} {'desc' if descending else 'asc'}"
+                    query = filtered_goals_query(USER_ID, args)
+                    yield f"{label} offset", keyset_query(query, sort_key, Goal.id, descending).limit(10).offset(100).statement
+
+                    # Keyset page: same ordering plus the (key, id) range predicate
+                    after = (_sample_key(sort_key), 100)
+                    yield f"{label} cursor", keyset_query(query, sort_key, Goal.id, descending, after).limit(11).statement
+
+
+def search_queries(dialect):
+    """The search endpoint by relevance, alone and with a filter"""
+    for names in ((), ('category',)):
+        args = MultiDict({name: FILTERS[name] for name in names})
+        query, rank = search_query(filtered_goals_query(USER_ID, args), 'run marathon', dialect)
+        label = f"search filters={','.join(names) or '-'}"
+        yield label, keyset_query(query, rank, Goal.id, True).limit(10).statement
+
+
+def due_queries():
+    """The due endpoint's window, with and without overdue goals"""
+    today = date.today()
+    for include_overdue in (True, False):
+        query = Goal.query.filter(Goal.user_id == USER_ID, Goal.is_completed == False,  # noqa: E712
+                                  Goal.end_date <= today + timedelta(days=7))
+        if not include_overdue:
+            query = query.filter(Goal.end_date >= today)
+        query = query.with_entities(Goal.id, Goal.days_remaining_expression(today))
+        label = f"due include_overdue={str(include_overdue).lower()}"
+        yield f"{label} offset", keyset_query(query, Goal.end_date, Goal.id, False).limit(10).statement
+        yield f"{label} cursor", keyset_query(query, Goal.end_date, Goal.id, False, (today, 100)).limit(11).statement
+
+
+def changes_queries():
+    """The changes feed: a full sync's first page and a page after a cursor"""
+    query = Goal.query.filter(Goal.user_id == USER_ID).with_entities(Goal.id, Goal.updated_at)
+    yield "changes full sync", keyset_query(query, Goal.updated_at, Goal.id, False).limit(101).statement
+    yield "changes since", keyset_query(query, Goal.updated_at, Goal.id, False, (datetime(2024, 1, 1), 100)).limit(101).statement
+
+
+def analytics_queries():
+    """Created/completed counts per period, the open period only and a full window"""
+    today = date.today()
+    for unit in analytics.BUCKETS:
+        for group_by in (None, *analytics.GROUP_BY):
+            group_column = analytics.GROUP_BY[group_by] if group_by else None
+            for label, since in (("open", today - timedelta(days=today.weekday())), ("window", today - timedelta(weeks=12))):
+                yield f"analytics {unit} group_by={group_by or '-'} {label}", \
+                    analytics.counts_query(USER_ID, unit, group_column, since)
+
+
+def statistics_queries():
+    today = date.today()
+    yield "stats aggregate", GoalStats.compute_query(USER_ID, today)
+    yield "overdue count", db.session.query(db.func.count(Goal.id)).filter(
+        Goal.user_id == USER_ID, Goal.is_completed == False, Goal.end_date < today  # noqa: E712
+    ).statement
+    yield "stats row", db.select(GoalStats).where(GoalStats.user_id == USER_ID)
+    yield "single goal", db.select(Goal).where(Goal.id == 1, Goal.user_id == USER_ID)
+
+
+def _sample_key(sort_key):
+    python_type = sort_key.type.python_type
+    if python_type is datetime:
+        return datetime(2024, 1, 1)
+    if python_type is date:
+        return date(2024, 1, 1)
+    return 2
+
+
+def explain(conn, statement):
+    """Plan lines for a statement and whether any of them scans the goals table sequentially"""
+    compiled = statement.compile(dialect=conn.dialect)
+    sql = str(compiled)
+    # The driver gets what the column types bind (e.g. a category's id, not its name)
+    params = {}
+    for name, value in compiled.params.items():
+        processor = compiled.binds[name].type.bind_processor(conn.dialect)
+        params[name] = processor(value) if processor else value
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == 'postgresql':
+        plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines, seq_scan = [], False
+
+        def walk(node, depth=0):
+            nonlocal seq_scan
+            relation = node.get('Relation Name')
+            index = node.get('Index Name')
+            lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else '') + (f' using {index}' if index else ''))
+            if node['Node Type'] == 'Seq Scan' and relation == 'goals':
+                seq_scan = True
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'])
+        return lines, seq_scan
+
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    lines = [row[-1] for row in rows]
+    # "SEARCH goals USING INDEX ..." is an index range scan; "SCAN goals" reads the whole table
+    # ("SCAN goals_fts VIRTUAL TABLE" is the full-text index)
+    seq_scan = any(re.match(r'SCAN goals\b', line) for line in lines)
+    return lines, seq_scan
+
+
+def check_query_plans(verbose=False):
+    app = create_app()
+    failures = []
+    checked = 0
+
+    with app.app_context():
+        upgrade(db.engine)
+        # Filter values nobody registered would turn the filters into FALSE
+        goal_dictionaries.register([FILTERS])
+        with db.engine.connect() as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.exec_driver_sql('SET enable_seqscan = off')
+            queries = itertools.chain(goal_list_queries(), search_queries(conn.dialect.name), due_queries(),
+                                      changes_queries(), analytics_queries(), statistics_queries())
+            for label, statement in queries:
+                lines, seq_scan = explain(conn, statement)
+                checked += 1
+                if seq_scan:
+                    failures.append((label, lines))
+                if verbose or seq_scan:
+                    print(f"{'FAIL' if seq_scan else 'ok  '} {label}")
+                    for line in lines:
+                        print(f"       {line}")
+            conn.rollback()
+
+    print(f"\nChecked {checked} query plans: {len(failures)} sequential scan(s) on goals.")
+    return not failures
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_query_plans(verbose='-v' in sys.argv) else 1)
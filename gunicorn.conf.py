@@ -0,0 +1,6 @@
+# gunicorn.conf.py
+# Worker model, worker count, threads and timeouts come from the serving profile
+# in app/serving.py, which also sizes the database pool (see ProductionConfig).
+from app.serving import gunicorn_settings
+
+globals().update(gunicorn_settings())
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Script to apply pending schema migrations (see app/migrations)
+"""
+import sys
+from app import create_app
+from app.extensions import shard_router
+from app.migrations import upgrade, pending
+
+def migrate(target=None):
+    app = create_app()
+    
+    with app.app_context():
+        # Every shard has the same schema; shard 0 is the primary database
+        for shard, engine in enumerate(shard_router.engines()):
+            name = f"Shard {shard}" if shard_router.sharded else "Database"
+            to_apply = pending(engine)
+            if not to_apply:
+                print(f"{name} schema is up to date.")
+                continue
+            
+            print(f"{name}: applying migrations: {', '.join(to_apply)}")
+            applied = upgrade(engine, target=target, primary=shard_router.engine(0))
+            print(f"✅ Applied {len(applied)} migration(s).")
+
+if __name__ == "__main__":
+    migrate(sys.argv[1] if len(sys.argv) > 1 else None)
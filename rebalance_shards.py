@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script to inspect and rebalance user shards (see app/sharding.py)
+
+    python rebalance_shards.py status
+    python rebalance_shards.py move <user_id> <shard>
+    python rebalance_shards.py balance [--max-moves N] [--dry-run]
+
+Moves run while the app keeps serving: the user's reads continue, and their
+writes get 503 responses for the few seconds the copy takes.
+"""
+import argparse
+from app import create_app
+from app.extensions import shard_router
+
+
+def status():
+    for shard, users in shard_router.user_counts().items():
+        print(f"Shard {shard}: {users} user(s)")
+
+
+def move(user_id, target):
+    copied = shard_router.move_user(user_id, target, log=print)
+    if not copied:
+        print(f"User {user_id} is already on shard {target}.")
+        return
+    print(f"✅ Moved user {user_id}: {sum(copied.values())} row(s).")
+
+
+def balance(max_moves=None, dry_run=False):
+    moves = shard_router.plan_rebalance(max_moves)
+    if not moves:
+        print("Shards are balanced.")
+        return
+    for user_id, source, target in moves:
+        print(f"User {user_id}: shard {source} -> {target}")
+        if not dry_run:
+            shard_router.move_user(user_id, target, log=print)
+    if not dry_run:
+        print(f"✅ Moved {len(moves)} user(s).")
+    status()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='users per shard')
+    move_parser = commands.add_parser('move', help="move one user's rows to another shard")
+    move_parser.add_argument('user_id', type=int)
+    move_parser.add_argument('shard', type=int)
+    balance_parser = commands.add_parser('balance', help='even out the number of users per shard')
+    balance_parser.add_argument('--max-moves', type=int)
+    balance_parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.command == 'status':
+            status()
+        elif args.command == 'move':
+            move(args.user_id, args.shard)
+        else:
+            balance(args.max_moves, args.dry_run)
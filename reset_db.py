@@ -4,7 +4,7 @@ Script to reset the database with updated schema
 """
 from app import create_app
 from app.extensions import db
-from app.models import User
+from app.migrations import upgrade, schema_migrations
 
 def reset_database():
     app = create_app()
@@ -12,9 +12,10 @@ def reset_database():
     with app.app_context():
         print("Dropping all tables...")
         db.drop_all()
+        schema_migrations.drop(db.engine, checkfirst=True)
         
         print("Creating all tables with updated schema...")
-        db.create_all()
+        upgrade(db.engine)
         
         print("Database reset complete!")
         print("The 'users' table now has a password_hash column that can store up to 255 characters.")
@@ -1,11 +1,12 @@
 from app import create_app
-from app.extensions import db
-from app.models import User  # your models
+from app.extensions import shard_router
+from app.migrations import upgrade
 
 app = create_app()
 
 with app.app_context():
-    db.create_all()  # create tables if not exist
+    for engine in shard_router.engines():
+        upgrade(engine, primary=shard_router.engine(0))  # apply pending schema migrations (on every shard)
 
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
@@ -4,7 +4,7 @@ Script to update the database with the goals table
 """
 from app import create_app
 from app.extensions import db
-from app.models import User, Goal
+from app.migrations import upgrade
 
 def update_database():
     app = create_app()
@@ -12,8 +12,8 @@ def update_database():
     with app.app_context():
         print("Creating goals table...")
         
-        # Create only the goals table (users table should already exist)
-        db.create_all()
+        # Apply pending migrations (creates the goals table if it is missing)
+        upgrade(db.engine)
         
         print("✅ Database updated successfully!")
         print("Tables in database:")
@@ -23,9 +23,9 @@ def update_database():
         print("- id (Primary Key)")
         print("- goal_title (String 200)")
         print("- description (Text)")
-        print("- goal_type (String 50)")
-        print("- priority (String 20) - low/medium/high")
-        print("- category (String 50)")
+        print("- goal_type_id (Integer, goal_types.id)")
+        print("- priority_rank (SmallInteger) - 1 low / 2 medium / 3 high")
+        print("- category_id (Integer, goal_categories.id)")
         print("- start_date (Date)")
         print("- end_date (Date)")
         print("- user_id (Foreign Key to users.id)")